@@ -0,0 +1,111 @@
+# ProjectL/benchmark.py
+import argparse
+import logging
+import random
+import time
+import tracemalloc
+
+from ProjectL.classes import Piece, TakePiece
+from ProjectL.definition import as_definition, load_configs
+from ProjectL.game_objects import GameManager
+
+
+def best_time(function, repeat=20, number=1):
+    """ best wall time of number calls of function over repeat runs, in seconds per call """
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best
+
+
+def setup_benchmark(configs_dict, repeat=20, logger=None):
+    """ time to set a game up, in seconds
+
+        eager_bank: every bank piece built with its cube, as GameManager used to
+        lazy_bank: every bank piece built without touching its cube
+        game_from_dict: GameManager from the configs dict (compiled for each game)
+        game_from_definition: GameManager from a GameDefinition compiled once
+    """
+    logger = logger or logging.getLogger('projectL.benchmark')
+    definition = as_definition(configs_dict)
+    copies = [piece_confs for piece_confs in configs_dict["pieces"] for _ in range(piece_confs.get("quantity", 10))]
+    random.seed(0)
+    return {
+        "eager_bank": best_time(lambda: [Piece(configs=piece_confs).cube for piece_confs in copies], repeat),
+        "lazy_bank": best_time(lambda: [Piece(configs=piece_confs) for piece_confs in copies], repeat),
+        "game_from_dict": best_time(lambda: GameManager(configs_dict, logger), repeat),
+        "game_from_definition": best_time(lambda: GameManager(definition, logger), repeat),
+    }
+
+
+def instance_bytes(factory, n=2000):
+    """ traced bytes allocated per object made by factory (the slot of the list holding them included) """
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    objects = [factory() for _ in range(n)]
+    size = (tracemalloc.get_traced_memory()[0] - before) / n
+    tracemalloc.stop()
+    del objects
+    return size
+
+
+def action_benchmark(configs_dict, n_games=20, attempts=1000, logger=None):
+    """ cost of the action attempts of the random strategy, fresh actions against one reused action (rebind)
+
+        Returns the bytes per instance of the hot classes, the time per attempt both ways, and per game of two
+        random players: the attempts made and the bytes fresh actions would have allocated for them.
+    """
+    logger = logger or logging.getLogger('projectL.benchmark')
+    definition = as_definition(configs_dict)
+    pieces, cards = [], []
+    reused = TakePiece()
+    results = {
+        "action_bytes": instance_bytes(lambda: TakePiece(pieces=pieces, cards=cards)),
+        "piece_bytes": instance_bytes(definition.piece_types[0].make),
+        "card_bytes": instance_bytes(definition.card_types[0].make),
+        "fresh_attempt_us": best_time(lambda: [TakePiece(pieces=pieces, cards=cards) for _ in range(attempts)],
+                                      repeat=5) / attempts * 1e6,
+        "reused_attempt_us": best_time(lambda: [reused.rebind(pieces=pieces, cards=cards) for _ in range(attempts)],
+                                       repeat=5) / attempts * 1e6,
+    }
+    definition = definition.with_players([{"name": f"random_{seat}", "strategy": "random"} for seat in range(2)])
+    total_attempts = 0
+    start = time.perf_counter()
+    for seed in range(n_games):
+        random.seed(seed)
+        game_manager = GameManager(definition, logger)
+        game_manager.run()
+        total_attempts += int(game_manager.stats.actions.sum() + game_manager.stats.wasted_attempts.sum())
+    results["game_ms"] = (time.perf_counter() - start) / n_games * 1e3
+    results["attempts_per_game"] = total_attempts / n_games
+    results["fresh_action_bytes_per_game"] = results["attempts_per_game"] * results["action_bytes"]
+    return results
+
+
+def format_timings(timings):
+    slowest = max(timings.values())
+    return "\n".join(f"{name:>22}: {seconds * 1e3:9.3f} ms  x{slowest / seconds:7.1f}"
+                     for name, seconds in timings.items())
+
+
+def main():
+    from ProjectL.simulate import file_path
+    parser = argparse.ArgumentParser(description="Game setup benchmark")
+    parser.add_argument("--configs", default=file_path, help="path to the yaml configs")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--actions", action="store_true", help="benchmark action attempts and instance sizes")
+    args = parser.parse_args()
+    logger = logging.getLogger('projectL.benchmark')
+    logger.setLevel(logging.WARNING)
+    if args.actions:
+        for name, value in action_benchmark(load_configs(args.configs), logger=logger).items():
+            print(f"{name:>28}: {value:10.2f}")
+        return
+    print(format_timings(setup_benchmark(load_configs(args.configs), args.repeat, logger)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+# ProjectL/budget.py
+import time
+
+
+class SearchTimeout(Exception):
+    """ raised by Deadline.tick when a search runs out of its budget """
+
+
+class Deadline:
+    """ time and node limits of one decision. Searches call tick() once per node
+
+        The search is stopped margin (a fraction of time_limit) early, to leave time to unwind it and play the move
+        it found: a decision only overruns when a single node takes longer than that.
+    """
+
+    def __init__(self, time_limit=None, node_limit=None, margin=0.05):
+        self.time_limit = time_limit
+        self.node_limit = node_limit
+        self.start = time.perf_counter()
+        self.end = self.start + time_limit * (1 - margin) if time_limit is not None else None
+        self.nodes = 0
+
+    def tick(self):
+        self.nodes += 1
+        if self.expired:
+            raise SearchTimeout()
+
+    @property
+    def expired(self):
+        return ((self.node_limit is not None and self.nodes > self.node_limit)
+                or (self.end is not None and time.perf_counter() >= self.end))
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.start
+
+    @property
+    def overrun(self):
+        """ True when the decision took longer than its time limit """
+        return self.time_limit is not None and self.elapsed > self.time_limit
+
+
+class DecisionBudget:
+    """ how much thinking a strategy may do: move_time seconds and/or nodes per decision, game_time seconds for
+        all its decisions of a game. None means unlimited
+
+        Set for every player with game_parameters.decision_budget, or per player with a "budget" entry, e.g.
+        {move_time: 0.01, nodes: 2000}.
+    """
+
+    def __init__(self, move_time=None, nodes=None, game_time=None):
+        self.move_time = move_time
+        self.nodes = nodes
+        self.game_time = game_time
+        self.game_time_used = 0.0
+
+    @classmethod
+    def from_configs(cls, budget_confs):
+        if not budget_confs:
+            return None
+        unknown = set(budget_confs) - {"move_time", "nodes", "game_time"}
+        if unknown:
+            raise ValueError(f"Unknown budget entries {sorted(unknown)}")
+        return cls(**budget_confs)
+
+    def deadline(self, decisions_left=1):
+        """ Deadline of the next decision. The game time left is shared evenly by the decisions left """
+        time_limit = self.move_time
+        if self.game_time is not None:
+            share = max(self.game_time - self.game_time_used, 0.0) / max(decisions_left, 1)
+            time_limit = share if time_limit is None else min(time_limit, share)
+        return Deadline(time_limit, self.nodes)
+
+    def spend(self, deadline):
+        """ accounts a finished decision against the game time """
+        self.game_time_used += deadline.elapsed
@@ -1,10 +1,36 @@
 import random
+from functools import lru_cache
 
 import numpy as np
 
 from ProjectL.utils.utils import plot_image
 
 
+# move records: a compact int describing what a performed action changed, enough to undo it (see Action.undo)
+#   bits 0-2    action_id
+#   bit  3      card flag - PlacePiece: the placement completed the card, TakeCard: the card came from the supply
+#   bits 4-5    bank delta - number of pieces taken from the bank
+#   bits 6-21   index of the placed piece in the player's pieces (NO_PIECE_INDEX if it was not there)
+#   bits 22-46  bitboard of the placement
+PIECE_INDEX_BITS = 16
+NO_PIECE_INDEX = (1 << PIECE_INDEX_BITS) - 1
+_PLACEMENT_SHIFT = 6 + PIECE_INDEX_BITS
+
+MAX_CARDS_HELD = 1      # cards a player can work on at the same time (see TakeCard.is_action_valid)
+
+
+def encode_move(action_id, card_flag=False, bank_delta=0, piece_index=NO_PIECE_INDEX, placement_bits=0):
+    if not 0 <= piece_index <= NO_PIECE_INDEX:
+        raise ValueError(f"Piece index {piece_index} does not fit a move record (at most {NO_PIECE_INDEX - 1})")
+    return ((action_id & 7) | (card_flag << 3) | (bank_delta << 4) | (piece_index << 6)
+            | (placement_bits << _PLACEMENT_SHIFT))
+
+
+def decode_move(move):
+    """ returns (action_id, card_flag, bank_delta, piece_index, placement_bits) """
+    return move & 7, bool(move >> 3 & 1), move >> 4 & 3, move >> 6 & NO_PIECE_INDEX, move >> _PLACEMENT_SHIFT
+
+
 class Action:
     """ encapsulates everything an action does - check validity based on card or game state
 
@@ -12,16 +38,33 @@ class Action:
         Exemples:
             - adding a piece to pieces or card to cards
             - modifying a piece or a card that was passed to it
+
+        action_id: index of the action type in the statistics arrays (see stats.ACTION_NAMES)
+        move: the move record of the last successful perform_action, used by undo (None if nothing to undo)
+
+        Actions have __slots__ and can be reused for another attempt with rebind instead of building a new one.
     """
+    __slots__ = ("piece", "card", "pieces", "cards", "game_manager", "move")
+    action_id = -1
+    desc = "action"
+
     def __init__(self, piece=None, card=None, pieces = None, cards=None, game_manager=None):
-        self.desc = "action"
         self.piece = piece
         self.card = card
         self.pieces = pieces
         self.cards = cards
         self.game_manager = game_manager
+        self.move = None
 
 
+    def rebind(self, pieces=None, cards=None, game_manager=None):
+        """ makes the action a fresh one on pieces and cards: what it picked or did before is forgotten """
+        self.piece = self.card = self.move = None
+        self.pieces = pieces
+        self.cards = cards
+        self.game_manager = game_manager
+        return self
+
     def is_action_valid(self, *args, **kwargs):
         """ checks if the action is valid
             :return: Bool
@@ -35,59 +78,157 @@ class Action:
         """
         pass
 
+    def undo(self, move=None):
+        """ reverts the last successful perform_action (or the one described by move), restoring the objects it
+            changed exactly as they were. Only the action itself is reverted - not what a strategy did as a result
+            (e.g. paying out a card)
+        """
+        self.move = None
+
     def __str__(self):
         return self.desc
 
 
+class MoveStack:
+    """ make/unmake stack for searches: push performs an action, pop undoes the most recent one
+
+        Move records go in a preallocated int64 array and actions in a preallocated list, so pushing and popping
+        does not allocate. An action object can be pushed several times as long as its piece / card are the same.
+    """
+
+    def __init__(self, capacity=256):
+        self.records = np.zeros(capacity, dtype=np.int64)
+        self.actions = [None] * capacity
+        self.depth = 0
+
+    def push(self, action, *args):
+        """ performs the action, returns its result. Only successful actions are stacked """
+        result = action.perform_action(*args)
+        if result:
+            self.records[self.depth] = action.move
+            self.actions[self.depth] = action
+            self.depth += 1
+        return result
+
+    def pop(self):
+        """ undoes the most recent successful action """
+        self.depth -= 1
+        action = self.actions[self.depth]
+        self.actions[self.depth] = None
+        action.undo(int(self.records[self.depth]))
+
+    def __len__(self):
+        return self.depth
+
+
 class TakePiece(Action):
-    def __init__(self, piece=None, card=None, pieces = None, **kwargs):
+    __slots__ = ("piece_name",)
+    action_id = 0
+    desc = "Take a Piece"
+
+    def __init__(self, piece=None, card=None, pieces = None, piece_name=None, **kwargs):
         super().__init__(piece, card, pieces, **kwargs)
-        self.desc = "Take a Piece"
+        self.piece_name = piece_name        # type of piece to take, a random available one if None
+
+    def rebind(self, pieces=None, cards=None, game_manager=None):
+        self.piece_name = None
+        return super().rebind(pieces, cards, game_manager)
 
     def perform_action(self, piece_name=None):
         """ selects an available piece from the bank and returns it
         """
+        piece_name = piece_name if piece_name is not None else self.piece_name
         if self.game_manager:
             # Get a piece from the bank
             piece = self.game_manager.get_piece(piece_name)
             if piece:
                 self.pieces.append(piece)
+                self.piece = piece
+                self.move = encode_move(self.action_id, bank_delta=1)
                 return True
         else:
             # Fallback to the original behavior for backward compatibility
             piece = PieceSquare()
             self.pieces.append(piece)
+            self.piece = piece
+            self.move = encode_move(self.action_id)
             return True
         return False
 
+    def undo(self, move=None):
+        """ gives the piece back to the bank """
+        move = self.move if move is None else move
+        if move is None:
+            return
+        _, _, bank_delta, _, _ = decode_move(move)
+        piece = self.pieces.pop()
+        if bank_delta:
+            self.game_manager.return_piece(piece)
+        self.move = None
+
 
     def is_action_valid(self):
         """ This action is valid if there are pieces available in the bank
         """
         if self.game_manager:
             # Check if any pieces are available in the bank
-            return any(pieces for pieces in self.game_manager.piece_bank.values())
+            return self.game_manager.bank_count > 0
         # Fallback to original behavior
         return True
 
 class PlacePiece(Action):
-    def __init__(self, piece=None, card=None, pieces = None, **kwargs):
+    __slots__ = ("configuration",)
+    action_id = 1
+    desc = "Place a piece"
+
+    def __init__(self, piece=None, card=None, pieces = None, configuration=None, **kwargs):
         super().__init__(piece, card, pieces, **kwargs)
-        self.desc = "Place a piece"
+        self.configuration = configuration      # layout of the piece on the card, a random one if None
 
+    def rebind(self, pieces=None, cards=None, game_manager=None):
+        self.configuration = None
+        return super().rebind(pieces, cards, game_manager)
 
-    def perform_action(self, configuration=None):
-        """
 
+    def perform_action(self, configuration=None):
+        """ places the piece on the card. On success the piece leaves the player's pieces and stays on the card
+            until the card is completed (see Player.collect_reward)
         """
+        if not self.is_action_valid():
+            return False
+        if configuration is None:
+            configuration = self.configuration
         if configuration is None:
             config_no = random.randint(0,self.piece.cube.shape[0]-1)
             configuration = self.piece.cube[config_no,:,:]
-        if self.is_action_valid():
-            result = self.card.place_piece(configuration)
-            return result
-        else:
-            return False
+        piece_index = NO_PIECE_INDEX
+        if self.pieces is not None:
+            piece_index = next((i for i, p in enumerate(self.pieces) if p is self.piece), None)
+            if piece_index is None:
+                piece_index = NO_PIECE_INDEX
+            elif piece_index >= NO_PIECE_INDEX:
+                raise ValueError(f"Cannot record the placement of piece {piece_index}: at most {NO_PIECE_INDEX} "
+                                 f"pieces can be held")
+        result = self.card.place_piece(configuration)
+        if result:
+            if piece_index != NO_PIECE_INDEX:
+                del self.pieces[piece_index]
+            self.card.placed_pieces.append(self.piece)
+            self.move = encode_move(self.action_id, card_flag=self.card.is_full, piece_index=piece_index,
+                                    placement_bits=layout_to_bits(configuration))
+        return result
+
+    def undo(self, move=None):
+        """ takes the piece off the card and puts it back where it was in the player's pieces """
+        move = self.move if move is None else move
+        if move is None:
+            return
+        _, _, _, piece_index, placement_bits = decode_move(move)
+        self.card.remove_piece(placement_bits)
+        piece = self.card.placed_pieces.pop()
+        if piece_index != NO_PIECE_INDEX:
+            self.pieces.insert(piece_index, piece)
+        self.move = None
 
     def is_action_valid(self):
         """ must have a piece and a card that is not full
@@ -108,24 +249,54 @@ class PlacePiece(Action):
 
 
 class UpgradePiece(Action):
+    __slots__ = ()
+    action_id = 2
+    desc = "Upgrade a piece"
+
     def __init__(self, piece=None, card=None, pieces = None, **kwargs):
         super().__init__(piece, card, pieces, **kwargs)
-        self.desc = "Upgrade a piece"
-        if self.piece is None:
+        if self.piece is None and self.pieces:
+            self.piece = random.choice(self.pieces)
+
+    def rebind(self, pieces=None, cards=None, game_manager=None):
+        super().rebind(pieces, cards, game_manager)
+        if self.pieces:
             self.piece = random.choice(self.pieces)
+        return self
 
 
 class TakeCard(Action):
+    __slots__ = ()
+    action_id = 3
+    desc = "Take a card"
+
     def __init__(self, piece=None, card=None, pieces = None, cards=None, **kwargs):
         super().__init__(piece, card, pieces, cards, **kwargs)
-        self.desc = "Take a card"
 
     def perform_action(self):
-        """ selects a possible piece and returns it
+        """ takes a card from the game's card supply (or a default card when played without a game manager)
         """
-        # choose a piece
-        card = Card()
+        if self.game_manager:
+            card = self.game_manager.get_card()
+            if card is None:
+                return False
+        else:
+            card = Card()
         self.cards.append(card)
+        self.card = card
+        self.move = encode_move(self.action_id, card_flag=self.game_manager is not None)
+        return True
+
+    def undo(self, move=None):
+        """ puts the card back on top of the supply """
+        move = self.move if move is None else move
+        if move is None:
+            return
+        _, from_supply, _, _, _ = decode_move(move)
+        card = self.cards.pop()
+        if from_supply:
+            self.game_manager.return_card(card)
+        self.move = None
 
 
     def is_action_valid(self):
@@ -134,28 +305,105 @@ class TakeCard(Action):
         """
 
         #TODO: check this
-        if len(self.cards) >= 1:
+        if len(self.cards) >= MAX_CARDS_HELD:
             return False
+        if self.game_manager:
+            return bool(self.game_manager.cards)
 
         return True
 
 
 class Master(Action):
+    __slots__ = ()
+    action_id = 4
+    desc = "Master"
+
     def __init__(self, piece=None, card=None, pieces = None, **kwargs):
         super().__init__(piece, card, pieces, **kwargs)
-        self.desc = "Master"
 
 
 class Reward:
     """
-        Describes what we get for finishing a card. Points and/or a piece
+        Describes what we get for finishing a card. Points and/or a piece: the name of a piece type taken from the
+        bank (or a Piece), None for no piece
     """
+    __slots__ = ("points", "piece")
+
     def __init__(self, points = 0, piece = None):
         self.points = points
-        self.piece = piece if piece else PieceSquare()
+        self.piece = piece
 
     def __repr__(self):
-        return f"Points: {self.points} with piece: {self.piece.name}"
+        return f"Points: {self.points} with piece: {getattr(self.piece, 'name', self.piece)}"
+
+# bitboards: a 5x5 layout as an int where cell (row, col) is bit row * 5 + col
+CARD_SIZE = 5
+FULL_BITS = (1 << CARD_SIZE * CARD_SIZE) - 1
+_LEFT_COLUMN_BITS = sum(1 << (row * CARD_SIZE) for row in range(CARD_SIZE))
+_RIGHT_COLUMN_BITS = _LEFT_COLUMN_BITS << (CARD_SIZE - 1)
+BIT_WEIGHTS = 1 << np.arange(CARD_SIZE * CARD_SIZE, dtype=np.int64)
+
+
+def layout_to_bits(layout):
+    """ bitboard of the non-zero cells of a 5x5 layout """
+    return int(np.asarray(layout).reshape(-1).astype(bool) @ BIT_WEIGHTS)
+
+
+def bits_to_layout(bits):
+    """ 5x5 int layout of a bitboard, the inverse of layout_to_bits """
+    return ((bits >> np.arange(CARD_SIZE * CARD_SIZE)) & 1).reshape(CARD_SIZE, CARD_SIZE)
+
+
+def _neighbours(bits):
+    """ cells orthogonally adjacent to the cells of bits (shifts must not wrap around rows) """
+    return (((bits << 1) & ~_LEFT_COLUMN_BITS) | ((bits >> 1) & ~_RIGHT_COLUMN_BITS)
+            | (bits << CARD_SIZE) | (bits >> CARD_SIZE)) & FULL_BITS
+
+
+@lru_cache(maxsize=1 << 16)
+def empty_regions(empty_bits):
+    """ splits the empty cells of a layout into connected regions (flood fill on bitboards)
+
+        Returns a tuple of region bitboards. Cached per layout since few distinct layouts occur in games.
+    """
+    regions = []
+    remaining = empty_bits
+    while remaining:
+        region = remaining & -remaining         # lowest empty cell
+        while True:
+            grown = region | (_neighbours(region) & remaining)
+            if grown == region:
+                break
+            region = grown
+        regions.append(region)
+        remaining &= ~region
+    return tuple(regions)
+
+
+def _coverable_sizes(piece_sizes):
+    """ bitset of the cell counts that can be made of any multiset of piece_sizes (bit n set = n cells) """
+    bits = 1
+    for _ in range(CARD_SIZE * CARD_SIZE):
+        grown = bits
+        for size in piece_sizes:
+            grown |= bits << size
+        grown &= (1 << (CARD_SIZE * CARD_SIZE + 1)) - 1
+        if grown == bits:
+            break
+        bits = grown
+    return bits
+
+
+@lru_cache(maxsize=1 << 16)
+def is_layout_dead(empty_bits, piece_sizes):
+    """ True when some empty region cannot be covered by any multiset of the piece sizes (a frozenset)
+
+        This only looks at region sizes so it never declares a completable card dead, but may miss some
+        dead ones (e.g. a 3 cells L with only straight 3 pieces).
+    """
+    coverable = _coverable_sizes(piece_sizes)
+    return any(not (coverable >> region.bit_count()) & 1 for region in empty_regions(empty_bits))
+
 
 class Card:
     """ Describes the different cards we can play with.
@@ -164,6 +412,8 @@ class Card:
         reward: the object that describes what piece / points we get for completing the card
         mask: a bool numpy array that describes the playable structure of that card within the maximal matrix
     """
+    __slots__ = ("layout", "mask", "reward", "is_full", "placed_pieces", "mask_bits", "layout_bits")
+
     def __init__(self, configs = None):
         if configs:
             self.layout = np.zeros(shape=(5, 5), dtype=int)
@@ -174,7 +424,22 @@ class Card:
             self.mask = np.array([[False,False,True,True,False,], [False,False,True,True,False], [False,False,True,True,False], [False,False,False,False,False], [False,False,False,False,False], ])
             self.reward = Reward()
         self.is_full = False
-
+        self.placed_pieces = []         # pieces sitting on the card, given back to the player on completion
+        self.mask_bits = layout_to_bits(self.mask)
+        self.layout_bits = 0            # bitboard kept in sync with layout by place_piece
+
+    @classmethod
+    def from_prototype(cls, card_type):
+        """ a new empty card sharing the (read only) mask and the reward of card_type (see definition.CardType) """
+        card = cls.__new__(cls)
+        card.layout = np.zeros(shape=(5, 5), dtype=int)
+        card.mask = card_type.mask
+        card.reward = card_type.reward
+        card.is_full = False
+        card.placed_pieces = []
+        card.mask_bits = card_type.mask_bits
+        card.layout_bits = 0
+        return card
 
     def place_piece(self, configuration):
         """
@@ -185,6 +450,7 @@ class Card:
 
         if self.placement_valid(configuration):
             self.layout += configuration            # update the layout
+            self.layout_bits |= layout_to_bits(configuration)
             if np.all((self.layout == 1) == self.mask):
                 self.is_full = True
             return True
@@ -206,26 +472,71 @@ class Card:
 
         return out_sum == 0 and not double_occupation
 
+    def remove_piece(self, placement_bits):
+        """ takes a placed piece (given as the bitboard of its placement) off the card - the inverse of place_piece """
+        self.layout -= bits_to_layout(placement_bits)
+        self.layout_bits &= ~placement_bits
+        self.is_full = False
+
+    @property
+    def empty_bits(self):
+        """ bitboard of the cells of the mask still to be filled """
+        return self.mask_bits & ~self.layout_bits
+
+    def empty_regions(self):
+        """ bitboards of the connected empty regions of the card """
+        return empty_regions(self.empty_bits)
+
+    def is_dead(self, piece_sizes):
+        """ True when the card can no longer be completed with pieces of the given sizes (see is_layout_dead) """
+        return not self.is_full and is_layout_dead(self.empty_bits, frozenset(piece_sizes))
+
     def __repr__(self):
         return f"Mask: {self.mask}, full: {self.is_full}, reward: {self.reward}"
 
 class Piece:
     """describes a Piece that a Player can place on a Card"""
+    __slots__ = ("level", "shape", "size", "name", "configurations_array", "_cube", "_cube_bits")
 
     def __init__(self, configs = None):
         self.level = None
         self.shape = None
+        self.size = 0
         self.name = None
         self.configurations_array = []
-        self.cube = None
+        self._cube = None               # generated on first access of cube
+        self._cube_bits = None
         if configs:
             self.level = configs["level"]
             self.shape = np.array(configs["shape"])
+            self.size = int(np.count_nonzero(self.shape))      # number of cells the piece covers
             self.name = configs["name"]
             self.configurations_array = []
-            self.cube = None
-            self.generate_cube()
 
+    @property
+    def cube(self):
+        """ every configuration of the piece on a card (see generate_cube), generated the first time it is needed:
+            most pieces of a game are never placed
+        """
+        if self._cube is None and self.shape is not None:
+            self.generate_cube()
+        return self._cube
+
+    @cube.setter
+    def cube(self, cube):
+        self._cube = cube
+
+    @classmethod
+    def from_prototype(cls, piece_type):
+        """ a new piece sharing the (read only) shape and cube of piece_type (see definition.PieceType) """
+        piece = cls()
+        piece.level = piece_type.level
+        piece.shape = piece_type.shape
+        piece.size = piece_type.size
+        piece.name = piece_type.name
+        piece.cube = piece_type.cube
+        piece._cube_bits = piece_type.cube_bits
+        return piece
 
     def generate_cube(self):
         """ To be efficient in computation, we represent all the possible positions of a piece within a card as a 3D matrix.
@@ -299,9 +610,18 @@ class Piece:
         for idx, arr in enumerate(self.configurations_array):
             plot_image(arr, f"Configuration {idx}/{len(self.configurations_array)}")
 
+    @property
+    def cube_bits(self):
+        """ the cube as one bitboard per configuration (int64 array), computed once """
+        if self._cube_bits is None:
+            self._cube_bits = self.cube.reshape(self.cube.shape[0], -1).astype(bool) @ BIT_WEIGHTS
+        return self._cube_bits
+
     def validate_cube(self):
+        """ how many configurations cover each cell - the placement density of the piece on a full card """
         summed_matrix = np.sum(self.cube, axis=0)
         # plot_image(summed_matrix, self.name)
+        return summed_matrix
 
     def __repr__(self):
         return f"{self.name} - lvl {self.level}"
@@ -309,6 +629,7 @@ class Piece:
 
 class PieceSquare(Piece):
     """ a subclass for easy access to a basic piece, e.g. a simpe square"""
+    __slots__ = ()
 
     def __init__(self):
         configs = {"name": "square_1", "level": 1, "shape": [[1, 0, 0, 0, 0], [0, 0, 0, 0, 0], [0, 0, 0, 0, 0], [0, 0, 0, 0, 0], [0, 0, 0, 0, 0]]}
@@ -0,0 +1,220 @@
+# ProjectL/definition.py
+import copy
+import hashlib
+import json
+from types import MappingProxyType
+
+import numpy as np
+import yaml
+
+from ProjectL.budget import DecisionBudget
+from ProjectL.classes import Piece, Card, Reward, layout_to_bits, CARD_SIZE
+from ProjectL.density import DensityMaps
+from ProjectL.fit_index import FitIndex
+
+try:
+    from yaml import CSafeLoader as SafeLoader      # libyaml, much faster on big configs
+except ImportError:
+    from yaml import SafeLoader
+
+
+def load_configs(path):
+    """ reads a yaml configs file, with the C loader when pyyaml was built with libyaml """
+    with open(path, 'r') as file:
+        return yaml.load(file, Loader=SafeLoader)
+
+
+def configs_hash(configs_dict):
+    """ stable hex digest of a configs dict, e.g. to tell whether results were produced with the same configs """
+    return hashlib.sha1(json.dumps(configs_dict, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _read_only(array):
+    array.setflags(write=False)
+    return array
+
+
+# cube and cube bitboards of each piece shape, shared by every definition of the process
+_cube_cache = {}
+
+
+def cached_cube(shape):
+    """ (cube, cube_bits) of a piece shape, generated once per process. Both arrays are read only """
+    key = shape.tobytes()
+    cached = _cube_cache.get(key)
+    if cached is None:
+        piece = Piece(configs={"name": None, "level": None, "shape": shape})
+        cached = _cube_cache[key] = (_read_only(piece.cube), _read_only(piece.cube_bits))
+    return cached
+
+
+class _Frozen:
+    """ attributes can only be set in __init__ (before _freeze). Numpy arrays are made read only """
+
+    def _freeze(self):
+        for value in self.__dict__.values():
+            if isinstance(value, np.ndarray):
+                value.setflags(write=False)
+        object.__setattr__(self, "_frozen", True)
+
+    def __setattr__(self, name, value):
+        if getattr(self, "_frozen", False):
+            raise AttributeError(f"{type(self).__name__} is immutable, cannot set '{name}'")
+        object.__setattr__(self, name, value)
+
+    def __setstate__(self, state):
+        # unpickled arrays come back writable
+        self.__dict__.update(state)
+        self._freeze()
+
+
+class PieceType(_Frozen):
+    """ one piece entry of the configs: its shape, cube and cube bitboards, shared by all its Piece instances """
+
+    def __init__(self, piece_confs):
+        for key in ("name", "level", "shape"):
+            if key not in piece_confs:
+                raise ValueError(f"Piece {piece_confs} has no '{key}'")
+        self.name = piece_confs["name"]
+        self.level = piece_confs["level"]
+        self.quantity = piece_confs.get("quantity", 10)
+        self.shape = np.array(piece_confs["shape"])
+        if self.shape.shape != (CARD_SIZE, CARD_SIZE) or not np.isin(self.shape, (0, 1)).all():
+            raise ValueError(f"Piece {self.name}: shape must be a {CARD_SIZE}x{CARD_SIZE} grid of 0/1")
+        self.size = int(np.count_nonzero(self.shape))
+        if not self.size:
+            raise ValueError(f"Piece {self.name} has an empty shape")
+        if not isinstance(self.quantity, int) or self.quantity < 0:
+            raise ValueError(f"Piece {self.name}: quantity must be a non negative int")
+        self.cube, self.cube_bits = cached_cube(self.shape)
+        self._freeze()
+
+    def make(self):
+        """ a new Piece of this type, sharing the read only shape and cube """
+        return Piece.from_prototype(self)
+
+    def __repr__(self):
+        return f"PieceType {self.name} - lvl {self.level} x{self.quantity}"
+
+
+class CardType(_Frozen):
+    """ one card entry of the configs: mask, mask bitboard and reward, shared by all its Card instances """
+
+    def __init__(self, card_confs, piece_names):
+        for key in ("mask", "reward"):
+            if key not in card_confs:
+                raise ValueError(f"Card {card_confs} has no '{key}'")
+        self.mask = np.array(card_confs["mask"], dtype=bool)
+        if self.mask.shape != (CARD_SIZE, CARD_SIZE) or not self.mask.any():
+            raise ValueError(f"Card mask must be a non empty {CARD_SIZE}x{CARD_SIZE} grid")
+        self.mask_bits = layout_to_bits(self.mask)
+        self.points = card_confs["reward"].get("points", 0)
+        self.reward_piece = card_confs["reward"].get("piece")
+        if self.reward_piece is not None and self.reward_piece not in piece_names:
+            raise ValueError(f"Card reward piece '{self.reward_piece}' is not one of the pieces {piece_names}")
+        self.quantity = card_confs.get("quantity", 1)
+        if not isinstance(self.quantity, int) or self.quantity < 0:
+            raise ValueError("Card quantity must be a non negative int")
+        # rewards are never modified, every card of the type shares this one
+        self.reward = Reward(points=self.points, piece=self.reward_piece)
+        self._freeze()
+
+    def make(self):
+        """ a new empty Card of this type """
+        return Card.from_prototype(self)
+
+    def __repr__(self):
+        return f"CardType {self.mask_bits:07x}: {self.points} points x{self.quantity}"
+
+
+class GameDefinition(_Frozen):
+    """ the configs compiled once: validated, immutable, and shared by all the games played with them
+
+        Holds the parameters of the game, a PieceType per piece (with its cube), a CardType per card and the
+        players' entries. Building one from a dict does all the parsing and cube generation, so create it once
+        (e.g. per batch) and give it to every GameManager, or pickle it once to worker processes.
+    """
+
+    def __init__(self, configs_dict):
+        for section in ("game_parameters", "pieces", "cards", "players"):
+            if section not in configs_dict:
+                raise ValueError(f"The configs have no '{section}' section")
+        self.configs = copy.deepcopy(configs_dict)       # the source, for reference only
+        self.config_hash = configs_hash(self.configs)
+        parameters = configs_dict["game_parameters"]
+        self.max_turns = parameters.get("max_turns")
+        if not isinstance(self.max_turns, int) or self.max_turns < 1:
+            raise ValueError("game_parameters.max_turns must be a positive int")
+        self.end_game_on_empty_supply = parameters.get("end_game_on_empty_supply", True)
+        self.stall_idle_rounds = parameters.get("stall_idle_rounds")     # None: idle rounds never end a game
+        if self.stall_idle_rounds is not None and (not isinstance(self.stall_idle_rounds, int)
+                                                   or self.stall_idle_rounds < 1):
+            raise ValueError("game_parameters.stall_idle_rounds must be a positive int")
+        self.tablebase = parameters.get("tablebase")
+        self.value_model = parameters.get("value_model")      # model file of the "learned" strategy
+        # thinking budget of every player's strategy unless its entry has a "budget" of its own (see budget.py)
+        self.decision_budget = self._budget(parameters.get("decision_budget"))
+
+        self.piece_types = tuple(PieceType(piece_confs) for piece_confs in configs_dict["pieces"])
+        self.piece_names = tuple(piece_type.name for piece_type in self.piece_types)
+        if len(set(self.piece_names)) != len(self.piece_names):
+            raise ValueError(f"Duplicated piece names in {self.piece_names}")
+        self.type_index = MappingProxyType({name: i for i, name in enumerate(self.piece_names)})
+        self.piece_sizes = frozenset(piece_type.size for piece_type in self.piece_types)
+        self.card_types = tuple(CardType(card_confs, self.piece_names) for card_confs in configs_dict["cards"])
+        self.n_cards = sum(card_type.quantity for card_type in self.card_types)
+        # placement density of each piece type on each card mask, for move ordering
+        self.density = DensityMaps(self.piece_types, [card_type.mask_bits for card_type in self.card_types])
+        # piece types and configurations filling an empty region exactly
+        self.fit_index = FitIndex(self.piece_types)
+        self.n_pieces = sum(piece_type.quantity for piece_type in self.piece_types)
+        self.players = self._players(configs_dict["players"])
+        self._freeze()
+
+    @staticmethod
+    def _players(players_configs):
+        if not players_configs:
+            raise ValueError("The configs must define at least one player")
+        for player_confs in players_configs:
+            DecisionBudget.from_configs(player_confs.get("budget"))
+        return tuple(MappingProxyType(dict(player_confs)) for player_confs in players_configs)
+
+    @staticmethod
+    def _budget(budget_confs):
+        if not budget_confs:
+            return None
+        DecisionBudget.from_configs(budget_confs)
+        return MappingProxyType(dict(budget_confs))
+
+    @property
+    def n_players(self):
+        return len(self.players)
+
+    def with_players(self, players_configs):
+        """ the same definition with other players, sharing everything else """
+        definition = copy.copy(self)
+        configs = dict(self.configs, players=[dict(player_confs) for player_confs in players_configs])
+        object.__setattr__(definition, "configs", configs)
+        object.__setattr__(definition, "config_hash", configs_hash(configs))
+        object.__setattr__(definition, "players", self._players(players_configs))
+        return definition
+
+    def __reduce__(self):
+        # mapping proxies cannot be pickled, they are sent as dicts
+        state = dict(self.__dict__, type_index=dict(self.type_index), players=tuple(dict(p) for p in self.players),
+                     decision_budget=dict(self.decision_budget) if self.decision_budget else None)
+        return _rebuild, (state,)
+
+
+def _rebuild(state):
+    definition = GameDefinition.__new__(GameDefinition)
+    state.update(type_index=MappingProxyType(state["type_index"]),
+                 players=tuple(MappingProxyType(p) for p in state["players"]),
+                 decision_budget=GameDefinition._budget(state["decision_budget"]))
+    definition.__setstate__(state)
+    return definition
+
+
+def as_definition(configs):
+    """ configs as a GameDefinition, compiled from the dict if needed """
+    return configs if isinstance(configs, GameDefinition) else GameDefinition(configs)
@@ -0,0 +1,76 @@
+# ProjectL/density.py
+import numpy as np
+
+from ProjectL.classes import CARD_SIZE
+
+N_CELLS = CARD_SIZE * CARD_SIZE
+_CELLS = np.arange(N_CELLS, dtype=np.int64)
+UNREACHABLE = np.iinfo(np.int32).max        # density given to cells outside the mask, never the hardest
+
+
+def cells_of(bits):
+    """ (len(bits), 25) bool - the cells covered by each bitboard of bits """
+    return (np.asarray(bits, dtype=np.int64)[:, None] >> _CELLS) & 1 == 1
+
+
+def placement_density(cube_bits, mask_bits):
+    """ per cell (25,) count of the configurations of a cube lying entirely inside the mask that cover it.
+        Over the full card this is the summed cube (see Piece.validate_cube)
+    """
+    cube_bits = np.asarray(cube_bits, dtype=np.int64)
+    inside = cube_bits[cube_bits & ~mask_bits == 0]
+    return cells_of(inside).sum(axis=0).astype(np.int32)
+
+
+class DensityMaps:
+    """ placement density of every piece type on every card mask: how many configurations of the piece can cover
+        each cell of the mask
+
+        Cells few configurations can reach are the hard ones to fill, so placements covering them are worth trying
+        first ("hardest cell first" move ordering, see order_placements). Maps of the masks given are computed
+        up front, others on first use.
+    """
+
+    def __init__(self, piece_types, masks=()):
+        self.cube_bits = [np.asarray(piece_type.cube_bits, dtype=np.int64) for piece_type in piece_types]
+        self.maps = {}
+        for mask_bits in masks:
+            self.maps_of(mask_bits)
+
+    def maps_of(self, mask_bits):
+        """ (piece types, 25) int32 read only densities on a mask """
+        maps = self.maps.get(mask_bits)
+        if maps is None:
+            maps = np.stack([placement_density(bits, mask_bits) for bits in self.cube_bits])
+            maps.setflags(write=False)
+            self.maps[mask_bits] = maps
+        return maps
+
+    def density(self, type_index, mask_bits):
+        """ 5x5 density map of one piece type on a mask """
+        return self.maps_of(mask_bits)[type_index].reshape(CARD_SIZE, CARD_SIZE)
+
+    def cell_density(self, mask_bits, types=None):
+        """ (25,) density of each cell summed over the piece types (all of them, or the type indices given) """
+        maps = self.maps_of(mask_bits)
+        return maps.sum(axis=0) if types is None else maps[list(types)].sum(axis=0)
+
+    def hardest_cell(self, mask_bits, empty_bits, types=None):
+        """ the empty cell the fewest placements can cover, None when the card has no empty cell. A density of 0
+            means no piece can ever fill that cell
+        """
+        if not empty_bits:
+            return None
+        density = np.where(cells_of([empty_bits])[0], self.cell_density(mask_bits, types), UNREACHABLE)
+        return int(np.argmin(density))
+
+    def order_placements(self, placement_bits, mask_bits, empty_bits, types=None):
+        """ indices sorting placements hardest cell first: those covering the hardest empty cell, then by the
+            density of the hardest cell each one covers
+        """
+        cells = cells_of(placement_bits)
+        density = self.cell_density(mask_bits, types)
+        hardest = self.hardest_cell(mask_bits, empty_bits, types)
+        covers_hardest = cells[:, hardest] if hardest is not None else np.zeros(len(cells), dtype=bool)
+        hardest_covered = np.where(cells, density, UNREACHABLE).min(axis=1)
+        return np.lexsort((hardest_covered, ~covers_hardest))
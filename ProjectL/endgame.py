@@ -0,0 +1,168 @@
+# ProjectL/endgame.py
+import numpy as np
+
+from ProjectL.budget import SearchTimeout
+from ProjectL.zobrist import EXACT, LOWER_BOUND, UPPER_BOUND
+
+_rng = np.random.default_rng(0x454E44)
+# keys of the parts of a search node the game hash does not hold: actions left in the turn, rounds left
+_ACTION_KEYS = [int(k) for k in _rng.integers(1, 1 << 63, size=8, dtype=np.int64)]
+_ROUND_KEYS = [int(k) for k in _rng.integers(1, 1 << 63, size=64, dtype=np.int64)]
+_ROOT_KEYS = [int(k) for k in _rng.integers(1, 1 << 63, size=8, dtype=np.int64)]     # values are the root's
+PASS = -1       # move index of passing the rest of the turn
+
+
+def final_score(player):
+    """ the final score of player if the game ended now: completed cards count even before they are paid out """
+    score = player.points
+    for card in player.cards:
+        score += card.reward.points if card.is_full else -card.reward.points
+    return score
+
+
+class EndgameSolver:
+    """ alpha-beta search over the actions left until the end of the game, for the player about to move
+
+        A node is the game position, the player to move, its actions left in the turn and the rounds left. Each
+        player plays up to 3 actions per turn (passing ends the turn early), seats in order, until the last round
+        is over: leaves there are scored exactly (final_score, root player minus its best opponent). Shallower
+        searches of iterative deepening stop on evaluate() instead.
+
+        moves(player) generates the actions searched (e.g. game_objects.candidate_moves). Positions go in the
+        transposition table with bounds and the index of their best move, tried first when the position comes up
+        again: at the next depth, and at the next actions of the turn, since the table is kept for the whole game
+        (call new_game before the first search of a game). Moves are played with GameManager.make_move / unmake_move.
+
+        Approximations: completed cards are not paid out during the search (no reward piece, placed pieces are not
+        given back) and emptying the supply does not trigger the end game.
+    """
+    FILL_WEIGHT = 1.0       # evaluate: per point of a live card, times the part of it that is filled
+
+    def __init__(self, game_manager, moves, table):
+        self.game_manager = game_manager
+        self.moves = moves
+        self.table = table
+        self.players = game_manager.players
+        self.root = None
+        self.deadline = None
+        self.depth_reached = 0
+
+    def new_game(self):
+        self.table.clear()
+
+    def _key(self, actions_left, rounds_left):
+        return (self.game_manager.hash ^ _ACTION_KEYS[actions_left] ^ _ROUND_KEYS[min(rounds_left, 63)]
+                ^ _ROOT_KEYS[self.root.index % 8])
+
+    def _score(self, values):
+        """ value of the root player: its score minus the best score of the others """
+        root = self.root.index
+        return values[root] - max(value for index, value in enumerate(values) if index != root)
+
+    def terminal_value(self):
+        return self._score([final_score(player) for player in self.players])
+
+    def evaluate(self):
+        values = []
+        for player in self.players:
+            value = final_score(player)
+            piece_sizes = self.game_manager.available_piece_sizes(player)
+            for card in player.cards:
+                if not card.is_full and not card.is_dead(piece_sizes):
+                    filled = card.layout_bits.bit_count() / card.mask_bits.bit_count()
+                    value += self.FILL_WEIGHT * card.reward.points * filled
+            values.append(value)
+        return self._score(values)
+
+    def _next(self, side, actions_left, rounds_left):
+        """ the node after side used an action (actions_left is then the actions it has left) or passed (0) """
+        if actions_left > 0:
+            return side, actions_left, rounds_left
+        side += 1
+        if side == len(self.players):
+            return 0, 3, rounds_left - 1
+        return side, 3, rounds_left
+
+    def _child(self, side, actions_left, rounds_left, depth, alpha, beta):
+        """ value of the node reached after side moved, switching the hash side when the turn passes """
+        next_side, next_actions, next_rounds = self._next(side, actions_left, rounds_left)
+        zobrist = self.game_manager.zobrist
+        if next_side != side:
+            zobrist.set_side(next_side)
+        try:
+            return self._alphabeta(next_side, next_actions, next_rounds, depth - 1, alpha, beta)
+        finally:
+            if next_side != side:
+                zobrist.set_side(side)
+
+    def _alphabeta(self, side, actions_left, rounds_left, depth, alpha, beta):
+        self.deadline.tick()
+        if rounds_left <= 0:
+            return self.terminal_value()
+        if depth == 0:
+            return self.evaluate()
+        key = self._key(actions_left, rounds_left)
+        entry = self.table.probe(key)
+        best_index = PASS
+        if entry is not None:
+            value, entry_depth, flag, best_index = entry
+            if entry_depth >= depth and (flag == EXACT or (flag == LOWER_BOUND and value >= beta)
+                                         or (flag == UPPER_BOUND and value <= alpha)):
+                return value
+        value, best_index = self._search_moves(side, actions_left, rounds_left, depth, alpha, beta, best_index)
+        flag = UPPER_BOUND if value <= alpha else LOWER_BOUND if value >= beta else EXACT
+        self.table.store(key, value, depth, flag, best_index)
+        return value
+
+    def _search_moves(self, side, actions_left, rounds_left, depth, alpha, beta, first=PASS):
+        """ (value, move index) of the best move of the node, trying the move index first first """
+        player = self.players[side]
+        maximizing = player is self.root
+        moves = self.moves(player)
+        order = list(range(len(moves))) + [PASS]
+        if first != PASS and first < len(moves):
+            order.remove(first)
+            order.insert(0, first)
+        best_value = -np.inf if maximizing else np.inf
+        best_index = PASS
+        for index in order:
+            if index == PASS:
+                value = self._child(side, 0, rounds_left, depth, alpha, beta)
+            else:
+                move = moves[index]
+                if not self.game_manager.make_move(player, move):
+                    continue
+                try:
+                    value = self._child(side, actions_left - 1, rounds_left, depth, alpha, beta)
+                finally:
+                    self.game_manager.unmake_move(player, move)
+            if (value > best_value) if maximizing else (value < best_value):
+                best_value, best_index = value, index
+            if maximizing:
+                alpha = max(alpha, value)
+            else:
+                beta = min(beta, value)
+            if alpha >= beta:
+                break
+        return best_value, best_index
+
+    def solve(self, player, actions_left, rounds_left, deadline):
+        """ the move player should play (an action, None to pass), from the deepest search completed before the
+            deadline. rounds_left counts the current round. depth_reached is 0 when not even one ply completed
+        """
+        self.root = player
+        self.deadline = deadline
+        self.depth_reached = 0
+        self.table.new_search()
+        moves = self.moves(player)
+        best_index = 0 if moves else PASS
+        max_depth = actions_left + 3 * len(self.players) * rounds_left
+        for depth in range(1, max_depth + 1):
+            try:
+                _, index = self._search_moves(player.index, actions_left, rounds_left, depth, -np.inf, np.inf,
+                                              best_index)
+            except SearchTimeout:
+                break
+            best_index = index
+            self.depth_reached = depth
+        return None if best_index == PASS else moves[best_index]
@@ -0,0 +1,359 @@
+# ProjectL/env.py
+import multiprocessing as mp
+import random
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from ProjectL.classes import TakePiece, PlacePiece, TakeCard, MAX_CARDS_HELD, FULL_BITS, CARD_SIZE
+from ProjectL.definition import as_definition
+from ProjectL.game_objects import GameManager, Strategy
+
+
+class ExternalStrat(Strategy):
+    """Strategy of a player driven from outside the game loop (e.g. by ProjectLEnv.step). play_turn does nothing."""
+
+    def __init__(self, player, logger=None, **kwargs):
+        super().__init__(player, logger=logger, **kwargs)
+
+    def play_turn(self):
+        pass
+
+
+class ActionSpace:
+    """ discrete action ids of a configs:
+
+        0 .. T-1                    take a piece of type t from the bank
+        T                           take a card
+        T+1 .. T+1+T*S*C-1          place a piece of type t on the card in slot s, in cube configuration c
+        T+1+T*S*C                   pass (end the turn)
+
+        with T piece types, S = MAX_CARDS_HELD card slots and C the largest number of cube configurations.
+    """
+
+    def __init__(self, configs_dict):
+        self.prototypes = as_definition(configs_dict).piece_types
+        self.piece_names = [piece.name for piece in self.prototypes]
+        self.n_types = len(self.prototypes)
+        self.n_slots = MAX_CARDS_HELD
+        self.n_configurations = max(piece.cube.shape[0] for piece in self.prototypes)
+        self.take_card = self.n_types
+        self.place_offset = self.n_types + 1
+        self.pass_action = self.place_offset + self.n_types * self.n_slots * self.n_configurations
+        self.n = self.pass_action + 1
+        # cube bitboards padded with FULL_BITS (always blocked) to n_configurations
+        self.cube_bits = np.full((self.n_types, self.n_configurations), FULL_BITS, dtype=np.int64)
+        for type_index, piece in enumerate(self.prototypes):
+            self.cube_bits[type_index, :len(piece.cube_bits)] = piece.cube_bits
+
+    def decode_place(self, action_id):
+        """ (type index, card slot, cube index) of a placement action id """
+        type_index, rest = divmod(action_id - self.place_offset, self.n_slots * self.n_configurations)
+        slot, cube_index = divmod(rest, self.n_configurations)
+        return type_index, slot, cube_index
+
+
+def observation_spec(action_space, n_players):
+    """ name -> (shape, dtype) of the observation arrays """
+    return {
+        "card_layouts": ((action_space.n_slots, CARD_SIZE, CARD_SIZE), np.int8),
+        "card_masks": ((action_space.n_slots, CARD_SIZE, CARD_SIZE), np.int8),
+        "inventory": ((n_players, action_space.n_types), np.int16),    # row 0 is the agent, then seat order
+        "bank": ((action_space.n_types,), np.int16),
+        "game": ((4,), np.int16),       # turn number, actions left, cards in supply, end game triggered
+    }
+
+
+class ProjectLEnv:
+    """ Gym-style environment: one agent player against the strategies of the other players of the configs
+
+        reset(seed) -> observation, step(action_id) -> observation, reward, done, info. The reward is the change
+        of the agent's points, plus the unfinished card penalty when the game ends, so the rewards of a game sum
+        to the agent's final score.
+
+        Observations are numpy arrays filled in place: the same arrays are returned after every step. Pass
+        buffers (e.g. slices of a VectorEnv batch) to have them written somewhere else.
+    """
+
+    def __init__(self, configs_dict, agent_seat=0, buffers=None, mask_buffer=None, action_space=None):
+        self.definition = as_definition(configs_dict)
+        self.agent_seat = agent_seat
+        self.action_space = action_space or ActionSpace(self.definition)
+        self.n_players = self.definition.n_players
+        spec = observation_spec(self.action_space, self.n_players)
+        self.observation = buffers if buffers is not None else {
+            name: np.zeros(shape, dtype=dtype) for name, (shape, dtype) in spec.items()}
+        self.action_mask = mask_buffer if mask_buffer is not None else np.zeros(self.action_space.n, dtype=bool)
+        self._place_mask = self.action_mask[self.action_space.place_offset:self.action_space.pass_action].reshape(
+            self.action_space.n_types, self.action_space.n_slots, self.action_space.n_configurations)
+        self._seat_order = None
+        self.game_manager = None
+        self.agent = None
+        self.actions_left = 0
+        self.done = True
+
+    def reset(self, seed=None):
+        if seed is not None:
+            random.seed(seed)
+        self.game_manager = GameManager(self.definition)
+        self.agent = self.game_manager.players[self.agent_seat]
+        self.agent.set_strategy(ExternalStrat(player=self.agent))
+        # inventory rows: agent first, then the others in seat order
+        self._seat_order = [self.agent_seat] + [i for i in range(self.n_players) if i != self.agent_seat]
+        self.done = False
+        if self.game_manager.start_round():
+            self._play_seats(range(self.agent_seat))
+            self.actions_left = 3
+        else:
+            self._end_game()
+        self._write_observation()
+        return self.observation
+
+    def _play_seats(self, seats):
+        players = self.game_manager.players
+        for seat in seats:
+            self.game_manager.play_turn_of(players[seat])
+
+    def _end_game(self):
+        self.game_manager.finish()
+        self.done = True
+        self.actions_left = 0
+
+    def _advance(self):
+        """ ends the agent's turn, plays the other players until it is the agent's turn again or the game ends """
+        game_manager = self.game_manager
+        game_manager.end_turn_of(self.agent)
+        self._play_seats(range(self.agent_seat + 1, self.n_players))
+        game_manager.end_round()
+        if not game_manager.start_round():
+            self._end_game()
+            return
+        self._play_seats(range(self.agent_seat))
+        self.actions_left = 3
+        game_manager.zobrist.set_side(self.agent.index)
+
+    def _build_action(self, action_id):
+        space = self.action_space
+        game_manager = self.game_manager
+        if action_id < space.n_types:
+            return TakePiece(pieces=self.agent.pieces, piece_name=space.piece_names[action_id],
+                             game_manager=game_manager)
+        if action_id == space.take_card:
+            return TakeCard(cards=self.agent.cards, game_manager=game_manager)
+        type_index, slot, cube_index = space.decode_place(action_id)
+        name = space.piece_names[type_index]
+        piece = next(p for p in self.agent.pieces if p.name == name)
+        return PlacePiece(piece, self.agent.cards[slot], pieces=self.agent.pieces,
+                          configuration=space.prototypes[type_index].cube[cube_index], game_manager=game_manager)
+
+    def step(self, action_id):
+        if self.done:
+            raise RuntimeError("step() called on a finished game, call reset()")
+        strategy = self.agent.strategy
+        points_before = self.agent.points
+        info = {"illegal": False}
+        self.legal_action_mask()
+        if action_id == self.action_space.pass_action:
+            self.actions_left = 0
+        elif not self.action_mask[action_id]:
+            info["illegal"] = True
+            strategy._record_wasted()
+            self.actions_left -= 1
+        else:
+            strategy._perform_action(self._build_action(action_id))
+            self.actions_left -= 1
+
+        if self.actions_left <= 0:
+            self._advance()
+        reward = self.agent.points - points_before
+        if self.done:
+            reward += self.agent.final_score - self.agent.points
+            info["final_score"] = self.agent.final_score
+        self._write_observation()
+        return self.observation, float(reward), self.done, info
+
+    def legal_action_mask(self):
+        """ bool array over the action ids, True for the actions the agent can take now (filled in place) """
+        mask = self.action_mask
+        mask[:] = False
+        if self.done:
+            return mask
+        space = self.action_space
+        zobrist = self.game_manager.zobrist
+        mask[:space.n_types] = np.asarray(zobrist.bank) > 0
+        mask[space.take_card] = TakeCard(cards=self.agent.cards, game_manager=self.game_manager).is_action_valid()
+        held = np.asarray(zobrist.inventory[self.agent.index]) > 0
+        cards = self.agent.cards
+        if cards and held.any():
+            blocked = np.full(space.n_slots, FULL_BITS, dtype=np.int64)
+            for slot, card in enumerate(cards[:space.n_slots]):
+                if not card.is_full:
+                    blocked[slot] = (~card.mask_bits & FULL_BITS) | card.layout_bits
+            np.equal(space.cube_bits[:, None, :] & blocked[None, :, None], 0, out=self._place_mask)
+            self._place_mask &= held[:, None, None]
+        mask[space.pass_action] = True
+        return mask
+
+    def _write_observation(self):
+        obs = self.observation
+        game_manager = self.game_manager
+        zobrist = game_manager.zobrist
+        obs["card_layouts"].fill(0)
+        obs["card_masks"].fill(0)
+        for slot, card in enumerate(self.agent.cards[:self.action_space.n_slots]):
+            obs["card_layouts"][slot] = card.layout
+            obs["card_masks"][slot] = card.mask
+        for row, seat in enumerate(self._seat_order):
+            obs["inventory"][row] = zobrist.inventory[seat]
+        obs["bank"][:] = zobrist.bank
+        obs["game"][:] = (game_manager.current_turn_number, self.actions_left, len(game_manager.cards),
+                          game_manager.game_state.end_game_triggered)
+
+
+class VectorEnv:
+    """ K environments stepped together in one process. Observations, action masks, rewards and dones live in
+        preallocated batch arrays; each environment writes into its own row. Finished games are reset
+        automatically (the final observation is lost, the final score is in infos).
+    """
+
+    def __init__(self, configs_dict, n_envs, agent_seat=0, buffers=None, seed=0):
+        self.n_envs = n_envs
+        definition = as_definition(configs_dict)
+        self.action_space = ActionSpace(definition)
+        spec = observation_spec(self.action_space, definition.n_players)
+        if buffers is None:
+            buffers = allocate_batch(spec, self.action_space, n_envs)
+        self.buffers = buffers
+        self.observations = {name: buffers[name] for name in spec}
+        self.action_masks = buffers["action_mask"]
+        self.rewards = buffers["reward"]
+        self.dones = buffers["done"]
+        self.envs = [ProjectLEnv(definition, agent_seat,
+                                 buffers={name: self.observations[name][i] for name in spec},
+                                 mask_buffer=self.action_masks[i], action_space=self.action_space)
+                     for i in range(n_envs)]
+        self.next_seed = seed
+
+    def reset(self, seeds=None):
+        for i, env in enumerate(self.envs):
+            env.reset(seeds[i] if seeds is not None else self._seed())
+            env.legal_action_mask()
+        return self.observations
+
+    def _seed(self):
+        self.next_seed += 1
+        return self.next_seed - 1
+
+    def step(self, actions):
+        infos = []
+        for i, env in enumerate(self.envs):
+            _, reward, done, info = env.step(int(actions[i]))
+            self.rewards[i] = reward
+            self.dones[i] = done
+            if done:
+                env.reset(self._seed())
+            env.legal_action_mask()
+            infos.append(info)
+        return self.observations, self.rewards, self.dones, infos
+
+    def legal_action_mask(self):
+        return self.action_masks
+
+
+def allocate_batch(spec, action_space, n_envs, create=np.zeros):
+    """ batch arrays for n_envs environments: the observation fields, action_mask, reward and done """
+    buffers = {name: create((n_envs,) + shape, dtype) for name, (shape, dtype) in spec.items()}
+    buffers["action_mask"] = create((n_envs, action_space.n), bool)
+    buffers["reward"] = create((n_envs,), np.float32)
+    buffers["done"] = create((n_envs,), bool)
+    return buffers
+
+
+def _shard_worker(connection, definition, shm_names, layout, start, stop, agent_seat, seed):
+    """ hosts envs [start, stop) of a SubprocVectorEnv, writing straight into the shared batch arrays """
+    blocks = [shared_memory.SharedMemory(name=name) for name in shm_names]
+    buffers = {name: np.ndarray(shape, dtype=dtype, buffer=block.buf)[start:stop]
+               for block, (name, shape, dtype) in zip(blocks, layout)}
+    vector_env = VectorEnv(definition, stop - start, agent_seat, buffers=buffers, seed=seed)
+    try:
+        while True:
+            command, data = connection.recv()
+            if command == "reset":
+                vector_env.reset(data)
+                connection.send(None)
+            elif command == "step":
+                _, _, _, infos = vector_env.step(data)
+                connection.send(infos)
+            else:
+                break
+    finally:
+        del vector_env, buffers
+        for block in blocks:
+            block.close()
+        connection.close()
+
+
+class SubprocVectorEnv:
+    """ VectorEnv sharded over worker processes. The batch arrays are in shared memory: workers write their
+        rows in place and only the action ids and infos go through the pipes.
+    """
+
+    def __init__(self, configs_dict, n_envs, n_workers=2, agent_seat=0, seed=0):
+        self.n_envs = n_envs
+        definition = as_definition(configs_dict)
+        self.action_space = ActionSpace(definition)
+        spec = observation_spec(self.action_space, definition.n_players)
+        layout = [(name, (n_envs,) + shape, np.dtype(dtype)) for name, (shape, dtype) in spec.items()]
+        layout += [("action_mask", (n_envs, self.action_space.n), np.dtype(bool)),
+                   ("reward", (n_envs,), np.dtype(np.float32)), ("done", (n_envs,), np.dtype(bool))]
+        self.blocks = [shared_memory.SharedMemory(create=True, size=max(1, int(np.prod(shape)) * dtype.itemsize))
+                       for _, shape, dtype in layout]
+        self.buffers = {name: np.ndarray(shape, dtype=dtype, buffer=block.buf)
+                        for block, (name, shape, dtype) in zip(self.blocks, layout)}
+        self.observations = {name: self.buffers[name] for name in spec}
+        self.action_masks = self.buffers["action_mask"]
+        self.rewards = self.buffers["reward"]
+        self.dones = self.buffers["done"]
+
+        bounds = np.linspace(0, n_envs, n_workers + 1).astype(int)
+        self.shards = list(zip(bounds[:-1], bounds[1:]))
+        self.connections = []
+        self.processes = []
+        for worker, (start, stop) in enumerate(self.shards):
+            parent, child = mp.Pipe()
+            process = mp.Process(target=_shard_worker, daemon=True,
+                                 args=(child, definition, [b.name for b in self.blocks], layout, start, stop,
+                                       agent_seat, seed + worker * 1_000_000))
+            process.start()
+            child.close()
+            self.connections.append(parent)
+            self.processes.append(process)
+
+    def reset(self, seeds=None):
+        for connection, (start, stop) in zip(self.connections, self.shards):
+            connection.send(("reset", None if seeds is None else list(seeds[start:stop])))
+        for connection in self.connections:
+            connection.recv()
+        return self.observations
+
+    def step(self, actions):
+        actions = np.asarray(actions)
+        for connection, (start, stop) in zip(self.connections, self.shards):
+            connection.send(("step", actions[start:stop]))
+        infos = []
+        for connection in self.connections:
+            infos.extend(connection.recv())
+        return self.observations, self.rewards, self.dones, infos
+
+    def legal_action_mask(self):
+        return self.action_masks
+
+    def close(self):
+        for connection in self.connections:
+            connection.send(("close", None))
+            connection.close()
+        for process in self.processes:
+            process.join()
+        for block in self.blocks:
+            block.close()
+            block.unlink()
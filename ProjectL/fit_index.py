@@ -0,0 +1,53 @@
+# ProjectL/fit_index.py
+from ProjectL.classes import CARD_SIZE, empty_regions
+
+_COLUMN_BITS = tuple(sum(1 << (row * CARD_SIZE + col) for row in range(CARD_SIZE)) for col in range(CARD_SIZE))
+
+
+def canonical_region(bits):
+    """ region bitboard translated to the top left corner: equal for regions of the same shape wherever they are.
+        Every cell is at or right of the leftmost column, so shifting the whole int never wraps a row
+    """
+    if not bits:
+        return 0
+    low_row = ((bits & -bits).bit_length() - 1) // CARD_SIZE
+    low_col = next(col for col in range(CARD_SIZE) if bits & _COLUMN_BITS[col])
+    return bits >> (low_row * CARD_SIZE + low_col)
+
+
+class FitIndex:
+    """ which piece types cover a region of empty cells exactly - "which of my pieces fills this hole"
+
+        Built once from the cubes of the piece types: every configuration is indexed by its bitboard (the exact
+        placements filling a region where it is) and by its canonical shape (the types that fit a region of that
+        shape anywhere). Both lookups are a dict access, no cube is scanned.
+    """
+
+    def __init__(self, piece_types):
+        placements = {}
+        shapes = {}
+        for type_index, piece_type in enumerate(piece_types):
+            for cube_index, bits in enumerate(piece_type.cube_bits.tolist()):
+                placements.setdefault(bits, []).append((type_index, cube_index))
+                shapes.setdefault(canonical_region(bits), set()).add(type_index)
+        self.placements = {bits: tuple(fits) for bits, fits in placements.items()}
+        self.shapes = {shape: frozenset(types) for shape, types in shapes.items()}
+
+    def placements_for(self, region_bits):
+        """ (type index, cube index) of every configuration covering exactly region_bits """
+        return self.placements.get(region_bits, ())
+
+    def types_for(self, region_bits):
+        """ indices of the piece types with an orientation of exactly the shape of region_bits """
+        return self.shapes.get(canonical_region(region_bits), frozenset())
+
+    def exact_fits(self, empty_bits, types=None):
+        """ (region, type index, cube index) of the placements filling one of the empty regions entirely, only of
+            the piece types given (a set of type indices) if any
+        """
+        fits = []
+        for region in empty_regions(empty_bits):
+            for type_index, cube_index in self.placements.get(region, ()):
+                if types is None or type_index in types:
+                    fits.append((region, type_index, cube_index))
+        return fits
@@ -1,93 +1,170 @@
 import string
 import random
-from ProjectL.classes import TakePiece, PlacePiece, UpgradePiece, TakeCard, Master, Card, Piece, PieceSquare
+import numpy as np
+from ProjectL.classes import TakePiece, PlacePiece, UpgradePiece, TakeCard, Master, PieceSquare, \
+    is_layout_dead, MAX_CARDS_HELD
+from ProjectL.budget import DecisionBudget, Deadline, SearchTimeout
+from ProjectL.endgame import EndgameSolver
+from ProjectL.stats import GameStatistics, END_MAX_TURNS, END_FINAL_ROUND, END_STALLED, END_REASONS
+from ProjectL.zobrist import ZobristHash, TranspositionTable, shared_table
+from ProjectL.tablebase import load_tablebase, IMPOSSIBLE
+from ProjectL.value_model import StateFeatures, load_model, PLACE, TAKE_PIECE, TAKE_CARD
+from ProjectL.definition import as_definition
 import logging
 
+# strategies players can be given by name in the "players" section of the configs, see register_strategy
+STRATEGIES = {}
+DEFAULT_STRATEGY = "take_piece"
+
+
+def register_strategy(name):
+    """ class decorator - makes a Strategy subclass available under name in the configs """
+    def decorator(strategy_class):
+        STRATEGIES[name] = strategy_class
+        strategy_class.registry_name = name
+        return strategy_class
+    return decorator
+
+
+def get_strategy(name):
+    """ returns the Strategy subclass registered under name """
+    try:
+        return STRATEGIES[name]
+    except KeyError:
+        raise ValueError(f"Unknown strategy '{name}'. Available strategies: {sorted(STRATEGIES)}") from None
+
 
 class GameState:
-    """ encapsulates the current state of a game """
+    """ encapsulates the current state of a game
+
+        The game ends after max_turns, or earlier once the end game has been triggered: the round in which it
+        was triggered is completed and one final round is played.
+    """
 
     def __init__(self, current_turn_number=1, max_turns=2, logger=None):
         self.current_turn_number = current_turn_number
         self.max_turns = max_turns
+        self.last_turn = max_turns
+        self.end_game_triggered = False
         self.logger = logger or logging.getLogger('projectL')
 
     def next_turn(self):
         """ """
         self.current_turn_number += 1
-        self.logger.debug(f"{self}",
-                          extra={"normal": False})
+        self.logger.debug("%s", self, extra={"normal": False})
+
+    def trigger_end_game(self):
+        """ the current round is completed, then the next one is the final round """
+        if not self.end_game_triggered:
+            self.end_game_triggered = True
+            self.last_turn = min(self.max_turns, self.current_turn_number + 1)
+            self.logger.info("End game triggered on turn %d, final round is turn %d",
+                             self.current_turn_number, self.last_turn, extra={"normal": True})
 
     def is_game_running(self):
         """ checks if the game is running or over"""
-        is_running = self.current_turn_number <= self.max_turns
+        is_running = self.current_turn_number <= self.last_turn
         if not is_running:
-            self.logger.info(f"Game over: reached maximum turns {self.max_turns}",
+            self.logger.info("Game over: reached last turn %s/%s", self.last_turn, self.max_turns,
                              extra={"normal": True})
         return is_running
 
     def __repr__(self):
-        return f"Game progress: {self.current_turn_number}/{self.max_turns}"
+        return f"Game progress: {self.current_turn_number}/{self.last_turn}"
 
 class GameManager:
-    """ the main game engine that runs the game. """
+    """ the main game engine that runs the game.
+
+        configs_dict is the configs dict or a GameDefinition compiled from it (see definition.py) - pass a
+        definition when playing many games so the configs are parsed only once.
 
-    def __init__(self, configs_dict, logger=None):
-        self.configs = configs_dict
-        self.configs_pieces = configs_dict["pieces"]
-        self.configs_cards = configs_dict["cards"]
+        Players are built from the "players" section of the configs, in seat order. Each entry may name its
+        strategy (a key of STRATEGIES, DEFAULT_STRATEGY otherwise) and give it a thinking "budget" (see budget.py,
+        game_parameters.decision_budget otherwise).
+
+        memory_profiler: optional memory.MemoryProfiler, sampled once the game is set up and after every round
+        recorder: optional selfplay.GameRecorder, told about every successful action of the players
+    """
+
+    def __init__(self, configs_dict, logger=None, memory_profiler=None, recorder=None):
+        self.memory_profiler = memory_profiler
+        self.recorder = recorder
+        self.definition = definition = as_definition(configs_dict)
+        self.configs = definition.configs
         self.logger = logger or logging.getLogger('projectL')
-        self.game_state = GameState(current_turn_number=1, max_turns=configs_dict["game_parameters"]["max_turns"], logger=self.logger)
+        self.game_state = GameState(current_turn_number=1, max_turns=definition.max_turns, logger=self.logger)
 
         # Set up logger
 
         self.pieces = []
         self.piece_bank = {}
+        self.bank_count = 0         # pieces left in the bank, all types together
+        self.end_reason = None      # index in stats.END_REASONS once the game is over
+        self.moves_made = 0         # successful actions, all players together
+        self._moves_at_round_start = 0
+        self.idle_rounds = 0        # consecutive rounds without any successful action
+        # opt-in heuristic (None: off), see is_stalled
+        self.stall_idle_rounds = definition.stall_idle_rounds
+        # optional precomputed card completability (see tablebase.py), shared by all games of the process
+        self.tablebase = load_tablebase(definition.tablebase) if definition.tablebase else None
         self.actions = [TakePiece, PlacePiece, TakeCard]
         self.cards = []
 
-        # players        TODO: ugly, refactor & makes a more robust initialization
-        self.player_1 = Player(name=configs_dict["players"][0]["name"], actions=self.actions, logger=self.logger, game_manager=self)
-        self.player_1.set_strategy(TakePieceStrat(player=self.player_1, logger=self.logger))
-        self.player_2 = Player(name=configs_dict["players"][1]["name"], actions=self.actions, logger=self.logger, game_manager=self)
-        self.player_2.set_strategy(TakePieceStrat(player=self.player_2, logger=self.logger))
+        # when True, emptying the card supply triggers the end game (see GameState.trigger_end_game)
+        self.end_game_on_empty_supply = definition.end_game_on_empty_supply
+
+        self.players = self.create_players(definition.players)
+        self.stats = GameStatistics(len(self.players))
 
         self.game_init()
 
+    def create_players(self, players_configs):
+        """ one Player per entry of the configs, seated in the order they are listed """
+        if not players_configs:
+            raise ValueError("The configs must define at least one player")
+        players = []
+        for index, player_confs in enumerate(players_configs):
+            player = Player(name=player_confs.get("name"), actions=self.actions, logger=self.logger, game_manager=self)
+            player.index = index
+            strategy_class = get_strategy(player_confs.get("strategy", DEFAULT_STRATEGY))
+            budget = DecisionBudget.from_configs(player_confs.get("budget", self.definition.decision_budget))
+            player.set_strategy(strategy_class(player=player, logger=self.logger, budget=budget))
+            players.append(player)
+        return players
+
+    @property
+    def player_1(self):
+        return self.players[0]
+
+    @property
+    def player_2(self):
+        return self.players[1]
+
     def game_init(self):
         """ setup for the beginning of the game
         """
         self.logger.debug("Initializing game", extra={"normal": False})
         self.instantiate_elements()
+        self.zobrist = ZobristHash.for_game(self)
+        if self.memory_profiler is not None:
+            self.memory_profiler.sample()
 
     def instantiate_elements(self):
         """
         """
         self.logger.debug("Creating game pieces", extra={"normal": False})
-        # self.pieces = []
-        # Create the piece bank
-        for piece_confs in self.configs_pieces:
-            piece_name = piece_confs["name"]
-            level = piece_confs["level"]
-            quantity = piece_confs.get("quantity", 10)
-
-            # Create a prototype piece
-            prototype_piece = Piece(configs=piece_confs)
-            self.logger.debug(f"Created piece prototype: {prototype_piece}",
+        # Create the piece bank: the pieces of a type share the shape and cube of its prototype
+        for piece_type in self.definition.piece_types:
+            self.piece_bank[piece_type.name] = [piece_type.make() for _ in range(piece_type.quantity)]
+            self.bank_count += piece_type.quantity
+            self.logger.debug("Created %d pieces of %s", piece_type.quantity, piece_type,
                               extra={"normal": False, "verbose": True})
 
-            # Add multiple instances to the bank
-            self.piece_bank[piece_name] = []
-            for _ in range(quantity):
-                # Create a new instance with the same configuration
-                p = Piece(configs=piece_confs)
-                self.piece_bank[piece_name].append(p)
-
-
-        for card_confs in self.configs_cards:
-            card = Card(configs=card_confs)
-            self.cards.append(card)
-            self.logger.debug(f"Created card: {card}",
+        # the card supply players draw from with TakeCard
+        for card_type in self.definition.card_types:
+            for _ in range(card_type.quantity):
+                self.cards.append(card_type.make())
+            self.logger.debug("Created %d cards of %s", card_type.quantity, card_type,
                               extra={"normal": False, "verbose": True})
 
     def get_piece(self, piece_name=None):
@@ -111,42 +188,177 @@ class GameManager:
 
         # Check if the requested piece type is available
         if piece_name not in self.piece_bank or not self.piece_bank[piece_name]:
-            self.logger.debug(f"No {piece_name} pieces available in the bank",
+            self.logger.debug("No %s pieces available in the bank", piece_name,
                               extra={"normal": False})
             return None
 
         # Take a piece from the bank
         piece = self.piece_bank[piece_name].pop()
-        self.logger.debug(f"Taking {piece_name} from bank. Remaining: {len(self.piece_bank[piece_name])}",
+        self.bank_count -= 1
+        self.logger.debug("Taking %s from bank. Remaining: %s", piece_name, len(self.piece_bank[piece_name]),
                           extra={"normal": False})
         return piece
 
+    def available_piece_sizes(self, player=None):
+        """ sizes of the piece types left in the bank, plus those held by player. Used for dead card detection """
+        sizes = {pieces[0].size for pieces in self.piece_bank.values() if pieces}
+        if player is not None:
+            sizes.update(piece.size for piece in player.pieces)
+        return frozenset(sizes)
+
+    def make_move(self, player, action, *args):
+        """ performs an action of player and updates the game hash. Returns the result of perform_action """
+        result = action.perform_action(*args)
+        if result:
+            self.zobrist.make(player, action)
+            self.moves_made += 1
+        return result
+
+    def unmake_move(self, player, action):
+        """ undoes the last make_move of action """
+        self.zobrist.unmake(player, action)
+        action.undo()
+        self.moves_made -= 1
 
-    def run(self):
-        """ loop that runs the game """
-        self.logger.info(f"Game started with players: {self.player_1}, {self.player_2}", extra={"normal": True})
+    @property
+    def hash(self):
+        """ 64-bit Zobrist hash of the current game state """
+        return self.zobrist.key
+
+    def return_piece(self, piece):
+        """ puts a piece back on top of its pile in the bank - the inverse of get_piece """
+        self.piece_bank[piece.name].append(piece)
+        self.bank_count += 1
+
+    def return_card(self, card):
+        """ puts a card back on top of the supply - the inverse of get_card """
+        self.cards.append(card)
+
+    def get_card(self):
+        """Get a card from the card supply
+
+        Returns:
+            A card from the supply, or None if the supply is empty
+        """
+        if not self.cards:
+            self.logger.debug("No cards left in the supply", extra={"normal": False})
+            return None
+        card = self.cards.pop()
+        self.logger.debug("Taking card from supply. Remaining: %s", len(self.cards), extra={"normal": False})
+        return card
+
+    def finalize_scores(self):
+        """ computes the final score of every player once the game is over.
 
-        while self.is_game_running:
-            self.logger.info(f"====== Playing turn {self.current_turn_number}======",  extra={"normal": True})
+            final score = points from completed cards - points of the cards left unfinished
+        """
+        for player in self.players:
+            penalty = sum(card.reward.points for card in player.cards if not card.is_full)
+            player.final_score = player.points - penalty
+            self.stats.final_score[player.index] = player.final_score
+            self.logger.info("%s final score: %d (%d points, -%d for unfinished cards)", player.name,
+                             player.final_score, player.points, penalty, extra={"normal": True})
+        self.stats.turns = self.current_turn_number - 1
+
+    def run(self):
+        """ loop that runs the game - every player plays one turn per round, in seat order
 
-            self.logger.debug(f"{self.player_1.name}'s turn",  extra={"normal": False})
-            self.player_1.play_turn()
+            Log messages use lazy %-formatting so that a turn does not build any string unless it is logged.
+        """
+        players = tuple(self.players)
+        self.logger.info("Game started with players: %s", players, extra={"normal": True})
 
-            self.logger.debug(f"{self.player_2.name}'s turn", extra={"normal": False})
-            self.player_2.play_turn()
+        while self.start_round():
+            for player in players:
+                self.play_turn_of(player)
+            self.end_round()
 
-            # update turn number, but for debug check the state of the game
-            if self.current_turn_number % 10 == 0:
-                self.logger.info(f"Player state: {self.player_1}", extra={"normal": True})
-                self.logger.info(f"Player state: {self.player_2}", extra={"normal": True})
-            self.game_state.next_turn()
+        self.finish()
 
-        self.logger.info("Game ended after %d turns", self.current_turn_number - 1, extra={"normal": True})
+    def start_round(self):
+        """ returns False when the game is over (or stalled) instead of starting a new round """
+        if not self.is_game_running:
+            return False
+        if self.is_stalled():
+            self.end_stalled()
+            return False
+        self.logger.info("====== Playing turn %d======", self.game_state.current_turn_number, extra={"normal": True})
+        self._moves_at_round_start = self.moves_made
+        return True
+
+    def play_turn_of(self, player):
+        """ lets player play its turn, then checks the end game trigger """
+        self.logger.debug("%s's turn", player.name, extra={"normal": False})
+        self.zobrist.set_side(player.index)
+        player.play_turn()
+        self.end_turn_of(player)
+
+    def end_turn_of(self, player):
+        if self.end_game_on_empty_supply and not self.cards:
+            self.game_state.trigger_end_game()
+
+    def end_round(self):
+        game_state = self.game_state
+        self.idle_rounds = self.idle_rounds + 1 if self.moves_made == self._moves_at_round_start else 0
+
+        # update turn number, but for debug check the state of the game
+        if game_state.current_turn_number % 10 == 0:
+            for player in self.players:
+                self.logger.info("Player state: %s", player, extra={"normal": True})
+        game_state.next_turn()
+        if self.memory_profiler is not None:
+            self.memory_profiler.sample()
+
+    def finish(self):
+        """ records why the game ended and computes the final scores """
+        game_state = self.game_state
+        if self.end_reason is None:
+            self.end_reason = END_FINAL_ROUND if game_state.last_turn < game_state.max_turns else END_MAX_TURNS
+        self.stats.end_reason = self.end_reason
+        self.logger.info("Game ended after %d turns (%s)", self.current_turn_number - 1, END_REASONS[self.end_reason],
+                         extra={"normal": True})
+        self.finalize_scores()
+
+    def is_stalled(self):
+        """ True when playing on cannot change the game anymore, looking only at cheap counters: no card can be
+            completed anymore. The bank is empty (pieces can then only come back from completed cards) and no player
+            holds a piece together with a card it could still complete, or with a free card slot while cards are
+            left in the supply. Upgrading is not implemented so it never unstalls a game.
+
+            With game_parameters.stall_idle_rounds set, a game where nobody made a single successful action for that
+            many rounds is ended too. This is a heuristic, not a proof: a round of failed attempts (e.g. random
+            placements that did not fit) is idle although the game is still live, so it is off by default.
+        """
+        if self.stall_idle_rounds is not None and self.idle_rounds >= self.stall_idle_rounds:
+            return True
+        if self.bank_count:
+            return False
+        supply_left = bool(self.cards)
+        for player in self.players:
+            if not player.pieces:
+                continue
+            if supply_left and len(player.cards) < MAX_CARDS_HELD:
+                return False
+            if player.cards:
+                piece_sizes = self.available_piece_sizes(player)
+                if any(not card.is_dead(piece_sizes) for card in player.cards):
+                    return False
+        return True
+
+    def end_stalled(self):
+        """ ends a stalled game now and records the turns that were skipped """
+        game_state = self.game_state
+        skipped = game_state.last_turn - game_state.current_turn_number + 1
+        self.end_reason = END_STALLED
+        self.stats.skipped_turns = skipped
+        game_state.last_turn = game_state.current_turn_number - 1
+        self.logger.info("Game stalled on turn %d, skipping %d turns", game_state.current_turn_number, skipped,
+                         extra={"normal": True})
 
     @property
     def is_game_running(self):
         """ checks if the game is running or over"""
-        is_running = self.current_turn_number <= self.max_turns
+        is_running = self.current_turn_number <= self.game_state.last_turn
         return is_running
 
     @property
@@ -155,11 +367,13 @@ class GameManager:
 
     @property
     def max_turns(self):
-        return self.configs["game_parameters"]["max_turns"]
+        return self.game_state.max_turns
 
 
 class Player:
     """ a class that describes a player """
+    __slots__ = ("logger", "name", "actions_left", "game_manager", "index", "points", "final_score", "cards",
+                 "full_cards", "pieces", "kwargs", "strategy")
 
     def __init__(self, name=None, cards=None, pieces=None, actions=None, strategy=None, logger=None, game_manager=None, **kwargs):
         # Set up logger
@@ -169,6 +383,9 @@ class Player:
         self.name = name if name is not None else self.generate_random_name()
         self.actions_left = 3
         self.game_manager = game_manager
+        self.index = 0              # seat of the player, used to index the game statistics
+        self.points = 0
+        self.final_score = 0
 
         # list of objects, game stuff
         self.cards = cards if cards else []
@@ -183,12 +400,28 @@ class Player:
 
     def play_turn(self):
         """  delegates the playing to the strategy """
-        self.logger.debug(f"{self.name} is playing their turn",  extra={"normal": False})
-        self.logger.debug(f"Pieces in the bank: {len(self.game_manager.pieces)}",  extra={"normal": False})
+        self.logger.debug("%s is playing their turn", self.name, extra={"normal": False})
         return self.strategy.play_turn()
 
+    def collect_reward(self, card):
+        """ pays out a completed card: its points, the pieces that were placed on it and its reward piece,
+            taken from the bank
+        """
+        reward = card.reward
+        self.points += reward.points
+        self.pieces.extend(card.placed_pieces)
+        card.placed_pieces = []
+        if reward.piece is not None and self.game_manager:
+            piece = self.game_manager.get_piece(getattr(reward.piece, "name", reward.piece))
+            if piece:
+                self.pieces.append(piece)
+        if self.game_manager:
+            self.game_manager.stats.record_card_completed(self.index, reward.points)
+        self.logger.info("%s completed a card: +%s points (total %s)", self.name, reward.points, self.points,
+                         extra={"normal": True})
+
     def __repr__(self):
-        return f"Name: {self.name} " \
+        return f"Name: {self.name} points: {self.points} " \
                f"pieces: {self.pieces} cards: {self.cards}"
 
     def generate_random_name(self, length=5):
@@ -196,11 +429,11 @@ class Player:
         chars = string.ascii_lowercase
         # Generate a random name of specified length
         name = ''.join(random.choice(chars) for _ in range(length))
-        self.logger.debug(f"Generated random name: {self.name}", extra={"normal": False, "verbose": True})
+        self.logger.debug("Generated random name: %s", name, extra={"normal": False, "verbose": True})
         return name
 
     def get_initial_pieces(self):
-        self.logger.debug(f"Getting initial pieces for {self.name}", extra={"normal": False, "verbose": True})
+        self.logger.debug("Getting initial pieces for %s", self.name, extra={"normal": False, "verbose": True})
         if self.game_manager:
             # Get a level 1 piece from the bank
             piece = self.game_manager.get_piece("square_1")
@@ -208,7 +441,7 @@ class Player:
         return [PieceSquare()]  # Fallback
 
     def set_strategy(self, strategy):
-        self.logger.debug(f"Setting strategy for {self.name}",  extra={"normal": False})
+        self.logger.debug("Setting strategy for %s", self.name, extra={"normal": False})
         self.strategy = strategy
         self.strategy.player = self
         if hasattr(strategy, 'logger'):
@@ -220,8 +453,11 @@ class Strategy:
     Allows for fixed sequences of actions or dynamic decision-making.
     Used by the Player class.
     """
-    def __init__(self, player, actions_sequence=None, action_list=None, logger=None):
+    registry_name = None        # set by register_strategy
+    table_name = "default"      # strategies with the same table_name share their transposition table
+    def __init__(self, player, actions_sequence=None, action_list=None, logger=None, budget=None):
         self.player = player
+        self.budget = budget        # budget.DecisionBudget, None for no limit
         self.action_sequence = actions_sequence if actions_sequence else ()
         self.actions = action_list if action_list else (TakePiece, PlacePiece, UpgradePiece, TakeCard, Master)
         self.actions_left = 3
@@ -230,6 +466,81 @@ class Strategy:
     def play_turn(self):
         raise NotImplemented
 
+    def _move_full_cards(self):
+        """Move completed cards from active cards to full cards collection and pay out their rewards."""
+        full_cards = [card for card in self.cards if card.is_full]
+        if full_cards:
+            for card in full_cards:
+                self.player.collect_reward(card)
+            self.full_cards.extend(full_cards)
+            self.cards = [card for card in self.cards if not card.is_full]
+            if self.player.game_manager:
+                self.player.game_manager.zobrist.rehash(self.player.game_manager)
+            self.logger.info("%s  completed %s cards", self.name, len(self.player.full_cards), extra={"normal": True})
+
+    def _perform_action(self, action):
+        """Perform an action, record it in the game statistics and pay out any card it completed.
+
+        Returns:
+            the result of action.perform_action()
+        """
+        game_manager = self.player.game_manager
+        result = game_manager.make_move(self.player, action) if game_manager else action.perform_action()
+        stats = self.stats
+        if stats is not None:
+            stats.record_action(self.player.index, action.action_id, result is not False)
+            if result and action.action_id == PlacePiece.action_id:
+                stats.record_piece_used(self.player.index)
+        self._move_full_cards()
+        if result and game_manager and game_manager.recorder is not None:
+            game_manager.recorder.record(self.player, self.actions_left - 1)
+        return result
+
+    def _record_wasted(self, count=1):
+        """Record rejected (invalid) action attempts in the game statistics."""
+        stats = self.stats
+        if stats is not None and count:
+            stats.record_wasted(self.player.index, count)
+
+    def _start_decision(self):
+        """Deadline of the decision about to be made, from the budget (no limit without one)."""
+        if self.budget is None:
+            return Deadline()
+        game_manager = self.player.game_manager
+        decisions_left = self.actions_left
+        if game_manager:
+            game_state = game_manager.game_state
+            decisions_left += 3 * max(game_state.last_turn - game_state.current_turn_number, 0)
+        return self.budget.deadline(decisions_left)
+
+    def _end_decision(self, deadline, depth):
+        """Record a decision made within deadline, the search having completed depth."""
+        if self.budget is not None:
+            self.budget.spend(deadline)
+        stats = self.stats
+        if stats is not None:
+            stats.record_decision(self.player.index, depth, deadline.elapsed, deadline.overrun)
+        if deadline.overrun:
+            self.logger.debug("%s overran its budget: %.4fs for %.4fs", self.name, deadline.elapsed,
+                              deadline.time_limit, extra={"normal": False})
+
+    @property
+    def transposition_table(self):
+        """Transposition table shared with the other strategies of this process using the same table_name."""
+        return shared_table(self.table_name)
+
+    def _available_sizes(self):
+        """Sizes of the pieces this player can still get hold of (see GameManager.available_piece_sizes)."""
+        game_manager = self.player.game_manager
+        if game_manager:
+            return game_manager.available_piece_sizes(self.player)
+        return frozenset(piece.size for piece in self.pieces)
+
+    @property
+    def stats(self):
+        game_manager = self.player.game_manager
+        return game_manager.stats if game_manager else None
+
     @property
     def pieces(self):
         return self.player.pieces
@@ -250,24 +561,29 @@ class Strategy:
         return self.player.name
 
 
+@register_strategy("random")
 class RandomStrat(Strategy):
     """Strategy that chooses actions randomly."""
 
     def __init__(self, player, logger=None, **kwargs):
         super().__init__(player, logger=logger, **kwargs)
+        self._actions = {}      # one reusable action per action type, rebound for every attempt
 
     def choose_action(self):
         """Randomly selects an action from available action types."""
         action_class = random.choice(self.actions)
-        action_selected = action_class(pieces=self.pieces, cards=self.cards, game_manager=self.player.game_manager)
-        self.logger.debug(f"{self.name} randomly selected action: {action_selected}",
+        action_selected = self._actions.get(action_class)
+        if action_selected is None:
+            action_selected = self._actions[action_class] = action_class()
+        action_selected.rebind(pieces=self.pieces, cards=self.cards, game_manager=self.player.game_manager)
+        self.logger.debug("%s randomly selected action: %s", self.name, action_selected,
                           extra={"normal": False, "verbose": True})
         return action_selected
 
     def play_turn(self):
         """Play a turn by randomly choosing valid actions until actions run out."""
         self.actions_left = 3
-        self.logger.debug(f"{self.name} starting turn with {self.actions_left} actions ",
+        self.logger.debug("%s starting turn with %s actions ", self.name, self.actions_left,
                           extra={"normal": False})
 
         while self.actions_left > 0:
@@ -276,40 +592,44 @@ class RandomStrat(Strategy):
             # Keep trying actions until we find a valid one
             attempts = 0
             while not action.is_action_valid() and attempts < 10:
-                self.logger.debug(f"{self.name} action invalid, trying another",
+                self.logger.debug("%s action invalid, trying another", self.name,
                                   extra={"normal": False, "verbose": True})
                 action = self.choose_action()
                 attempts += 1
 
+            self._record_wasted(attempts)
             if attempts >= 10:
-                self.logger.debug(f"{self.name}  couldn't find valid action after 10 attempts",
+                self.logger.debug("%s  couldn't find valid action after 10 attempts", self.name,
                                   extra={"normal": False})
                 break
 
             # Execute the valid action and consume an action
-            self.logger.info(f"{self.name}  performs: {action}",  extra={"normal": True})
-            action.perform_action()
+            self.logger.info("%s  performs: %s", self.name, action, extra={"normal": True})
+            self._perform_action(action)
             self.actions_left -= 1
-        self.logger.debug(f"Player state: {self.player}", extra={"normal": False, "verbose": True})
+        self.logger.debug("Player state: %s", self.player, extra={"normal": False, "verbose": True})
 
+@register_strategy("take_piece")
 class TakePieceStrat(Strategy):
     """Always takes a piece"""
 
     def __init__(self, player, logger=None, **kwargs):
         super().__init__(player, logger=logger, **kwargs)
+        self._take_piece = TakePiece()      # reused for every attempt
 
     def choose_action(self):
         """Randomly selects an action from available action types."""
         # action_class = random.choice(self.actions)
-        action_selected = TakePiece(pieces=self.pieces, cards=self.cards, game_manager=self.player.game_manager)
-        self.logger.debug(f"{self.name} randomly selected action: {action_selected}",
+        action_selected = self._take_piece.rebind(pieces=self.pieces, cards=self.cards,
+                                                  game_manager=self.player.game_manager)
+        self.logger.debug("%s randomly selected action: %s", self.name, action_selected,
                           extra={"normal": False, "verbose": True})
         return action_selected
 
     def play_turn(self):
         """Play a turn by randomly choosing valid actions until actions run out."""
         self.actions_left = 3
-        self.logger.debug(f"{self.name} starting turn with {self.actions_left} actions ",
+        self.logger.debug("%s starting turn with %s actions ", self.name, self.actions_left,
                           extra={"normal": False})
 
         while self.actions_left > 0:
@@ -318,22 +638,24 @@ class TakePieceStrat(Strategy):
             # Keep trying actions until we find a valid one
             attempts = 0
             while not action.is_action_valid() and attempts < 10:
-                self.logger.debug(f"{self.name} action invalid, trying another",
+                self.logger.debug("%s action invalid, trying another", self.name,
                                   extra={"normal": False, "verbose": True})
                 action = self.choose_action()
                 attempts += 1
 
+            self._record_wasted(attempts)
             if attempts >= 10:
-                self.logger.debug(f"{self.name}  couldn't find valid action after 10 attempts",
+                self.logger.debug("%s  couldn't find valid action after 10 attempts", self.name,
                                   extra={"normal": False})
                 break
 
             # Execute the valid action and consume an action
-            self.logger.info(f"{self.name}  performs: {action}",  extra={"normal": True})
-            action.perform_action()
+            self.logger.info("%s  performs: %s", self.name, action, extra={"normal": True})
+            self._perform_action(action)
             self.actions_left -= 1
-        self.logger.debug(f"Player state: {self.player}", extra={"normal": False, "verbose": True})
+        self.logger.debug("Player state: %s", self.player, extra={"normal": False, "verbose": True})
 
+@register_strategy("basic")
 class BasicStrat(Strategy):
     """Basic strategy with a simple priority system:
 
@@ -346,14 +668,6 @@ class BasicStrat(Strategy):
     def __init__(self, player, logger=None, **kwargs):
         super().__init__(player, logger=logger, **kwargs)
 
-    def _move_full_cards(self):
-        """Move completed cards from active cards to full cards collection."""
-        full_cards = [card for card in self.cards if card.is_full]
-        if full_cards:
-            self.logger.info(f"{self.name}  completed {len(self.player.full_cards)} cards", extra={"normal": True})
-            self.full_cards.extend(full_cards)
-            self.cards = [card for card in self.cards if not card.is_full]
-
     def _execute_action(self, action):
         """Execute an action if valid and consume an action point.
 
@@ -361,12 +675,14 @@ class BasicStrat(Strategy):
             bool: True if action was executed successfully
         """
         if action.is_action_valid():
-            self.logger.info(f"{self.name}  performs: {action}", extra={"normal": True})
-            action.perform_action()
+            self.logger.info("%s  performs: %s", self.name, action, extra={"normal": True})
+            self._perform_action(action)
             self.actions_left -= 1
             return True
         else:
-            self.logger.debug(f"{self.name}  action invalid: {action}", self.name, action.desc, extra={"normal": False, "verbose": True})
+            self._record_wasted()
+            self.logger.debug("%s  action invalid: %s", self.name, action.desc,
+                              extra={"normal": False, "verbose": True})
             return False
 
     def _try_place_piece(self):
@@ -376,7 +692,7 @@ class BasicStrat(Strategy):
             bool: True if placement was successful
         """
         if not (self.cards and self.pieces):
-            self.logger.debug(f"{self.name}  can't place piece - missing cards or pieces",
+            self.logger.debug("%s  can't place piece - missing cards or pieces", self.name,
 
                              extra={"normal": False, "verbose": True})
             return False
@@ -384,13 +700,13 @@ class BasicStrat(Strategy):
         # Try to place a piece on the first available card
         piece = self.pieces.pop()
         action = PlacePiece(piece, self.cards[0], pieces=self.pieces)
-        self.logger.debug(f"{self.name} attempting to place piece on card",  extra={"normal": False})
+        self.logger.debug("%s attempting to place piece on card", self.name, extra={"normal": False})
 
         if self._execute_action(action):
             return True
         else:
             self.pieces.append(piece)  # put it back in the pack since the action failed
-            self.logger.debug(f"{self.name} failed to place piece, returning to inventory",
+            self.logger.debug("%s failed to place piece, returning to inventory", self.name,
 
                              extra={"normal": False, "verbose": True})
             return False
@@ -401,33 +717,33 @@ class BasicStrat(Strategy):
         Returns:
             Action or None: The best action to take, or None if no valid action
         """
-        # Priority 1: Place a piece if we have both cards and pieces
-        if self.cards and self.pieces:
-            self.logger.debug(f"{self.name}  strategy: place piece (has cards and pieces)",
+        # Priority 1: Place a piece if we have both cards and pieces (and the card can still be completed)
+        if self.cards and self.pieces and not self.cards[0].is_dead(self._available_sizes()):
+            self.logger.debug("%s  strategy: place piece (has cards and pieces)", self.name,
                              extra={"normal": False})
             return PlacePiece(self.pieces[-1], self.cards[0], pieces=self.pieces, game_manager=self.player.game_manager)
 
         # Priority 2: Take a piece if we have no pieces
         if not self.pieces:
-            self.logger.debug(f"{self.name} strategy: take piece (no pieces)",
+            self.logger.debug("%s strategy: take piece (no pieces)", self.name,
                              extra={"normal": False})
             return TakePiece(pieces=self.pieces, game_manager=self.player.game_manager)
 
         # Priority 3: Take a card if we have no cards
         if not self.cards:
-            self.logger.debug(f"{self.name} strategy: take card (no cards)",
+            self.logger.debug("%s strategy: take card (no cards)", self.name,
                              extra={"normal": False})
-            return TakeCard(cards=self.cards)
+            return TakeCard(cards=self.cards, game_manager=self.player.game_manager)
 
         # Default: Take a piece (better than nothing)
-        self.logger.debug(f"{self.name}  strategy: default to take piece",
+        self.logger.debug("%s  strategy: default to take piece", self.name,
                          extra={"normal": False})
         return TakePiece(pieces=self.pieces, game_manager=self.player.game_manager)
 
     def play_turn(self):
         """Execute the turn following the basic strategy priority system."""
         self.actions_left = 3
-        self.logger.debug(f"{self.player} plays turn (BasicStrat)",
+        self.logger.debug("%s plays turn (BasicStrat)", self.player,
                          extra={"normal": False})
 
         # First, handle any completed cards
@@ -446,9 +762,490 @@ class BasicStrat(Strategy):
                 continue
             else:
                 # No valid actions available, pass remaining actions
-                self.logger.info(f"{self.player.name} passes remaining %d actions",
+                self.logger.info("%s passes remaining %d actions",
                                self.name, self.actions_left,
                                extra={"normal": True})
                 self.actions_left = 0
 
-        self.logger.debug(f"Player state: {self.player}", extra={"normal": False, "verbose": True})
+        self.logger.debug("Player state: %s", self.player, extra={"normal": False, "verbose": True})
+
+
+def reachable_sums(sizes, max_sum=25):
+    """ bool array r where r[n] is True when n cells can be covered exactly by a subset of the piece sizes """
+    bits = 1
+    limit = (1 << (max_sum + 1)) - 1
+    for size in sizes:
+        bits = (bits | (bits << size)) & limit
+    return np.array([(bits >> n) & 1 for n in range(max_sum + 1)], dtype=bool)
+
+
+@register_strategy("greedy")
+class GreedyStrat(Strategy):
+    """Greedy strategy scoring every (piece, card, configuration) candidate in one numpy batch.
+
+    For each action of the turn:
+    1. Place the best scoring valid placement if its score is positive
+    2. Take a card if we have none
+    3. Take the piece type from the bank with the best scoring placement (the biggest one if we have no card)
+    4. Place the best valid placement even if its score is not positive
+
+    See score_placements for the scoring.
+    """
+    FILL_WEIGHT = 1.0           # per cell filled
+    COMPLETE_WEIGHT = 10.0      # per point + 1 of a card the placement completes
+    HOLE_WEIGHT = 2.0           # per isolated empty cell left on the card
+    UNFILLABLE_WEIGHT = 3.0     # when the cells left cannot be covered by the sizes of the pieces held
+    DEAD_WEIGHT = 20.0          # when the placement leaves the card impossible to complete (see Card.is_dead)
+    HARDEST_CELL_WEIGHT = 0.5   # when the placement covers the empty cell the fewest placements can reach
+
+    def __init__(self, player, logger=None, **kwargs):
+        super().__init__(player, logger=logger, **kwargs)
+        self._flat_cubes = {}       # piece name -> (configurations, 25) cube
+
+    def _flat_cube(self, piece):
+        flat = self._flat_cubes.get(piece.name)
+        if flat is None:
+            flat = piece.cube.reshape(piece.cube.shape[0], -1).astype(np.int16)
+            self._flat_cubes[piece.name] = flat
+        return flat
+
+    def score_placements(self, cards, candidates, spare_sums):
+        """Score all placements of all candidate pieces on all cards at once.
+
+        Args:
+            cards: the cards to place on
+            candidates: one Piece per candidate piece type
+            spare_sums: (len(candidates), 26) bool - reachable_sums of the pieces left after placing each candidate
+
+        Returns:
+            scores (configurations, cards) with -inf for invalid placements, the candidate index and the cube index
+            of every row
+        """
+        flats = [self._flat_cube(piece) for piece in candidates]
+        configurations = np.concatenate(flats)                                          # (M, 25)
+        configuration_bits = np.concatenate([piece.cube_bits for piece in candidates])
+        candidate_index = np.repeat(np.arange(len(flats)), [len(f) for f in flats])
+        cube_index = np.concatenate([np.arange(len(f)) for f in flats])
+
+        blocked = np.stack([(card.layout.astype(bool) | ~card.mask).ravel() for card in cards])    # (N, 25)
+        valid = (configurations @ blocked.T.astype(np.int16)) == 0                      # (M, N)
+        size = configurations.sum(axis=1)
+        remaining = (~blocked).sum(axis=1)[None, :] - size[:, None]
+        completes = remaining == 0
+
+        # isolated empty cells left after each placement: empty cells without an empty neighbour
+        empty = (~blocked[None, :, :] & (configurations[:, None, :] == 0)).reshape(len(size), len(cards), 5, 5)
+        neighbours = np.zeros_like(empty)
+        neighbours[..., 1:, :] |= empty[..., :-1, :]
+        neighbours[..., :-1, :] |= empty[..., 1:, :]
+        neighbours[..., :, 1:] |= empty[..., :, :-1]
+        neighbours[..., :, :-1] |= empty[..., :, 1:]
+        holes = (empty & ~neighbours).sum(axis=(2, 3))
+
+        fillable = spare_sums[candidate_index[:, None], np.clip(remaining, 0, spare_sums.shape[1] - 1)]
+        points = np.array([card.reward.points for card in cards])
+
+        scores = (self.FILL_WEIGHT * size[:, None]
+                  + self.COMPLETE_WEIGHT * completes * (1 + points[None, :])
+                  - self.HOLE_WEIGHT * holes
+                  - self.UNFILLABLE_WEIGHT * ~fillable)
+        game_manager = self.player.game_manager
+        if game_manager:
+            # hardest cell first: cells few placements can reach get harder to fill as the card fills up
+            density = game_manager.definition.density
+            hardest = [density.hardest_cell(card.mask_bits, card.empty_bits) for card in cards]
+            scores += self.HARDEST_CELL_WEIGHT * configurations[:, hardest]
+        # dead region check on the valid candidates only, the flood fills are cached per layout. With a tablebase
+        # the exact completability of the layout (with unlimited pieces) is checked as well
+        piece_sizes = self._available_sizes()
+        empty_bits = [card.empty_bits for card in cards]
+        tablebase = game_manager.tablebase if game_manager else None
+        for row, column in zip(*np.nonzero(valid & ~completes)):
+            placement_bits = int(configuration_bits[row])
+            card = cards[column]
+            if is_layout_dead(empty_bits[column] & ~placement_bits, piece_sizes) or (
+                    tablebase is not None and tablebase.has_mask(card.mask_bits)
+                    and tablebase.min_pieces(card.mask_bits, card.layout_bits | placement_bits) == IMPOSSIBLE):
+                scores[row, column] -= self.DEAD_WEIGHT
+
+        scores = np.where(valid, scores, -np.inf)
+        return scores, candidate_index, cube_index
+
+    def _live_cards(self):
+        """the cards that can still be completed - no point placing pieces on the others"""
+        piece_sizes = self._available_sizes()
+        return [card for card in self.cards if not card.is_dead(piece_sizes)]
+
+    def _held_types(self):
+        """one piece per type held, and the reachable sums of the pieces left after placing one of that type"""
+        by_name = {}
+        for piece in self.pieces:
+            by_name.setdefault(piece.name, piece)
+        sizes = [piece.size for piece in self.pieces]
+        candidates = list(by_name.values())
+        spare = []
+        for piece in candidates:
+            spare_sizes = list(sizes)
+            spare_sizes.remove(piece.size)
+            spare.append(reachable_sums(spare_sizes))
+        return candidates, np.array(spare)
+
+    def _best_placement(self):
+        """Returns (score, piece, card, configuration) of the best placement, None if there is no valid one."""
+        cards = self._live_cards()
+        if not (cards and self.pieces):
+            return None
+        candidates, spare = self._held_types()
+        scores, candidate_index, cube_index = self.score_placements(cards, candidates, spare)
+        row, column = np.unravel_index(np.argmax(scores), scores.shape)
+        if scores[row, column] == -np.inf:
+            return None
+        piece = candidates[candidate_index[row]]
+        return scores[row, column], piece, cards[column], piece.cube[cube_index[row]]
+
+    def _best_piece_to_take(self):
+        """Name of the piece type worth taking from the bank, None if the bank is empty."""
+        game_manager = self.player.game_manager
+        if not game_manager:
+            return None
+        candidates = [pieces[-1] for pieces in game_manager.piece_bank.values() if pieces]
+        if not candidates:
+            return None
+        cards = self._live_cards()
+        if not cards:
+            return max(candidates, key=lambda piece: piece.level).name
+        held = reachable_sums([piece.size for piece in self.pieces])
+        scores, candidate_index, _ = self.score_placements(cards, candidates,
+                                                           np.repeat(held[None, :], len(candidates), axis=0))
+        row = np.unravel_index(np.argmax(scores), scores.shape)[0]
+        if scores.max() == -np.inf:
+            return None
+        return candidates[candidate_index[row]].name
+
+    def _choose_action(self):
+        game_manager = self.player.game_manager
+        placement = self._best_placement()
+        if placement is not None and placement[0] > 0:
+            _, piece, card, configuration = placement
+            return PlacePiece(piece, card, pieces=self.pieces, configuration=configuration, game_manager=game_manager)
+
+        take_card = TakeCard(cards=self.cards, game_manager=game_manager)
+        if not self.cards and take_card.is_action_valid():
+            return take_card
+
+        piece_name = self._best_piece_to_take()
+        if piece_name is not None:
+            return TakePiece(pieces=self.pieces, piece_name=piece_name, game_manager=game_manager)
+
+        if placement is not None:
+            _, piece, card, configuration = placement
+            return PlacePiece(piece, card, pieces=self.pieces, configuration=configuration, game_manager=game_manager)
+        return None
+
+    def play_turn(self):
+        """Play up to 3 actions, each the best one according to the current state."""
+        self.actions_left = 3
+        self.logger.debug("%s plays turn (GreedyStrat)", self.name, extra={"normal": False})
+        self._move_full_cards()
+
+        while self.actions_left > 0:
+            action = self._choose_action()
+            if action is None or not action.is_action_valid():
+                if action is not None:
+                    self._record_wasted()
+                self.logger.debug("%s passes remaining %d actions", self.name, self.actions_left,
+                                  extra={"normal": False})
+                break
+            self.logger.info("%s  performs: %s", self.name, action, extra={"normal": True})
+            self._perform_action(action)
+            self.actions_left -= 1
+
+
+def candidate_moves(player, placements_per_card=4):
+    """ the actions of player worth searching from the current position: placements first (those filling a hole
+        exactly, then the hardest cell first ones, placements_per_card per piece type and card), then taking a card,
+        then taking a piece of each type left in the bank
+    """
+    game_manager = player.game_manager
+    definition = game_manager.definition
+    moves = []
+    by_name = {}
+    for piece in player.pieces:
+        by_name.setdefault(piece.name, piece)
+    held = {definition.type_index[name]: piece for name, piece in by_name.items()}
+    for card in player.cards:
+        empty_bits = card.empty_bits
+        if card.is_full:
+            continue
+        # placements filling a hole of the card exactly come first (see FitIndex)
+        exact = set()
+        for _, type_index, cube_index in definition.fit_index.exact_fits(empty_bits, held):
+            piece = held[type_index]
+            exact.add((piece.name, cube_index))
+            moves.append(PlacePiece(piece, card, pieces=player.pieces, configuration=piece.cube[cube_index],
+                                    game_manager=game_manager))
+        for piece in by_name.values():
+            cube_bits = piece.cube_bits
+            fits = np.flatnonzero(cube_bits & ~empty_bits == 0)
+            if not len(fits):
+                continue
+            order = definition.density.order_placements(cube_bits[fits], card.mask_bits, empty_bits)
+            for index in fits[order[:placements_per_card]]:
+                if (piece.name, index) not in exact:
+                    moves.append(PlacePiece(piece, card, pieces=player.pieces, configuration=piece.cube[index],
+                                            game_manager=game_manager))
+    take_card = TakeCard(cards=player.cards, game_manager=game_manager)
+    if take_card.is_action_valid():
+        moves.append(take_card)
+    for name, pieces in game_manager.piece_bank.items():
+        if pieces:
+            moves.append(TakePiece(pieces=player.pieces, piece_name=name, game_manager=game_manager))
+    return moves
+
+
+@register_strategy("search")
+class SearchStrat(Strategy):
+    """Anytime strategy: iterative deepening search over the actions left in the turn.
+
+    Each decision searches the sequences of its own actions 1, 2, ... up to actions_left deep with make/unmake
+    (GameManager.make_move), stopping when the deadline of its budget (see budget.py) arrives. The move played is
+    the best one of the deepest search completed, searched first at the next depth. Positions are evaluated with
+    evaluate(); stopping early (passing) is always an option. Transpositions within a decision are looked up in the
+    "search" transposition table.
+
+    Without a budget a decision is limited to DEFAULT_NODES nodes.
+    """
+    table_name = "search"
+    DEFAULT_NODES = 2000
+    PLACEMENTS_PER_CARD = 4     # placements tried per piece type and card, hardest cell first (see DensityMaps)
+    COMPLETE_WEIGHT = 10.0      # per point + 1 of a completed card
+    FILL_WEIGHT = 5.0           # per point + 1 of a card, times the part of it that is filled
+    CARD_WEIGHT = 1.0           # per card held that can still be completed
+    DEAD_WEIGHT = 5.0           # per point + 1 of a card that cannot be completed anymore
+    PIECE_WEIGHT = 0.3          # per cell of the pieces held, and of those a completed card gives back
+
+    def __init__(self, player, logger=None, **kwargs):
+        super().__init__(player, logger=logger, **kwargs)
+        self.depth_reached = 0
+
+    def evaluate(self):
+        """Value of the current position for the player. Points already scored are left out: they are the same
+        for every position a decision compares."""
+        piece_sizes = self._available_sizes()
+        value = self.PIECE_WEIGHT * sum(piece.size for piece in self.pieces)
+        for card in self.cards:
+            weight = card.reward.points + 1
+            if card.is_full:
+                value += self.COMPLETE_WEIGHT * weight
+                value += self.PIECE_WEIGHT * sum(piece.size for piece in card.placed_pieces)
+            elif card.is_dead(piece_sizes):
+                value -= self.DEAD_WEIGHT * weight
+            else:
+                filled = bin(card.layout_bits).count("1") / bin(card.mask_bits).count("1")
+                value += self.FILL_WEIGHT * weight * filled + self.CARD_WEIGHT
+        return value
+
+    def _moves(self):
+        return candidate_moves(self.player, self.PLACEMENTS_PER_CARD)
+
+    def _search(self, depth, deadline):
+        """Best value reachable with depth more actions. Raises SearchTimeout when the deadline arrives."""
+        deadline.tick()
+        if depth == 0:
+            return self.evaluate()
+        game_manager = self.player.game_manager
+        table = self.transposition_table
+        key = game_manager.hash
+        entry = table.probe(key)
+        if entry is not None and entry[1] == depth:
+            return entry[0]
+        value = self.evaluate()
+        for move in self._moves():
+            if not game_manager.make_move(self.player, move):
+                continue
+            try:
+                value = max(value, self._search(depth - 1, deadline))
+            finally:
+                game_manager.unmake_move(self.player, move)
+        table.store(key, value, depth)
+        return value
+
+    def _choose_action(self, deadline):
+        """The best move of the deepest search completed before the deadline, None to pass. If not even the first
+        depth completed, the best move it found so far (the first move generated if none)."""
+        game_manager = self.player.game_manager
+        moves = self._moves()
+        self.depth_reached = 0
+        if not moves:
+            return None
+        best = moves[0]
+        self.transposition_table.new_search()
+        for depth in range(1, self.actions_left + 1):
+            best_value = self.evaluate()    # passing
+            best_at_depth = None
+            try:
+                for move in moves:
+                    if not game_manager.make_move(self.player, move):
+                        continue
+                    try:
+                        value = self._search(depth - 1, deadline)
+                    finally:
+                        game_manager.unmake_move(self.player, move)
+                    if value > best_value:
+                        best_value, best_at_depth = value, move
+            except SearchTimeout:
+                if depth == 1 and best_at_depth is not None:
+                    best = best_at_depth
+                break
+            best = best_at_depth
+            self.depth_reached = depth
+            if best is not None:
+                moves.remove(best)
+                moves.insert(0, best)
+        return best
+
+    def play_turn(self):
+        """Play up to 3 actions, each chosen by a budgeted search."""
+        self.actions_left = 3
+        self.logger.debug("%s plays turn (SearchStrat)", self.name, extra={"normal": False})
+        self._move_full_cards()
+        if not self.player.game_manager:
+            return
+
+        while self.actions_left > 0:
+            deadline = self._start_decision()
+            if deadline.node_limit is None and deadline.time_limit is None:
+                deadline.node_limit = self.DEFAULT_NODES
+            action = self._choose_action(deadline)
+            self._end_decision(deadline, self.depth_reached)
+            if action is None:
+                self.logger.debug("%s passes remaining %d actions", self.name, self.actions_left,
+                                  extra={"normal": False})
+                break
+            self.logger.info("%s  performs: %s", self.name, action, extra={"normal": True})
+            self._perform_action(action)
+            self.actions_left -= 1
+
+
+@register_strategy("endgame")
+class EndgameStrat(BasicStrat):
+    """BasicStrat until the last ENDGAME_ROUNDS rounds, then every action is searched to the end of the game.
+
+    In the endgame each action is chosen by an EndgameSolver (alpha-beta with iterative deepening, see endgame.py)
+    within the budget of the strategy, ENDGAME_NODES nodes per decision without one. The solver has a
+    transposition table of its own (not a shared one: another EndgameStrat of the game would clear it), kept across
+    the actions of the turn and the turns of the endgame.
+
+    On configs.yaml the default budget costs about 1 ms per searched decision (6 per game): a game against BasicStrat
+    takes about 1.6 times as long as BasicStrat against BasicStrat. Larger budgets win slightly more often but the
+    search then dominates the game time (4 times the budget: about 3 times as long).
+    """
+    ENDGAME_ROUNDS = 2
+    ENDGAME_NODES = 25
+    PLACEMENTS_PER_CARD = 3
+    TABLE_SIZE_LOG2 = 12
+
+    def __init__(self, player, logger=None, **kwargs):
+        super().__init__(player, logger=logger, **kwargs)
+        self.solver = None
+        self.depth_reached = 0
+
+    def _rounds_left(self):
+        """rounds left, the current one included"""
+        game_state = self.player.game_manager.game_state
+        return game_state.last_turn - game_state.current_turn_number + 1
+
+    def _solver(self):
+        if self.solver is None:
+            self.solver = EndgameSolver(self.player.game_manager,
+                                        lambda player: candidate_moves(player, self.PLACEMENTS_PER_CARD),
+                                        TranspositionTable(self.TABLE_SIZE_LOG2))
+        return self.solver
+
+    def play_turn(self):
+        """BasicStrat's turn, or up to 3 actions chosen by the endgame search."""
+        if not self.player.game_manager or self._rounds_left() > self.ENDGAME_ROUNDS:
+            return super().play_turn()
+        self.actions_left = 3
+        self.logger.debug("%s plays an endgame turn", self.name, extra={"normal": False})
+        self._move_full_cards()
+        solver = self._solver()
+
+        while self.actions_left > 0:
+            deadline = self._start_decision()
+            if deadline.node_limit is None and deadline.time_limit is None:
+                deadline.node_limit = self.ENDGAME_NODES
+            action = solver.solve(self.player, self.actions_left, self._rounds_left(), deadline)
+            self._end_decision(deadline, solver.depth_reached)
+            if action is None:
+                self.logger.debug("%s passes remaining %d actions", self.name, self.actions_left,
+                                  extra={"normal": False})
+                break
+            self.logger.info("%s  performs: %s", self.name, action, extra={"normal": True})
+            self._perform_action(action)
+            self.actions_left -= 1
+
+
+def afterstate_action(player, move):
+    """ the action of a move row of StateFeatures.afterstates (kind, type index, slot, cube index), None to pass """
+    kind, type_index, slot, cube_index = (int(value) for value in move)
+    game_manager = player.game_manager
+    if kind == TAKE_PIECE:
+        return TakePiece(pieces=player.pieces, piece_name=game_manager.definition.piece_names[type_index],
+                         game_manager=game_manager)
+    if kind == TAKE_CARD:
+        return TakeCard(cards=player.cards, game_manager=game_manager)
+    if kind == PLACE:
+        name = game_manager.definition.piece_names[type_index]
+        piece = next(piece for piece in player.pieces if piece.name == name)
+        return PlacePiece(piece, player.cards[slot], pieces=player.pieces, configuration=piece.cube[cube_index],
+                          game_manager=game_manager)
+    return None
+
+
+@register_strategy("learned")
+class LearnedStrat(Strategy):
+    """Plays the move leading to the position of highest value for a trained ValueModel (see value_model.py).
+
+    Each decision builds the features of the positions every legal move leads to at once (StateFeatures.afterstates)
+    and scores them in one batched predict, passing included. The model file is game_parameters.value_model.
+    With probability exploration a random move is played instead, to diversify self-play games (see selfplay.py).
+    """
+
+    def __init__(self, player, logger=None, **kwargs):
+        super().__init__(player, logger=logger, **kwargs)
+        definition = player.game_manager.definition
+        if not definition.value_model:
+            raise ValueError("The learned strategy needs a model file in game_parameters.value_model")
+        self.model = load_model(definition.value_model)
+        self.features = StateFeatures(definition)
+        if self.model.n_features != self.features.size:
+            raise ValueError(f"{definition.value_model} takes {self.model.n_features} features, "
+                             f"the positions of these configs have {self.features.size}")
+        self.exploration = 0.0
+
+    def _choose_move(self):
+        features, moves = self.features.afterstates(self.player.game_manager, self.player, self.actions_left)
+        if self.exploration and random.random() < self.exploration:
+            return moves[random.randrange(len(moves))]
+        return moves[int(np.argmax(self.model.predict(features)))]
+
+    def play_turn(self):
+        """Play up to 3 actions, each the best move for the model."""
+        self.actions_left = 3
+        self.logger.debug("%s plays turn (LearnedStrat)", self.name, extra={"normal": False})
+        self._move_full_cards()
+        if not self.player.game_manager:
+            return
+
+        while self.actions_left > 0:
+            deadline = self._start_decision()
+            action = afterstate_action(self.player, self._choose_move())
+            self._end_decision(deadline, 1)
+            if action is None:
+                self.logger.debug("%s passes remaining %d actions", self.name, self.actions_left,
+                                  extra={"normal": False})
+                break
+            self.logger.info("%s  performs: %s", self.name, action, extra={"normal": True})
+            self._perform_action(action)
+            self.actions_left -= 1
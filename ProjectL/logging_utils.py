@@ -2,9 +2,13 @@
 import logging
 import os
 import datetime
+import json
+import random
 import sys
 from logging.handlers import RotatingFileHandler
 
+from ProjectL.stats import END_STALLED
+
 # Define log levels that match our custom modes
 LOG_LEVELS = {
     "normal": logging.INFO,
@@ -41,6 +45,8 @@ def setup_logging(config):
 
     Args:
         config: Dictionary containing logging configuration
+
+    Batches of games log 1 in N games instead, see setup_sampling
     """
     # Get logging configuration
     log_config = config.get("logging", {})
@@ -123,4 +129,128 @@ def setup_logging(config):
         game_logger.debug("Full debug mode active - all messages will be logged",
                           extra={"normal": False, "verbose": True})
 
-    return game_logger
\ No newline at end of file
+    return game_logger
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """ one compact json object per record: game seed, time, level, logger and message """
+
+    def format(self, record):
+        entry = {"game": getattr(record, "game", None), "t": round(record.created, 4), "level": record.levelname,
+                 "logger": record.name, "msg": record.getMessage()}
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, separators=(",", ":"), default=str)
+
+
+class _GameTag(logging.Filter):
+    """ stamps records with the seed of the game being logged """
+
+    def __init__(self, sampler):
+        super().__init__()
+        self.sampler = sampler
+
+    def filter(self, record):
+        record.game = self.sampler.game
+        return True
+
+
+def stalled_game():
+    """ predicate: the game stalled """
+    return lambda stats: stats.end_reason == END_STALLED
+
+
+def lowest_score():
+    """ predicate: the game sets a new lowest final score, lower than every game of the batch before it. The first
+        game always matches, then each new record low - about log(n) games of a batch of n in random order
+    """
+    lowest = [None]
+
+    def predicate(stats):
+        score = int(stats.final_score.min())
+        if lowest[0] is None or score < lowest[0]:
+            lowest[0] = score
+            return True
+        return False
+    return predicate
+
+
+# predicates of the "always" list of the sampling configs, a fresh one is made per sampler
+SAMPLING_PREDICATES = {"stalled": stalled_game, "lowest_score": lowest_score}
+
+
+class GameLogSampler:
+    """ logs 1 in 1/rate games of a batch in full, as json lines, and nothing of the others
+
+        logger_for(seed) gives the logger to play a game with: a debug logger writing to path for sampled games, a
+        logger with every level disabled for the others (lazy %-formatting then never builds a message). Which
+        games are sampled only depends on their seed.
+
+        Games that were not sampled but match one of the always predicates (names of SAMPLING_PREDICATES or
+        callables taking the GameStatistics) once over are replayed from their seed with the sampled logger, see
+        needs_replay. Replays are exact for seeded games, not for strategies with a time budget.
+    """
+
+    def __init__(self, path, rate=0.0, always=(), level=logging.DEBUG):
+        self.rate = rate
+        self.predicates = [SAMPLING_PREDICATES[name]() if isinstance(name, str) else name for name in always]
+        self.game = None
+        self.handler = logging.FileHandler(path, delay=True)
+        self.handler.setFormatter(JsonLinesFormatter())
+        self.handler.addFilter(_GameTag(self))
+        self.sampled_logger = logging.getLogger('projectL.sampled')
+        self.sampled_logger.setLevel(level)
+        self.sampled_logger.propagate = False
+        for handler in self.sampled_logger.handlers[:]:
+            self.sampled_logger.removeHandler(handler)
+        self.sampled_logger.addHandler(self.handler)
+        self.quiet_logger = logging.getLogger('projectL.unsampled')
+        self.quiet_logger.setLevel(logging.CRITICAL + 1)
+        self.quiet_logger.propagate = False
+
+    @classmethod
+    def from_configs(cls, config):
+        """ the sampler of the "sampling" entry of the logging configs, None if there is none """
+        sampling = config.get("logging", {}).get("sampling")
+        if not sampling:
+            return None
+        log_dir = config.get("logging", {}).get("log_dir", "logs")
+        os.makedirs(log_dir, exist_ok=True)
+        level = logging.getLevelName(str(sampling.get("level", "debug")).upper())
+        return cls(os.path.join(log_dir, sampling.get("file", "sampled_games.jsonl")), sampling.get("rate", 0.0),
+                   sampling.get("always", ()), level)
+
+    def is_sampled(self, seed):
+        return self.rate > 0 and random.Random(seed).random() < self.rate
+
+    def logger_for(self, seed):
+        self.game = seed
+        return self.sampled_logger if self.is_sampled(seed) else self.quiet_logger
+
+    def needs_replay(self, seed, stats):
+        """ True when an unsampled game matches a predicate. Every predicate sees every game """
+        matches = [predicate(stats) for predicate in self.predicates]
+        return any(matches) and not self.is_sampled(seed)
+
+    def replay_logger(self, seed):
+        self.game = seed
+        return self.sampled_logger
+
+    def close(self):
+        self.sampled_logger.removeHandler(self.handler)
+        self.handler.close()
+
+
+def setup_sampling(config):
+    """
+    Set up per game log sampling for batches, from the "sampling" entry of the logging configuration:
+
+        rate: fraction of the games logged in full (e.g. 0.001 for 1 in 1000)
+        always: names of SAMPLING_PREDICATES, games matching one of them are logged as well (lowest_score: every
+            new record low of the batch, the first game included)
+        file: json lines file in log_dir, level: lowest level logged (debug)
+
+    Returns:
+        a GameLogSampler, None if the configuration has no sampling entry
+    """
+    return GameLogSampler.from_configs(config)
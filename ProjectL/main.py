@@ -1,9 +1,9 @@
 # ProjectL/main.py
-import yaml
 import os
 import logging
 from game_objects import GameManager
 from logging_utils import setup_logging
+from ProjectL.definition import load_configs
 
 # TODO: configure as a default general configs the maximal dimensions of the card
 
@@ -31,9 +31,7 @@ def main():
 
 
 def read_yaml(file_path):
-    with open(file_path, 'r') as file:
-        data = yaml.safe_load(file)
-        return data
+    return load_configs(file_path)
 
 
 if __name__ == "__main__":
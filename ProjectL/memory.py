@@ -0,0 +1,164 @@
+# ProjectL/memory.py
+import argparse
+import inspect
+import json
+import logging
+import os
+import random
+import tracemalloc
+
+from ProjectL.classes import Piece, Card
+from ProjectL.definition import PieceType, CardType, cached_cube, as_definition, load_configs
+from ProjectL.game_objects import GameManager
+from ProjectL.zobrist import ZobristHash
+
+SUBSYSTEMS = ("bank", "cubes", "cards", "hash", "logs", "other")
+TRACEBACK_FRAMES = 12       # deep enough to see through logging and numpy calls
+BASELINE_TOLERANCE = 0.2    # growth over a recorded baseline accepted by the memory benchmark
+
+
+def _function_lines(function):
+    lines, first = inspect.getsourcelines(function)
+    return os.path.abspath(inspect.getsourcefile(function)), first, first + len(lines) - 1
+
+
+def _subsystem_functions():
+    """ functions whose allocations are counted in each subsystem. An allocation belongs to the innermost of them
+        on its traceback, e.g. a cube generated while building a piece counts for cubes, not bank
+    """
+    return {
+        "cubes": (Piece.generate_cube, Piece.generate_configurations, Piece.remove_duplicates, Piece.cube_bits.fget,
+                  cached_cube),
+        "bank": (Piece.__init__, Piece.from_prototype, PieceType.make, GameManager.get_piece),
+        "cards": (Card.__init__, Card.from_prototype, Card.place_piece, Card.remove_piece, CardType.make),
+        "hash": (ZobristHash.__init__, ZobristHash.rehash),
+    }
+
+
+class MemoryProfiler:
+    """ attributes the memory of a game to its subsystems with tracemalloc snapshots
+
+        start() before creating the GameManager (given as its memory_profiler), which then calls sample() once set
+        up and after every round. stop() returns the report: for each subsystem the peak (largest sample) and
+        retained (last sample) bytes allocated since start(), plus the overall peak traced by tracemalloc.
+    """
+
+    def __init__(self):
+        self.ranges = {}
+        for subsystem, functions in _subsystem_functions().items():
+            for function in functions:
+                filename, first, last = _function_lines(function)
+                self.ranges.setdefault(filename, []).append((first, last, subsystem))
+        self.logging_dir = os.path.dirname(os.path.abspath(logging.__file__))
+        self.package_dir = os.path.dirname(os.path.abspath(__file__))
+        self.own_files = {os.path.abspath(__file__), tracemalloc.__file__}
+        self._classified = {}
+        self._started_tracing = False
+        self.baseline = None
+        self.samples = []
+
+    def _classify(self, traceback):
+        """ subsystem of an allocation, None for allocations that are not the game's: made by the profiler itself
+            or with neither the game code nor logging on the traceback
+        """
+        if traceback in self._classified:
+            return self._classified[traceback]
+        subsystem = None
+        if traceback[-1].filename not in self.own_files:
+            for frame in reversed(traceback):       # innermost frame first
+                if frame.filename.startswith(self.logging_dir):
+                    subsystem = "logs"
+                    break
+                found = next((name for first, last, name in self.ranges.get(frame.filename, ())
+                              if first <= frame.lineno <= last), None)
+                if found:
+                    subsystem = found
+                    break
+                if subsystem is None and frame.filename.startswith(self.package_dir):
+                    subsystem = "other"
+        self._classified[traceback] = subsystem
+        return subsystem
+
+    def _measure(self):
+        # statistics() is much faster than Snapshot.filter_traces, filtering is done by _classify
+        sizes = dict.fromkeys(SUBSYSTEMS, 0)
+        for statistic in tracemalloc.take_snapshot().statistics("traceback"):
+            subsystem = self._classify(statistic.traceback)
+            if subsystem is not None:
+                sizes[subsystem] += statistic.size
+        return sizes
+
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(TRACEBACK_FRAMES)
+            self._started_tracing = True
+        self.baseline = self._measure()
+        self.samples = []
+        self._start_current = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+
+    def sample(self):
+        sizes = self._measure()
+        self.samples.append({name: sizes[name] - self.baseline[name] for name in SUBSYSTEMS})
+
+    def stop(self):
+        peak = tracemalloc.get_traced_memory()[1] - self._start_current
+        self.sample()
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+        subsystems = {name: {"peak": max(sample[name] for sample in self.samples),
+                             "retained": self.samples[-1][name]} for name in SUBSYSTEMS}
+        return {
+            "peak": peak,
+            "retained": sum(sizes["retained"] for sizes in subsystems.values()),
+            "subsystems": subsystems,
+            "samples": len(self.samples),
+        }
+
+
+def profile_game(configs_dict, seed=0, logger=None):
+    """ plays one seeded game under a MemoryProfiler and returns its report. The memory still held by the game
+        once it is over (the GameManager is kept alive until the last sample) is the retained memory.
+    """
+    definition = as_definition(configs_dict)
+    profiler = MemoryProfiler()
+    random.seed(seed)
+    profiler.start()
+    game_manager = GameManager(definition, logger, memory_profiler=profiler)
+    game_manager.run()
+    report = profiler.stop()
+    del game_manager
+    return report
+
+
+def format_report(report):
+    lines = [f"peak: {report['peak'] / 1024:9.1f} KiB  retained: {report['retained'] / 1024:9.1f} KiB  "
+             f"({report['samples']} samples)"]
+    for name, sizes in report["subsystems"].items():
+        lines.append(f"{name:>8}: peak {sizes['peak'] / 1024:9.1f} KiB  retained {sizes['retained'] / 1024:9.1f} KiB")
+    return "\n".join(lines)
+
+
+def main():
+    from ProjectL.simulate import file_path
+    parser = argparse.ArgumentParser(description="Memory used by one game, per subsystem")
+    parser.add_argument("--configs", default=file_path, help="path to the yaml configs")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--record", default=None, help="write the report as a baseline json to this path")
+    args = parser.parse_args()
+
+    logger = logging.getLogger('projectL.memory')
+    logger.setLevel(logging.WARNING)
+    definition = as_definition(load_configs(args.configs))
+    profile_game(definition, args.seed, logger)     # warm up the process wide caches (cubes, flood fills)
+    report = profile_game(definition, args.seed, logger)
+    print(format_report(report))
+    if args.record:
+        with open(args.record, 'w') as file:
+            json.dump({"configs": args.configs, "seed": args.seed, "peak": report["peak"],
+                       "retained": report["retained"], "tolerance": BASELINE_TOLERANCE}, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+# ProjectL/parallel.py
+import logging
+import multiprocessing as mp
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from ProjectL.definition import as_definition
+from ProjectL.simulate import play_game
+from ProjectL.stats import BatchStatistics, record_dtype
+
+PROGRESS_DTYPE = np.dtype(np.int64)
+
+
+class SharedBatch:
+    """ the statistics of a batch in one shared memory block: a structured array with a row per game (see
+        stats.record_dtype), preceded by a games done counter per worker
+
+        Workers attach to the block by name (see spec) and write their games into their own rows, so no result
+        goes through a pipe. batch() gives a BatchStatistics over the rows without copying them. The progress
+        counters can be read while the workers run, each worker only ever increments its own.
+
+        The process that created the block unlinks it on close. Views returned by batch() must be dropped before.
+    """
+
+    def __init__(self, n_games, n_players, n_workers=1, name=None):
+        self.n_games = n_games
+        self.n_players = n_players
+        self.n_workers = n_workers
+        self.dtype = record_dtype(n_players)
+        header = n_workers * PROGRESS_DTYPE.itemsize
+        self.owner = name is None
+        self.block = shared_memory.SharedMemory(name=name, create=self.owner,
+                                                size=max(1, header + n_games * self.dtype.itemsize))
+        self.progress_counts = np.ndarray(n_workers, dtype=PROGRESS_DTYPE, buffer=self.block.buf)
+        self.records = np.ndarray(n_games, dtype=self.dtype, buffer=self.block.buf, offset=header)
+        if self.owner:
+            self.progress_counts.fill(0)
+            self.records.fill(0)
+
+    @property
+    def spec(self):
+        """ the arguments attaching another process to this block: SharedBatch(*spec) """
+        return self.n_games, self.n_players, self.n_workers, self.block.name
+
+    @property
+    def games_done(self):
+        return int(self.progress_counts.sum())
+
+    def batch(self):
+        return BatchStatistics.from_records(self.records)
+
+    def summary(self):
+        """ see BatchStatistics.summary, computed on the shared rows in place """
+        return self.batch().summary()
+
+    def close(self):
+        self.progress_counts = self.records = None
+        self.block.close()
+        if self.owner:
+            self.block.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _play_slice(spec, definition, worker, start, stop, seed):
+    """ worker process: games [start, stop) written into rows start to stop of the shared batch """
+    shared = SharedBatch(*spec)
+    batch = shared.batch()
+    logger = logging.getLogger('projectL.batch')
+    logger.setLevel(logging.WARNING)
+    for game_index in range(start, stop):
+        batch.record(game_index, play_game(definition, seed + game_index, logger))
+        shared.progress_counts[worker] += 1
+    del batch
+    shared.close()
+
+
+def run_parallel(configs_dict, n_games, seed=0, workers=None, progress=None, interval=1.0, logger=None):
+    """ run_batch over worker processes, each playing a contiguous slice of the games into a SharedBatch
+
+        Game i is seeded with seed + i as in run_batch, so the results are the same whatever the number of workers.
+        progress(games_done, n_games) is called every interval seconds while the workers run.
+
+        Returns:
+            the SharedBatch - close it (or use it as a context manager) once done with the results
+    """
+    logger = logger or logging.getLogger('projectL.batch')
+    definition = as_definition(configs_dict)
+    workers = max(1, min(workers or mp.cpu_count(), n_games))
+    shared = SharedBatch(n_games, definition.n_players, workers)
+    bounds = np.linspace(0, n_games, workers + 1).astype(int)
+    processes = [mp.Process(target=_play_slice, daemon=True,
+                            args=(shared.spec, definition, worker, int(start), int(stop), seed))
+                 for worker, (start, stop) in enumerate(zip(bounds[:-1], bounds[1:]))]
+    try:
+        for process in processes:
+            process.start()
+        for process in processes:
+            while process.is_alive():
+                process.join(interval)
+                if progress is not None:
+                    progress(shared.games_done, n_games)
+        failed = [worker for worker, process in enumerate(processes) if process.exitcode != 0]
+        if failed:
+            raise RuntimeError(f"Workers {failed} failed, {shared.games_done}/{n_games} games played")
+    except BaseException:
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+        shared.close()
+        raise
+    logger.info("%d games played by %d workers", n_games, workers, extra={"normal": True})
+    return shared
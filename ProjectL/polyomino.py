@@ -0,0 +1,144 @@
+# ProjectL/polyomino.py
+import argparse
+import time
+
+import numpy as np
+import yaml
+
+from ProjectL.classes import Card, CARD_SIZE, FULL_BITS
+from ProjectL.definition import cached_cube, PieceType
+
+NEIGHBOURS = ((1, 0), (-1, 0), (0, 1), (0, -1))
+
+
+def normalize(cells):
+    """ cells translated to start at row 0 and column 0, sorted """
+    min_row = min(r for r, _ in cells)
+    min_col = min(c for _, c in cells)
+    return tuple(sorted((r - min_row, c - min_col) for r, c in cells))
+
+
+def orientations(cells, reflect=True):
+    """ the distinct normalized rotations (and reflections) of a polyomino """
+    forms = set()
+    current = cells
+    for _ in range(4):
+        current = [(c, -r) for r, c in current]         # rotation by 90°
+        forms.add(normalize(current))
+        if reflect:
+            forms.add(normalize([(r, -c) for r, c in current]))
+    return forms
+
+
+def canonical(cells, reflect=True):
+    """ the smallest orientation: equal for polyominoes that are the same up to rotation (and reflection) """
+    return min(orientations(cells, reflect))
+
+
+def grow(polyominoes, reflect=True):
+    """ the polyominoes of size n + 1 made by adding a cell next to one of polyominoes of size n """
+    grown = set()
+    for cells in polyominoes:
+        occupied = set(cells)
+        for r, c in cells:
+            for dr, dc in NEIGHBOURS:
+                cell = (r + dr, c + dc)
+                if cell not in occupied:
+                    grown.add(canonical(cells + (cell,), reflect))
+    return grown
+
+
+def enumerate_polyominoes(max_size, reflect=True):
+    """ {size: sorted canonical forms} of the free polyominoes (one-sided if reflect is False, as pieces are only
+        rotated in game) from size 1 to max_size, each size grown from the previous one
+    """
+    by_size = {1: [((0, 0),)]}
+    for size in range(2, max_size + 1):
+        by_size[size] = sorted(grow(by_size[size - 1], reflect))
+    return by_size
+
+
+def to_shape(cells, board_size=CARD_SIZE):
+    """ board_size x board_size 0/1 grid with the polyomino in the top left corner, None if it does not fit """
+    if max(max(r, c) for r, c in cells) >= board_size:
+        return None
+    shape = np.zeros((board_size, board_size), dtype=int)
+    for r, c in cells:
+        shape[r, c] = 1
+    return shape
+
+
+def piece_configs(max_size, min_size=1, quantity=10, reflect=True):
+    """ piece definitions, as in the "pieces" section of the configs, of every polyomino of min_size to max_size
+        cells that fits on a card. Their cubes are generated into the cube cache (definition.cached_cube)
+
+        Pieces are only rotated in game, never flipped: with reflect=True a chiral polyomino gives one piece, with
+        reflect=False (one-sided polyominoes) its mirror image is a piece of its own.
+    """
+    pieces = []
+    for size, forms in enumerate_polyominoes(max_size, reflect).items():
+        if size < min_size:
+            continue
+        for index, cells in enumerate(forms):
+            shape = to_shape(cells)
+            if shape is None:
+                continue
+            cached_cube(shape)
+            pieces.append({"name": f"mino{size}_{index}", "level": size, "quantity": quantity,
+                           "shape": shape.tolist()})
+    return pieces
+
+
+def scaling_report(max_size, reflect=True, repeat=200):
+    """ per polyomino size: pieces, configurations, time to generate the cubes and to check placements on an empty
+        card (numpy layout check and bitboard check) - to see how the engine scales with piece count and size
+    """
+    card = Card()
+    card.mask = np.ones((CARD_SIZE, CARD_SIZE), dtype=bool)
+    card.mask_bits = FULL_BITS
+    rows = []
+    for size, forms in enumerate_polyominoes(max_size, reflect).items():
+        shapes = [shape for shape in (to_shape(cells) for cells in forms) if shape is not None]
+        start = time.perf_counter()
+        piece_types = [PieceType({"name": f"mino{size}_{i}", "level": size, "shape": shape})
+                       for i, shape in enumerate(shapes)]
+        cube_time = time.perf_counter() - start
+        cubes = [piece_type.cube for piece_type in piece_types]
+        n_configurations = sum(len(cube) for cube in cubes)
+
+        start = time.perf_counter()
+        for cube in cubes:
+            for configuration in cube:
+                card.placement_valid(configuration)
+        layout_check = (time.perf_counter() - start) / max(n_configurations, 1)
+
+        all_bits = np.concatenate([piece_type.cube_bits for piece_type in piece_types])
+        start = time.perf_counter()
+        for _ in range(repeat):
+            np.count_nonzero(all_bits & ~card.empty_bits == 0)
+        bits_check = (time.perf_counter() - start) / repeat / max(n_configurations, 1)
+        rows.append({"size": size, "pieces": len(shapes), "skipped": len(forms) - len(shapes),
+                     "configurations": n_configurations, "cube_ms": cube_time * 1e3,
+                     "layout_check_us": layout_check * 1e6, "bits_check_ns": bits_check * 1e9})
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Polyomino piece library and engine scaling report")
+    parser.add_argument("--max-size", type=int, default=6)
+    parser.add_argument("--one-sided", action="store_true", help="mirror images are distinct pieces")
+    parser.add_argument("--yaml", default=None, help="write the piece definitions to this yaml file")
+    args = parser.parse_args()
+
+    reflect = not args.one_sided
+    print(" size  pieces  skipped  configs   cubes ms  layout check us  bits check ns")
+    for row in scaling_report(args.max_size, reflect):
+        print(f"{row['size']:5d}  {row['pieces']:6d}  {row['skipped']:7d}  {row['configurations']:7d}  "
+              f"{row['cube_ms']:9.2f}  {row['layout_check_us']:15.2f}  {row['bits_check_ns']:13.2f}")
+    if args.yaml:
+        with open(args.yaml, 'w') as file:
+            yaml.safe_dump({"pieces": piece_configs(args.max_size, reflect=reflect)}, file, default_flow_style=None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+# ProjectL/selfplay.py
+import argparse
+import json
+import logging
+import os
+import random
+
+import numpy as np
+
+from ProjectL.definition import as_definition, load_configs
+from ProjectL.game_objects import GameManager, LearnedStrat
+from ProjectL.simulate import file_path, _write_atomic
+from ProjectL.value_model import StateFeatures, SHARDS_MANIFEST
+
+DEFAULT_GAMES_PER_SHARD = 500
+
+
+class GameRecorder:
+    """ collects the position (StateFeatures vector) reached by every successful action of a game, seen from the
+        player who moved. Pass it to GameManager(recorder=...).
+
+        outcomes() gives the training target of each position once the game is over: the final score of the player
+        minus the best final score of the others (its final score alone in a one player game).
+    """
+
+    def __init__(self, features):
+        self.features = features
+        self.rows = []
+        self.seats = []
+
+    def record(self, player, actions_left):
+        self.rows.append(self.features.state(player.game_manager, player, actions_left))
+        self.seats.append(player.index)
+
+    def outcomes(self, game_manager):
+        scores = np.array([player.final_score for player in game_manager.players], dtype=np.float32)
+        margins = scores.copy()
+        if len(scores) > 1:
+            for seat in range(len(scores)):
+                margins[seat] -= np.delete(scores, seat).max()
+        return margins[np.asarray(self.seats, dtype=np.int64)]
+
+
+def play_recorded(definition, seed, features, exploration=0.0, logger=None):
+    """ plays one seeded game, returns the (features, outcomes, seats) of the positions its actions reached """
+    random.seed(seed)
+    recorder = GameRecorder(features)
+    game_manager = GameManager(definition, logger, recorder=recorder)
+    for player in game_manager.players:
+        if isinstance(player.strategy, LearnedStrat):
+            player.strategy.exploration = exploration
+    game_manager.run()
+    rows = np.array(recorder.rows, dtype=np.float32).reshape(-1, features.size)
+    return rows, recorder.outcomes(game_manager), np.asarray(recorder.seats, dtype=np.int8)
+
+
+def generate(configs_dict, n_games, out_dir, games_per_shard=DEFAULT_GAMES_PER_SHARD, seed=0, exploration=0.0,
+             logger=None):
+    """ plays n_games with the players of the configs and writes the positions of their games to out_dir
+
+        Each shard holds games_per_shard games in a compressed npz: features (n, size) int16 - every feature is a
+        count -, outcomes (n,) float32, seats (n,) int8 and games (n,) int64, the seed of the game of each row.
+        Shards are listed in the manifest once written, generating again into out_dir resumes like
+        simulate.run_checkpointed. Games with a "learned" player are self-play data of its model, exploration is
+        the probability of its random moves.
+
+        Returns:
+            the manifest
+    """
+    logger = logger or logging.getLogger('projectL.batch')
+    definition = as_definition(configs_dict)
+    features = StateFeatures(definition)
+    os.makedirs(out_dir, exist_ok=True)
+    run = {"n_games": n_games, "games_per_shard": games_per_shard, "seed": seed, "exploration": exploration,
+           "config_hash": definition.config_hash, "n_features": features.size}
+    manifest_path = os.path.join(out_dir, SHARDS_MANIFEST)
+    if os.path.exists(manifest_path):
+        with open(manifest_path, 'r') as file:
+            manifest = json.load(file)
+        if any(manifest[key] != value for key, value in run.items()):
+            raise ValueError(f"{out_dir} holds a different run {({key: manifest[key] for key in run})}, "
+                             f"cannot resume it with {run}")
+    else:
+        manifest = dict(run, feature_names=features.names(), shards={})
+
+    n_shards = -(-n_games // games_per_shard)
+    for shard in range(n_shards):
+        if str(shard) in manifest["shards"]:
+            continue
+        seed_start = seed + shard * games_per_shard
+        games = min(games_per_shard, n_games - shard * games_per_shard)
+        parts = [play_recorded(definition, game_seed, features, exploration, logger)
+                 for game_seed in range(seed_start, seed_start + games)]
+        arrays = {"features": np.concatenate([rows for rows, _, _ in parts]).astype(np.int16),
+                  "outcomes": np.concatenate([outcomes for _, outcomes, _ in parts]),
+                  "seats": np.concatenate([seats for _, _, seats in parts]),
+                  "games": np.concatenate([np.full(len(rows), seed_start + i, dtype=np.int64)
+                                           for i, (rows, _, _) in enumerate(parts)])}
+        file_name = f"shard_{shard:06d}.npz"
+        _write_atomic(os.path.join(out_dir, file_name), lambda file: np.savez_compressed(file, **arrays))
+        manifest["shards"][str(shard)] = {"file": file_name, "seed_start": seed_start, "n_games": games,
+                                          "n_positions": len(arrays["outcomes"])}
+        _write_atomic(manifest_path, lambda file: file.write(json.dumps(manifest, indent=2).encode()))
+        logger.info("Shard %d/%d done (%d positions)", shard + 1, n_shards, len(arrays["outcomes"]),
+                    extra={"normal": True})
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate self-play positions and outcomes to train a value model")
+    parser.add_argument("--configs", default=file_path, help="path to the yaml configs")
+    parser.add_argument("--out", default="selfplay", help="directory of the shards, resumed if it exists")
+    parser.add_argument("--games", type=int, default=1000, help="number of games to play")
+    parser.add_argument("--games-per-shard", type=int, default=DEFAULT_GAMES_PER_SHARD)
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first game")
+    parser.add_argument("--strategies", nargs="*", default=None,
+                        help="strategy of each player, in seat order (those of the configs otherwise)")
+    parser.add_argument("--exploration", type=float, default=0.0, help="random move rate of learned players")
+    args = parser.parse_args()
+
+    configs_dict = load_configs(args.configs)
+    if args.strategies:
+        players = configs_dict["players"]
+        if len(args.strategies) != len(players):
+            parser.error(f"{len(players)} strategies expected, one per player of the configs")
+        for player_confs, strategy in zip(players, args.strategies):
+            player_confs["strategy"] = strategy
+    logger = logging.getLogger('projectL.batch')
+    logger.setLevel(logging.WARNING)
+    manifest = generate(configs_dict, args.games, args.out, games_per_shard=args.games_per_shard, seed=args.seed,
+                        exploration=args.exploration, logger=logger)
+    positions = sum(shard["n_positions"] for shard in manifest["shards"].values())
+    print(f"{positions} positions of {args.games} games in {args.out}")
+
+
+if __name__ == "__main__":
+    main()
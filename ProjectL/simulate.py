@@ -0,0 +1,193 @@
+# ProjectL/simulate.py
+import argparse
+import json
+import logging
+import os
+import random
+
+from ProjectL.definition import as_definition, load_configs
+from ProjectL.game_objects import GameManager
+from ProjectL.logging_utils import setup_sampling
+from ProjectL.stats import BatchStatistics, SummaryAccumulator, ACTION_NAMES
+
+dir_path = os.path.dirname(os.path.realpath(__file__))
+parent_dir = os.path.dirname(dir_path)  # since configs are in project root
+file_path = os.path.join(parent_dir, 'configs.yaml')
+
+
+def play_game(configs_dict, seed, logger=None):
+    """ plays one seeded game and returns its GameStatistics. configs_dict may be a GameDefinition """
+    random.seed(seed)
+    gm = GameManager(configs_dict, logger)
+    gm.run()
+    return gm.stats
+
+
+def run_batch(configs_dict, n_games, seed=0, logger=None, sampler=None):
+    """ plays n_games games with the given configs and aggregates their statistics
+
+        Game i is seeded with seed + i, so any game of a batch can be replayed on its own.
+        Only the numbers of each game are kept (in a BatchStatistics), the game objects are dropped as soon as the
+        game ends.
+
+        sampler: optional logging_utils.GameLogSampler choosing the games that are logged (instead of logger)
+    """
+    logger = logger or logging.getLogger('projectL.batch')
+    definition = as_definition(configs_dict)        # parsed once for the whole batch
+    batch = BatchStatistics(n_games, definition.n_players)
+    for game_index in range(n_games):
+        game_seed = seed + game_index
+        if sampler is None:
+            batch.record(game_index, play_game(definition, game_seed, logger))
+            continue
+        stats = play_game(definition, game_seed, sampler.logger_for(game_seed))
+        batch.record(game_index, stats)
+        if sampler.needs_replay(game_seed, stats):
+            play_game(definition, game_seed, sampler.replay_logger(game_seed))
+    return batch
+
+
+MANIFEST = "manifest.json"
+DEFAULT_CHUNK_SIZE = 10000
+
+
+def _write_atomic(path, write):
+    """ write(file) into a temporary file renamed to path, so a crash never leaves a partial file behind """
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'wb') as file:
+        write(file)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(tmp_path, path)
+
+
+def _read_manifest(out_dir):
+    path = os.path.join(out_dir, MANIFEST)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r') as file:
+        return json.load(file)
+
+
+def run_checkpointed(configs_dict, n_games, out_dir, chunk_size=DEFAULT_CHUNK_SIZE, seed=0, logger=None,
+                     sampler=None):
+    """ plays n_games like run_batch, writing the results to out_dir in chunks of chunk_size games
+
+        Each finished chunk is saved (BatchStatistics.save) and recorded with its seed range in the manifest.
+        Calling again with the same arguments resumes: chunks already in the manifest are skipped. Only one chunk
+        is held in memory at a time. sampler: see run_batch
+
+        Returns:
+            the summary of all the games, see summarize_chunks
+    """
+    logger = logger or logging.getLogger('projectL.batch')
+    definition = as_definition(configs_dict)
+    os.makedirs(out_dir, exist_ok=True)
+    run = {"n_games": n_games, "chunk_size": chunk_size, "seed": seed, "config_hash": definition.config_hash,
+           "n_players": definition.n_players}
+    manifest = _read_manifest(out_dir)
+    if manifest is None:
+        manifest = dict(run, chunks={})
+    elif any(manifest[key] != value for key, value in run.items()):
+        raise ValueError(f"{out_dir} holds a different run {({key: manifest[key] for key in run})}, "
+                         f"cannot resume it with {run}")
+
+    n_chunks = -(-n_games // chunk_size)
+    for chunk in range(n_chunks):
+        if str(chunk) in manifest["chunks"]:
+            continue
+        seed_start = seed + chunk * chunk_size
+        games = min(chunk_size, n_games - chunk * chunk_size)
+        batch = run_batch(definition, games, seed=seed_start, logger=logger, sampler=sampler)
+        file_name = f"chunk_{chunk:06d}.npz"
+        _write_atomic(os.path.join(out_dir, file_name), batch.save)
+        # the manifest is only updated once the chunk file is complete
+        manifest["chunks"][str(chunk)] = {"file": file_name, "seed_start": seed_start, "n_games": games}
+        _write_atomic(os.path.join(out_dir, MANIFEST), lambda file: file.write(json.dumps(manifest, indent=2).encode()))
+        logger.info("Chunk %d/%d done (seeds %d-%d)", chunk + 1, n_chunks, seed_start, seed_start + games - 1,
+                    extra={"normal": True})
+    return summarize_chunks(out_dir)
+
+
+def summarize_chunks(out_dir):
+    """ summary of the games of every chunk recorded in the manifest of out_dir, read back one chunk at a time """
+    manifest = _read_manifest(out_dir)
+    if manifest is None:
+        raise FileNotFoundError(f"No {MANIFEST} in {out_dir}")
+    accumulator = SummaryAccumulator(manifest["n_players"])
+    for chunk in sorted(manifest["chunks"], key=int):
+        accumulator.add(BatchStatistics.load(os.path.join(out_dir, manifest["chunks"][chunk]["file"])))
+    return accumulator.summary()
+
+
+def format_summary(summary):
+    """ one line per statistic, one column per player """
+    lines = [f"games: {summary['games']}  mean turns: {summary['turns']:.2f}  "
+             f"skipped turns: {summary['skipped_turns']}  end reasons: {summary['end_reasons']}"]
+    keys = ["points", "final_score", "cards_completed", "pieces_used", "wasted_attempts", "win_rate", "mean_depth",
+            "decision_ms", "budget_overruns"]
+    keys += [f"actions_{name}" for name in ACTION_NAMES]
+    for key in keys:
+        values = "  ".join(f"{v:8.3f}" for v in summary[key])
+        lines.append(f"{key:>22}: {values}")
+    return "\n".join(lines)
+
+
+def add_budget_arguments(parser):
+    """ the command line knobs of game_parameters.decision_budget (see budget.py) """
+    parser.add_argument("--move-time", type=float, default=None, help="seconds per decision of every strategy")
+    parser.add_argument("--nodes", type=int, default=None, help="search nodes per decision of every strategy")
+    parser.add_argument("--game-time", type=float, default=None, help="seconds per game of every strategy")
+
+
+def apply_budget_arguments(configs_dict, args):
+    """ configs_dict with the budget given on the command line, if any, as game_parameters.decision_budget """
+    budget = {name: getattr(args, name) for name in ("move_time", "nodes", "game_time")
+              if getattr(args, name) is not None}
+    if budget:
+        configs_dict["game_parameters"]["decision_budget"] = budget
+    return configs_dict
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a batch of ProjectL games and print aggregated statistics")
+    parser.add_argument("--configs", default=file_path, help="path to the yaml configs")
+    parser.add_argument("--games", type=int, default=100, help="number of games to play")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first game")
+    parser.add_argument("--out", default=None, help="directory to checkpoint the results to, resumed if it exists")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="games per checkpointed chunk")
+    parser.add_argument("--workers", type=int, default=1, help="worker processes (results in shared memory)")
+    add_budget_arguments(parser)
+    args = parser.parse_args()
+
+    if args.out and args.workers > 1:
+        parser.error("--out is not supported with --workers, checkpointed runs play their chunks with a single worker")
+    configs_dict = apply_budget_arguments(load_configs(args.configs), args)
+
+    # batches are silent, games only log warnings and above
+    logger = logging.getLogger('projectL.batch')
+    logger.setLevel(logging.WARNING)
+
+    sampler = setup_sampling(configs_dict)
+    if sampler is not None and args.workers > 1:
+        sampler.close()
+        parser.error("logging.sampling is not supported with --workers, sample games with a single worker")
+    if args.out:
+        summary = run_checkpointed(configs_dict, args.games, args.out, chunk_size=args.chunk_size, seed=args.seed,
+                                   logger=logger, sampler=sampler)
+    elif args.workers > 1:
+        from ProjectL.parallel import run_parallel
+        report = lambda done, total: print(f"\r{done}/{total} games", end="", flush=True)
+        with run_parallel(configs_dict, args.games, seed=args.seed, workers=args.workers, progress=report,
+                          logger=logger) as shared:
+            summary = shared.summary()
+        print()
+    else:
+        summary = run_batch(configs_dict, args.games, seed=args.seed, logger=logger, sampler=sampler).summary()
+    if sampler is not None:
+        sampler.close()
+    print(format_summary(summary))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+# ProjectL/stats.py
+import numpy as np
+
+# order matches the action_id class attribute of the Action subclasses in classes.py
+ACTION_NAMES = ("take_piece", "place_piece", "upgrade_piece", "take_card", "master")
+N_ACTION_TYPES = len(ACTION_NAMES)
+
+# why a game ended, stored as the index in END_REASONS
+END_REASONS = ("max_turns", "final_round", "stalled")
+END_MAX_TURNS, END_FINAL_ROUND, END_STALLED = range(len(END_REASONS))
+
+
+class GameStatistics:
+    """ per-player statistics for a single game, kept in small preallocated numpy arrays
+
+        Every array is indexed by the player index (seat order in GameManager.players). Nothing here holds
+        references to game objects so a finished game can be dropped and only its numbers kept.
+    """
+
+    def __init__(self, n_players):
+        self.n_players = n_players
+        self.points = np.zeros(n_players, dtype=np.int32)
+        self.final_score = np.zeros(n_players, dtype=np.int32)
+        self.cards_completed = np.zeros(n_players, dtype=np.int32)
+        self.pieces_used = np.zeros(n_players, dtype=np.int32)
+        self.actions = np.zeros((n_players, N_ACTION_TYPES), dtype=np.int32)
+        self.wasted_attempts = np.zeros(n_players, dtype=np.int32)
+        # budgeted decisions (see budget.py): how many, the search depth they reached, their time and overruns
+        self.decisions = np.zeros(n_players, dtype=np.int32)
+        self.search_depth = np.zeros(n_players, dtype=np.int32)
+        self.decision_time = np.zeros(n_players, dtype=np.float64)
+        self.budget_overruns = np.zeros(n_players, dtype=np.int32)
+        self.turns = 0
+        self.end_reason = END_MAX_TURNS
+        self.skipped_turns = 0      # turns not played because the game stalled
+
+    def reset(self):
+        """ zeroes all counters in place so the same buffers can be reused for another game """
+        for arr in (self.points, self.final_score, self.cards_completed, self.pieces_used, self.actions, self.wasted_attempts,
+                    self.decisions, self.search_depth, self.decision_time, self.budget_overruns):
+            arr.fill(0)
+        self.turns = 0
+        self.end_reason = END_MAX_TURNS
+        self.skipped_turns = 0
+
+    def record_action(self, player_index, action_id, success=True):
+        """ counts a performed action. A performed action that had no effect (e.g. a placement that did not fit)
+            also counts as a wasted attempt
+        """
+        self.actions[player_index, action_id] += 1
+        if not success:
+            self.wasted_attempts[player_index] += 1
+
+    def record_wasted(self, player_index, count=1):
+        """ counts rejected attempts - actions picked by a strategy that were not valid """
+        self.wasted_attempts[player_index] += count
+
+    def record_decision(self, player_index, depth, seconds, overrun=False):
+        """ counts a budgeted decision, the depth its search completed and the time it took """
+        self.decisions[player_index] += 1
+        self.search_depth[player_index] += depth
+        self.decision_time[player_index] += seconds
+        if overrun:
+            self.budget_overruns[player_index] += 1
+
+    def record_piece_used(self, player_index):
+        self.pieces_used[player_index] += 1
+
+    def record_card_completed(self, player_index, points):
+        self.cards_completed[player_index] += 1
+        self.points[player_index] += points
+
+    def __repr__(self):
+        return f"Points: {self.points} final: {self.final_score} cards: {self.cards_completed} " \
+               f"pieces used: {self.pieces_used} wasted: {self.wasted_attempts} turns: {self.turns} " \
+               f"end: {END_REASONS[self.end_reason]} skipped turns: {self.skipped_turns}"
+
+
+class BatchStatistics:
+    """ aggregates GameStatistics of many games into arrays preallocated for the whole batch
+
+        Each game is copied into its row when it ends, so memory is fixed at n_games x n_players whatever the
+        size of the batch and no per-game python objects need to be kept.
+    """
+
+    def __init__(self, n_games, n_players):
+        self.n_games = n_games
+        self.n_players = n_players
+        self.games_recorded = 0
+        self.points = np.zeros((n_games, n_players), dtype=np.int32)
+        self.final_score = np.zeros((n_games, n_players), dtype=np.int32)
+        self.cards_completed = np.zeros((n_games, n_players), dtype=np.int32)
+        self.pieces_used = np.zeros((n_games, n_players), dtype=np.int32)
+        self.actions = np.zeros((n_games, n_players, N_ACTION_TYPES), dtype=np.int32)
+        self.wasted_attempts = np.zeros((n_games, n_players), dtype=np.int32)
+        self.decisions = np.zeros((n_games, n_players), dtype=np.int32)
+        self.search_depth = np.zeros((n_games, n_players), dtype=np.int32)
+        self.decision_time = np.zeros((n_games, n_players), dtype=np.float64)
+        self.budget_overruns = np.zeros((n_games, n_players), dtype=np.int32)
+        self.turns = np.zeros(n_games, dtype=np.int32)
+        self.end_reason = np.zeros(n_games, dtype=np.int8)
+        self.skipped_turns = np.zeros(n_games, dtype=np.int32)
+
+    def record(self, game_index, game_stats):
+        """ copies the statistics of one finished game into row game_index """
+        n = game_stats.n_players
+        self.points[game_index, :n] = game_stats.points
+        self.final_score[game_index, :n] = game_stats.final_score
+        self.cards_completed[game_index, :n] = game_stats.cards_completed
+        self.pieces_used[game_index, :n] = game_stats.pieces_used
+        self.actions[game_index, :n] = game_stats.actions
+        self.wasted_attempts[game_index, :n] = game_stats.wasted_attempts
+        self.decisions[game_index, :n] = game_stats.decisions
+        self.search_depth[game_index, :n] = game_stats.search_depth
+        self.decision_time[game_index, :n] = game_stats.decision_time
+        self.budget_overruns[game_index, :n] = game_stats.budget_overruns
+        self.turns[game_index] = game_stats.turns
+        self.end_reason[game_index] = game_stats.end_reason
+        self.skipped_turns[game_index] = game_stats.skipped_turns
+        self.games_recorded = max(self.games_recorded, game_index + 1)
+
+    def winners(self):
+        """ index of the player with the best final score for each recorded game (first seat wins ties) """
+        return np.argmax(self.final_score[:self.games_recorded], axis=1)
+
+    def summary(self):
+        """ mean per player of every statistic over the recorded games """
+        accumulator = SummaryAccumulator(self.n_players)
+        accumulator.add(self)
+        return accumulator.summary()
+
+    def save(self, file):
+        """ writes the recorded games to file (a path or an open binary file) as npz """
+        n = self.games_recorded
+        np.savez(file, **{name: getattr(self, name)[:n] for name in BATCH_ARRAYS})
+
+    @classmethod
+    def concatenate(cls, batches):
+        """ one BatchStatistics with the recorded games of batches, in order """
+        batch = cls(sum(b.games_recorded for b in batches), batches[0].n_players)
+        for name in BATCH_ARRAYS:
+            np.concatenate([getattr(b, name)[:b.games_recorded] for b in batches], out=getattr(batch, name))
+        batch.games_recorded = batch.n_games
+        return batch
+
+    @classmethod
+    def from_records(cls, records):
+        """ a BatchStatistics whose arrays are the fields of records (see record_dtype) - views, nothing is copied,
+            so recording a game writes straight into records
+        """
+        batch = cls.__new__(cls)
+        batch.n_games = len(records)
+        batch.n_players = records.dtype["points"].shape[0]
+        batch.games_recorded = batch.n_games
+        for name in BATCH_ARRAYS:
+            setattr(batch, name, records[name])
+        return batch
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as arrays:
+            points = arrays["points"]
+            batch = cls(*points.shape)
+            for name in BATCH_ARRAYS:
+                if name in arrays:      # files saved before an array was added leave it at zero
+                    getattr(batch, name)[:] = arrays[name]
+        batch.games_recorded = batch.n_games
+        return batch
+
+
+# the per game arrays of BatchStatistics, as saved by BatchStatistics.save
+BATCH_ARRAYS = ("points", "final_score", "cards_completed", "pieces_used", "actions", "wasted_attempts", "turns",
+                "end_reason", "skipped_turns", "decisions", "search_depth", "decision_time", "budget_overruns")
+
+
+def record_dtype(n_players):
+    """ numpy structured dtype of one game of BatchStatistics: a field per BATCH_ARRAYS, same dtypes and shapes """
+    batch = BatchStatistics(1, n_players)
+    return np.dtype([(name, getattr(batch, name).dtype, getattr(batch, name).shape[1:]) for name in BATCH_ARRAYS])
+
+
+class SummaryAccumulator:
+    """ running sums of BatchStatistics added one after the other (e.g. the chunks of a long run), so the summary
+        of any number of games is computed without holding them all in memory
+    """
+
+    def __init__(self, n_players):
+        self.n_players = n_players
+        self.games = 0
+        self.sums = {name: np.zeros(n_players) for name in
+                     ("points", "final_score", "cards_completed", "pieces_used", "wasted_attempts", "decisions",
+                      "search_depth", "decision_time", "budget_overruns")}
+        self.actions = np.zeros((n_players, N_ACTION_TYPES))
+        self.turns = 0
+        self.skipped_turns = 0
+        self.end_reasons = np.zeros(len(END_REASONS), dtype=np.int64)
+        self.wins = np.zeros(n_players, dtype=np.int64)
+
+    def add(self, batch):
+        n = batch.games_recorded
+        self.games += n
+        for name, total in self.sums.items():
+            total += getattr(batch, name)[:n].sum(axis=0)
+        self.actions += batch.actions[:n].sum(axis=0)
+        self.turns += int(batch.turns[:n].sum())
+        self.skipped_turns += int(batch.skipped_turns[:n].sum())
+        self.end_reasons += np.bincount(batch.end_reason[:n], minlength=len(END_REASONS))
+        self.wins += np.bincount(batch.winners(), minlength=self.n_players)
+
+    def summary(self):
+        """ same as BatchStatistics.summary over all the games added """
+        n = self.games
+        if n == 0:
+            return {}
+        summary = {"games": n}
+        summary.update({name: total / n for name, total in self.sums.items()})
+        summary["turns"] = self.turns / n
+        summary["skipped_turns"] = self.skipped_turns
+        summary["end_reasons"] = dict(zip(END_REASONS, self.end_reasons.tolist()))
+        summary["win_rate"] = self.wins / n
+        # per decision averages, 0 for players that made no budgeted decision
+        decisions = np.maximum(self.sums["decisions"], 1)
+        summary["mean_depth"] = self.sums["search_depth"] / decisions
+        summary["decision_ms"] = self.sums["decision_time"] / decisions * 1e3
+        for action_id, action_name in enumerate(ACTION_NAMES):
+            summary[f"actions_{action_name}"] = self.actions[:, action_id] / n
+        return summary
@@ -0,0 +1,183 @@
+# ProjectL/sweep.py
+import argparse
+import copy
+import csv
+import itertools
+import json
+import logging
+import os
+from multiprocessing import Pool
+
+import numpy as np
+
+from ProjectL.definition import GameDefinition, load_configs
+from ProjectL.simulate import run_batch, file_path
+from ProjectL.stats import BatchStatistics, END_REASONS
+
+QUANTILES = (0.1, 0.5, 0.9)
+
+
+def _resolve(configs_dict, path):
+    """ (container, key) of a dotted field path. List items are selected by index or by their "name",
+        e.g. "pieces.square_1.quantity" or "cards.0.mask"
+    """
+    segments = path.split(".")
+    node = configs_dict
+    for depth, segment in enumerate(segments):
+        if isinstance(node, list):
+            if segment.isdigit() and int(segment) < len(node):
+                key = int(segment)
+            else:
+                key = next((i for i, item in enumerate(node) if item.get("name") == segment), None)
+                if key is None:
+                    raise ValueError(f"No item '{segment}' in '{path}'")
+        elif isinstance(node, dict):
+            key = segment
+        else:
+            raise ValueError(f"Cannot go into '{segment}' of '{path}'")
+        if depth == len(segments) - 1:
+            return node, key
+        if isinstance(node, dict) and key not in node:
+            raise ValueError(f"No field '{segment}' in '{path}'")
+        node = node[key]
+
+
+def apply_overrides(configs_dict, overrides):
+    """ a copy of configs_dict with the values of overrides ({dotted field path: value}) set """
+    configs = copy.deepcopy(configs_dict)
+    for path, value in overrides.items():
+        container, key = _resolve(configs, path)
+        container[key] = copy.deepcopy(value)
+    return configs
+
+
+def grid_variants(fields):
+    """ every combination of the values of fields ({dotted field path: list of values}) """
+    paths = list(fields)
+    return [dict(zip(paths, values)) for values in itertools.product(*(fields[path] for path in paths))]
+
+
+def random_variants(fields, samples, seed=0):
+    """ samples distinct combinations drawn at random from the grid of fields """
+    grid = grid_variants(fields)
+    rng = np.random.default_rng(seed)
+    picked = rng.choice(len(grid), size=min(samples, len(grid)), replace=False)
+    return [grid[i] for i in sorted(picked)]
+
+
+def _play_chunk(task):
+    """ pool task: games [seed, seed + n) of one variant """
+    variant, definition, seed, n = task
+    logger = logging.getLogger('projectL.sweep')
+    logger.setLevel(logging.WARNING)
+    return variant, run_batch(definition, n, seed=seed, logger=logger)
+
+
+def variant_row(overrides, batch):
+    """ one row of the sweep table: the overrides, then the score and game length distributions """
+    n = batch.games_recorded
+    scores = batch.final_score[:n].ravel()
+    turns = batch.turns[:n]
+    row = {path: json.dumps(value) if isinstance(value, (list, dict)) else value for path, value in overrides.items()}
+    row["games"] = n
+    for name, values in (("score", scores), ("turns", turns)):
+        row[f"{name}_mean"] = float(values.mean())
+        row[f"{name}_std"] = float(values.std())
+        for q, value in zip(QUANTILES, np.quantile(values, QUANTILES)):
+            row[f"{name}_p{int(q * 100)}"] = float(value)
+    row["first_seat_win_rate"] = float(np.mean(batch.winners() == 0))
+    counts = np.bincount(batch.end_reason[:n], minlength=len(END_REASONS))
+    for reason, count in zip(END_REASONS, counts):
+        row[f"end_{reason}"] = count / n
+    return row
+
+
+class Sweep:
+    """ plays n_games of every variant of the configs and tabulates their score and length distributions
+
+        Each variant is compiled into its GameDefinition once, its games are split in chunks of chunk_size played
+        across a process pool. Results are cached in cache_dir under the hash of the variant's configs (and the
+        games played), so running a sweep again only plays the variants it has not seen.
+    """
+
+    def __init__(self, configs_dict, variants, n_games=100, seed=0, cache_dir="sweep_cache", chunk_size=50,
+                 workers=None, logger=None):
+        self.configs = configs_dict
+        self.variants = variants
+        self.n_games = n_games
+        self.seed = seed
+        self.cache_dir = cache_dir
+        self.chunk_size = chunk_size
+        self.workers = workers or os.cpu_count()
+        self.logger = logger or logging.getLogger('projectL.sweep')
+
+    def _cache_path(self, definition):
+        return os.path.join(self.cache_dir, f"{definition.config_hash}_{self.n_games}_{self.seed}.npz")
+
+    def run(self):
+        """ returns the table, a list of rows (dicts) in the order of the variants """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        definitions = [GameDefinition(apply_overrides(self.configs, overrides)) for overrides in self.variants]
+        results = {}
+        tasks = []
+        for index, definition in enumerate(definitions):
+            path = self._cache_path(definition)
+            if os.path.exists(path):
+                results[index] = [BatchStatistics.load(path)]
+                continue
+            results[index] = []
+            for start in range(0, self.n_games, self.chunk_size):
+                tasks.append((index, definition, self.seed + start, min(self.chunk_size, self.n_games - start)))
+        self.logger.info("%d variants, %d cached, %d chunks to play", len(definitions),
+                         len(definitions) - len({task[0] for task in tasks}), len(tasks))
+
+        if tasks:
+            with Pool(self.workers) as pool:
+                # chunks come back in task order, so a variant's games stay in seed order
+                for index, batch in pool.imap(_play_chunk, tasks):
+                    results[index].append(batch)
+            for index in {task[0] for task in tasks}:
+                batch = BatchStatistics.concatenate(results[index])
+                results[index] = [batch]
+                tmp_path = self._cache_path(definitions[index]) + ".tmp"
+                with open(tmp_path, 'wb') as file:
+                    batch.save(file)
+                os.replace(tmp_path, self._cache_path(definitions[index]))
+        return [variant_row(overrides, results[index][0]) for index, overrides in enumerate(self.variants)]
+
+
+def write_table(rows, path):
+    """ writes the sweep table as csv """
+    with open(path, 'w', newline='') as file:
+        writer = csv.DictWriter(file, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parameter sweep over fields of the configs")
+    parser.add_argument("space", help="yaml search space: fields ({dotted path: [values]}), mode (grid|random), "
+                                      "samples (random mode)")
+    parser.add_argument("--configs", default=file_path, help="path to the yaml configs")
+    parser.add_argument("--games", type=int, default=100, help="games per variant")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--cache", default="sweep_cache", help="directory of the cached variant results")
+    parser.add_argument("--out", default="sweep.csv", help="csv table of the results")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    space = load_configs(args.space)
+    if space.get("mode", "grid") == "random":
+        variants = random_variants(space["fields"], space.get("samples", 10), seed=args.seed)
+    else:
+        variants = grid_variants(space["fields"])
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    sweep = Sweep(load_configs(args.configs), variants, n_games=args.games, seed=args.seed, cache_dir=args.cache,
+                  workers=args.workers)
+    rows = sweep.run()
+    write_table(rows, args.out)
+    print(f"{len(rows)} variants written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
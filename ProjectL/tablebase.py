@@ -0,0 +1,226 @@
+# ProjectL/tablebase.py
+import argparse
+import json
+import os
+
+import numpy as np
+
+from ProjectL.classes import CARD_SIZE
+from ProjectL.definition import as_definition, load_configs
+
+IMPOSSIBLE = 255        # min_pieces of a layout that cannot be completed
+MAX_MASK_CELLS = 16     # 2^cells layouts per mask, bigger masks are refused
+# min_pieces and the multiset counts are at most MAX_MASK_CELLS (one cell per piece at least), so uint8 holds them.
+# next_types is a bitmask with one bit per piece type
+MAX_PIECE_TYPES = 64
+
+
+def types_dtype(n_types):
+    """ the smallest unsigned dtype of a bitmask of n_types piece types """
+    for dtype in (np.uint16, np.uint32, np.uint64):
+        if n_types <= np.iinfo(dtype).bits:
+            return np.dtype(dtype)
+    raise ValueError(f"{n_types} piece types is too many for a tablebase (max {MAX_PIECE_TYPES})")
+
+
+def mask_cells(mask_bits):
+    """ card cells (bit positions) of a mask, in increasing order """
+    return [cell for cell in range(CARD_SIZE * CARD_SIZE) if mask_bits >> cell & 1]
+
+
+def compact_tables(mask_bits):
+    """ two lookup tables turning a 25-bit layout into its index among the 2^cells sub-layouts of the mask:
+        index = low[bits & 0x1fff] | high[bits >> 13]
+    """
+    position = {cell: i for i, cell in enumerate(mask_cells(mask_bits))}
+    low = np.zeros(1 << 13, dtype=np.int32)
+    high = np.zeros(1 << 12, dtype=np.int32)
+    for table, offset in ((low, 0), (high, 13)):
+        for cell in range(offset, min(offset + 13, CARD_SIZE * CARD_SIZE)):
+            if cell in position:
+                bit = 1 << (cell - offset)
+                indices = np.arange(len(table))
+                table[(indices & bit) != 0] |= 1 << position[cell]
+    return low, high
+
+
+def build_mask_table(mask_bits, pieces):
+    """ solves every sub-layout of one card mask
+
+        Args:
+            mask_bits: bitboard of the card mask
+            pieces: one Piece (or PieceType) per piece type, in type order
+
+        Returns:
+            dict of arrays indexed by compact layout index: reachable (placing pieces on an empty card can lead to
+            it), min_pieces (pieces needed to complete it, IMPOSSIBLE if it cannot be), next_types (bitmask of the
+            piece types that can be the next piece of a completion), and the completing multisets as CSR arrays
+            (multiset_offsets, multiset_ids) into the returned list multisets (tuples of counts per type)
+    """
+    cells = mask_cells(mask_bits)
+    n_cells = len(cells)
+    if n_cells > MAX_MASK_CELLS:
+        raise ValueError(f"Mask with {n_cells} cells is too big for a tablebase (max {MAX_MASK_CELLS})")
+    low, high = compact_tables(mask_bits)
+    size = 1 << n_cells
+    full = size - 1
+    n_types = len(pieces)
+    mask_dtype = types_dtype(n_types)
+
+    # placements of each piece type that lie inside the mask, as compact bitmasks
+    placements = []
+    for type_index, piece in enumerate(pieces):
+        for bits in piece.cube_bits.tolist():
+            if bits & ~mask_bits == 0:
+                placements.append((type_index, int(low[bits & 0x1fff] | high[bits >> 13])))
+
+    reachable = np.zeros(size, dtype=np.uint8)
+    reachable[0] = 1
+    popcounts = np.array([bin(i).count("1") for i in range(size)])
+    order = np.argsort(popcounts, kind="stable")
+    for layout in order.tolist():
+        if reachable[layout]:
+            for _, placement in placements:
+                if layout & placement == 0:
+                    reachable[layout | placement] = 1
+
+    min_pieces = np.full(size, IMPOSSIBLE, dtype=np.uint8)
+    next_types = np.zeros(size, dtype=mask_dtype)
+    completions = [None] * size         # set of multisets (count tuples) completing each layout
+    min_pieces[full] = 0
+    completions[full] = {(0,) * n_types}
+    for layout in order[::-1].tolist():
+        if layout == full:
+            continue
+        multisets = set()
+        best = IMPOSSIBLE
+        for type_index, placement in placements:
+            if layout & placement or completions[layout | placement] is None:
+                continue
+            best = min(best, min_pieces[layout | placement] + 1)
+            next_types[layout] |= mask_dtype.type(1) << mask_dtype.type(type_index)
+            for multiset in completions[layout | placement]:
+                counts = list(multiset)
+                counts[type_index] += 1
+                multisets.add(tuple(counts))
+        if multisets:
+            min_pieces[layout] = best
+            completions[layout] = multisets
+
+    multiset_ids = {}
+    offsets = np.zeros(size + 1, dtype=np.int64)
+    ids = []
+    for layout in range(size):
+        layout_multisets = sorted(completions[layout]) if completions[layout] and reachable[layout] else []
+        for multiset in layout_multisets:
+            ids.append(multiset_ids.setdefault(multiset, len(multiset_ids)))
+        offsets[layout + 1] = len(ids)
+    return {
+        "reachable": reachable,
+        "min_pieces": np.where(reachable.astype(bool), min_pieces, IMPOSSIBLE).astype(np.uint8),
+        "next_types": np.where(reachable.astype(bool), next_types, 0).astype(mask_dtype),
+        "multiset_offsets": offsets,
+        "multiset_ids": np.array(ids, dtype=np.int32),
+    }, list(multiset_ids)
+
+
+def generate(configs_dict, out_dir):
+    """ builds the tablebase of every card mask of the configs into out_dir (one set of .npy files per mask) """
+    os.makedirs(out_dir, exist_ok=True)
+    definition = as_definition(configs_dict)
+    pieces = definition.piece_types
+    types_dtype(len(pieces))        # refuses piece sets too large before any table is built
+    masks = sorted({card_type.mask_bits for card_type in definition.card_types})
+    all_multisets = {}
+    index = {"piece_names": [piece.name for piece in pieces], "masks": []}
+    for mask_bits in masks:
+        tables, multisets = build_mask_table(mask_bits, pieces)
+        # renumber the multisets of this mask into the tablebase-wide list
+        remap = np.array([all_multisets.setdefault(m, len(all_multisets)) for m in multisets], dtype=np.int32)
+        tables["multiset_ids"] = remap[tables["multiset_ids"]] if len(multisets) else tables["multiset_ids"]
+        for name, array in tables.items():
+            np.save(os.path.join(out_dir, f"mask_{mask_bits:07x}_{name}.npy"), array)
+        index["masks"].append(mask_bits)
+    multisets_array = np.array(list(all_multisets), dtype=np.uint8).reshape(len(all_multisets), len(pieces))
+    np.save(os.path.join(out_dir, "multisets.npy"), multisets_array)
+    with open(os.path.join(out_dir, "index.json"), 'w') as file:
+        json.dump(index, file, indent=2)
+    return index
+
+
+class CardTablebase:
+    """ read side of a generated tablebase. Arrays are memory mapped, so loading is instant and the pages are
+        shared between the processes of a batch
+
+        All lookups take the card bitboards (Card.mask_bits / Card.layout_bits) and are O(1).
+    """
+
+    def __init__(self, path):
+        with open(os.path.join(path, "index.json"), 'r') as file:
+            index = json.load(file)
+        self.path = path
+        self.piece_names = index["piece_names"]
+        self.multisets = np.load(os.path.join(path, "multisets.npy"), mmap_mode="r")
+        self.tables = {}
+        for mask_bits in index["masks"]:
+            tables = {name: np.load(os.path.join(path, f"mask_{mask_bits:07x}_{name}.npy"), mmap_mode="r")
+                      for name in ("reachable", "min_pieces", "next_types", "multiset_offsets", "multiset_ids")}
+            tables["compact"] = compact_tables(mask_bits)
+            self.tables[mask_bits] = tables
+
+    def _index(self, mask_bits, layout_bits):
+        tables = self.tables[mask_bits]
+        low, high = tables["compact"]
+        return tables, int(low[layout_bits & 0x1fff] | high[layout_bits >> 13])
+
+    def has_mask(self, mask_bits):
+        return mask_bits in self.tables
+
+    def min_pieces(self, mask_bits, layout_bits):
+        """ minimum number of pieces to complete the layout, IMPOSSIBLE if it cannot be completed """
+        tables, index = self._index(mask_bits, layout_bits)
+        return int(tables["min_pieces"][index])
+
+    def next_types(self, mask_bits, layout_bits):
+        """ names of the piece types that can be placed next on the way to completing the layout """
+        tables, index = self._index(mask_bits, layout_bits)
+        types = int(tables["next_types"][index])
+        return [name for i, name in enumerate(self.piece_names) if types >> i & 1]
+
+    def completing_multisets(self, mask_bits, layout_bits):
+        """ (n, piece types) array of the piece counts that can complete the layout """
+        tables, index = self._index(mask_bits, layout_bits)
+        offsets = tables["multiset_offsets"]
+        return self.multisets[tables["multiset_ids"][offsets[index]:offsets[index + 1]]]
+
+    def is_completable(self, card, piece_counts=None):
+        """ whether the card can be completed, optionally with at most piece_counts pieces of each type """
+        if piece_counts is None:
+            return self.min_pieces(card.mask_bits, card.layout_bits) != IMPOSSIBLE
+        multisets = self.completing_multisets(card.mask_bits, card.layout_bits)
+        return bool(np.any(np.all(multisets <= np.asarray(piece_counts), axis=1)))
+
+
+_loaded = {}
+
+
+def load_tablebase(path):
+    """ CardTablebase of path, loaded once per process """
+    tablebase = _loaded.get(path)
+    if tablebase is None:
+        tablebase = _loaded[path] = CardTablebase(path)
+    return tablebase
+
+
+def main():
+    from ProjectL.simulate import file_path
+    parser = argparse.ArgumentParser(description="Generate the card tablebase of the configs")
+    parser.add_argument("--configs", default=file_path, help="path to the yaml configs")
+    parser.add_argument("--out", default="tablebase", help="output directory")
+    args = parser.parse_args()
+    index = generate(load_configs(args.configs), args.out)
+    print(f"Tablebase of {len(index['masks'])} card masks written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
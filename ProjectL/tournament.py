@@ -0,0 +1,324 @@
+# ProjectL/tournament.py
+import argparse
+import itertools
+import json
+import logging
+import math
+import os
+from multiprocessing import Pool
+
+import numpy as np
+
+from ProjectL.definition import as_definition, load_configs
+from ProjectL.game_objects import GameManager, STRATEGIES, get_strategy
+from ProjectL.simulate import play_game, file_path, add_budget_arguments, apply_budget_arguments
+
+# one row per game. result_a is the score of strategy a in that game: 1 win, 0.5 draw, 0 loss
+RESULT_DTYPE = np.dtype([
+    ("pairing", np.int32),
+    ("strategy_a", np.int32),
+    ("strategy_b", np.int32),
+    ("seat_a", np.int8),
+    ("seed", np.int64),
+    ("score_a", np.int32),
+    ("score_b", np.int32),
+    ("turns", np.int32),
+    ("result_a", np.float32),
+    ("depth_a", np.float32),        # mean search depth of the budgeted decisions of each side (see budget.py)
+    ("depth_b", np.float32),
+    ("overruns_a", np.int32),       # decisions that took longer than their time budget
+    ("overruns_b", np.int32),
+])
+
+Z_95 = 1.959963984540054
+
+
+class ColumnarWriter:
+    """ streams result rows to disk, one raw binary file per column (read back with read_columns)
+
+        Rows are appended as they arrive so memory stays flat however long the tournament runs, and a single
+        column can be loaded without touching the others.
+    """
+
+    def __init__(self, out_dir, dtype, metadata=None):
+        self.out_dir = out_dir
+        self.dtype = dtype
+        os.makedirs(out_dir, exist_ok=True)
+        schema = {"columns": [[name, dtype.fields[name][0].str] for name in dtype.names], "metadata": metadata or {}}
+        with open(os.path.join(out_dir, "schema.json"), 'w') as file:
+            json.dump(schema, file, indent=2)
+        self.files = {name: open(os.path.join(out_dir, f"{name}.bin"), 'wb') for name in dtype.names}
+        self.rows_written = 0
+
+    def write(self, rows):
+        for name, file in self.files.items():
+            np.ascontiguousarray(rows[name]).tofile(file)
+        self.rows_written += len(rows)
+
+    def close(self):
+        for file in self.files.values():
+            file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def read_columns(out_dir, columns=None):
+    """ loads the columns written by a ColumnarWriter as a dict of numpy arrays """
+    with open(os.path.join(out_dir, "schema.json"), 'r') as file:
+        schema = json.load(file)
+    result = {}
+    for name, dtype_str in schema["columns"]:
+        if columns is None or name in columns:
+            result[name] = np.fromfile(os.path.join(out_dir, f"{name}.bin"), dtype=np.dtype(dtype_str))
+    return result
+
+
+def wilson_interval(score, n, z=Z_95):
+    """ Wilson score interval of a proportion (draws count as half a win) """
+    if n == 0:
+        return 0.0, 1.0
+    p = score / n
+    denominator = 1 + z * z / n
+    centre = (p + z * z / (2 * n)) / denominator
+    half_width = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / denominator
+    return max(0.0, centre - half_width), min(1.0, centre + half_width)
+
+
+def elo_ratings(strategy_a, strategy_b, result_a, n_strategies, iterations=200, base=1500.0):
+    """ Elo ratings fitted on all games at once (Bradley-Terry maximum likelihood, MM iterations)
+
+        Unlike sequential Elo updates the ratings do not depend on the order in which games finished.
+    """
+    wins = np.zeros((n_strategies, n_strategies))
+    np.add.at(wins, (strategy_a, strategy_b), result_a)
+    np.add.at(wins, (strategy_b, strategy_a), 1.0 - result_a)
+    # a small prior against a virtual average opponent keeps ratings finite for undefeated strategies
+    wins += 0.5 * (1 - np.eye(n_strategies)) * (wins + wins.T > 0)
+    games = wins + wins.T
+    total_wins = wins.sum(axis=1)
+    strength = np.ones(n_strategies)
+    for _ in range(iterations):
+        denominator = (games / (strength[:, None] + strength[None, :])).sum(axis=1)
+        strength = np.where(denominator > 0, total_wins / np.maximum(denominator, 1e-12), strength)
+        strength = np.maximum(strength, 1e-12)
+        strength /= np.exp(np.mean(np.log(strength)))
+    return base + 400.0 * np.log10(strength)
+
+
+_worker_definition = None
+
+
+def _init_worker(definition):
+    """ pool initializer - the compiled configs are sent once per worker instead of once per task """
+    global _worker_definition
+    _worker_definition = definition
+    logging.getLogger('projectL.tournament').setLevel(logging.WARNING)
+
+
+def _play_games(task):
+    """ plays n seeds of a pairing, each seed in both seat orders. Returns the rows as a structured array """
+    pairing, strategy_a, strategy_b, names, seed_start, n = task
+    logger = logging.getLogger('projectL.tournament')
+    rows = np.zeros(2 * n, dtype=RESULT_DTYPE)
+    row = 0
+    for seed in range(seed_start, seed_start + n):
+        for seat_a in (0, 1):
+            seats = [names[strategy_a], names[strategy_b]] if seat_a == 0 else [names[strategy_b], names[strategy_a]]
+            definition = _worker_definition.with_players(
+                [{"name": f"{name}_{seat}", "strategy": name} for seat, name in enumerate(seats)])
+            stats = play_game(definition, seed, logger)
+            score_a, score_b = int(stats.final_score[seat_a]), int(stats.final_score[1 - seat_a])
+            depth = stats.search_depth / np.maximum(stats.decisions, 1)
+            rows[row] = (pairing, strategy_a, strategy_b, seat_a, seed, score_a, score_b, stats.turns,
+                         1.0 if score_a > score_b else 0.5 if score_a == score_b else 0.0,
+                         depth[seat_a], depth[1 - seat_a],
+                         stats.budget_overruns[seat_a], stats.budget_overruns[1 - seat_a])
+            row += 1
+    return rows
+
+
+def strategy_error(definition, name):
+    """ why strategy name cannot play with the configs of definition (e.g. the learned strategy without its model
+        file), None if it can. A game is set up with every seat given to the strategy, none is played
+    """
+    get_strategy(name)
+    players = [dict(player_confs, strategy=name) for player_confs in definition.players]
+    try:
+        GameManager(definition.with_players(players))
+    except (ValueError, OSError) as error:
+        return str(error)
+    return None
+
+
+def playable_strategies(definition):
+    """ the registered strategies that can play with the configs of definition, sorted by name """
+    return [name for name in sorted(STRATEGIES) if strategy_error(definition, name) is None]
+
+
+class Tournament:
+    """ round robin between strategies: every pair plays the same seeds in both seat orders
+
+        Games are played in rounds of batch_size seeds per pairing, spread across worker processes. After each
+        round a pairing stops once its Wilson interval no longer contains 0.5 (and it played at least min_games
+        games), or once it reached max_games.
+    """
+
+    def __init__(self, configs_dict, strategy_names, out_dir, max_games=1000, min_games=40, batch_size=20,
+                 seed=0, workers=None, logger=None):
+        if len(strategy_names) < 2:
+            raise ValueError("A tournament needs at least two strategies")
+        self.definition = as_definition(configs_dict)
+        # checked here rather than failing in the worker processes
+        for name in strategy_names:
+            error = strategy_error(self.definition, name)
+            if error is not None:
+                raise ValueError(f"Strategy '{name}' cannot play with these configs: {error}")
+        self.names = list(strategy_names)
+        self.out_dir = out_dir
+        self.max_games = max_games
+        self.min_games = min_games
+        self.batch_size = batch_size
+        self.seed = seed
+        self.workers = workers or os.cpu_count()
+        self.logger = logger or logging.getLogger('projectL.tournament')
+        self.pairings = list(itertools.combinations(range(len(self.names)), 2))
+        # running totals per pairing, enough for early stopping without rereading the results
+        self.games = np.zeros(len(self.pairings), dtype=np.int64)
+        self.score = np.zeros(len(self.pairings))
+        self.settled = np.zeros(len(self.pairings), dtype=bool)
+
+    def _next_tasks(self, seeds_played):
+        tasks = []
+        for pairing, (a, b) in enumerate(self.pairings):
+            if self.settled[pairing]:
+                continue
+            n = min(self.batch_size, (self.max_games - self.games[pairing]) // 2)
+            if n > 0:
+                tasks.append((pairing, a, b, self.names, self.seed + seeds_played, n))
+        return tasks
+
+    def _update(self, rows):
+        np.add.at(self.games, rows["pairing"], 1)
+        np.add.at(self.score, rows["pairing"], rows["result_a"])
+
+    def _check_settled(self):
+        for pairing in range(len(self.pairings)):
+            n = self.games[pairing]
+            if self.settled[pairing] or n < self.min_games:
+                continue
+            low, high = wilson_interval(self.score[pairing], n)
+            if low > 0.5 or high < 0.5 or n >= self.max_games:
+                self.settled[pairing] = True
+                a, b = self.pairings[pairing]
+                self.logger.info("%s vs %s settled after %d games", self.names[a], self.names[b], n)
+
+    def run(self):
+        """ plays the tournament, streaming every game to out_dir. Returns the report (see report()) """
+        metadata = {"strategies": self.names, "seed": self.seed}
+        seeds_played = 0
+        with ColumnarWriter(self.out_dir, RESULT_DTYPE, metadata) as writer, \
+                Pool(self.workers, initializer=_init_worker, initargs=(self.definition,)) as pool:
+            tasks = self._next_tasks(seeds_played)
+            while tasks:
+                for rows in pool.imap_unordered(_play_games, tasks):
+                    writer.write(rows)
+                    self._update(rows)
+                seeds_played += self.batch_size
+                self._check_settled()
+                tasks = self._next_tasks(seeds_played)
+        return self.report()
+
+    def report(self):
+        """ win rates per pairing and per strategy with 95% Wilson intervals, Elo ratings, and the mean search depth
+            and budget overruns per game of each strategy
+        """
+        results = read_columns(self.out_dir, columns=("strategy_a", "strategy_b", "result_a", "depth_a", "depth_b",
+                                                      "overruns_a", "overruns_b"))
+        n_strategies = len(self.names)
+        pairings = []
+        for pairing, (a, b) in enumerate(self.pairings):
+            n = int(self.games[pairing])
+            low, high = wilson_interval(self.score[pairing], n)
+            pairings.append({"a": self.names[a], "b": self.names[b], "games": n,
+                             "win_rate_a": self.score[pairing] / n if n else float("nan"),
+                             "ci": (low, high), "settled": bool(self.settled[pairing])})
+
+        score = np.zeros(n_strategies)
+        games = np.zeros(n_strategies)
+        np.add.at(score, results["strategy_a"], results["result_a"])
+        np.add.at(score, results["strategy_b"], 1.0 - results["result_a"])
+        np.add.at(games, results["strategy_a"], 1)
+        np.add.at(games, results["strategy_b"], 1)
+        depth = np.zeros(n_strategies)
+        overruns = np.zeros(n_strategies)
+        for side in ("a", "b"):
+            np.add.at(depth, results[f"strategy_{side}"], results[f"depth_{side}"])
+            np.add.at(overruns, results[f"strategy_{side}"], results[f"overruns_{side}"])
+        per_game = np.maximum(games, 1)
+        elo = elo_ratings(results["strategy_a"], results["strategy_b"], results["result_a"].astype(float), n_strategies)
+        strategies = []
+        for index, name in enumerate(self.names):
+            low, high = wilson_interval(score[index], games[index])
+            strategies.append({"strategy": name, "games": int(games[index]),
+                               "win_rate": score[index] / games[index] if games[index] else float("nan"),
+                               "ci": (low, high), "elo": float(elo[index]),
+                               "mean_depth": depth[index] / per_game[index],
+                               "overruns": overruns[index] / per_game[index]})
+        strategies.sort(key=lambda s: s["elo"], reverse=True)
+        return {"pairings": pairings, "strategies": strategies}
+
+
+def format_report(report):
+    lines = ["strategy            games  win rate   95% CI          elo    depth  overruns/game"]
+    for s in report["strategies"]:
+        lines.append(f"{s['strategy']:<18} {s['games']:>6}  {s['win_rate']:7.3f}   "
+                     f"[{s['ci'][0]:.3f}, {s['ci'][1]:.3f}]  {s['elo']:7.1f}  {s['mean_depth']:5.2f}  "
+                     f"{s['overruns']:13.2f}")
+    lines.append("")
+    lines.append("pairing                          games  win rate a   95% CI          settled")
+    for p in report["pairings"]:
+        lines.append(f"{p['a'] + ' vs ' + p['b']:<32} {p['games']:>6}  {p['win_rate_a']:9.3f}   "
+                     f"[{p['ci'][0]:.3f}, {p['ci'][1]:.3f}]  {p['settled']}")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Round robin tournament between ProjectL strategies")
+    parser.add_argument("--configs", default=file_path, help="path to the yaml configs")
+    parser.add_argument("--strategies", nargs="+", default=None,
+                        help="registered strategy names, all those that can play with the configs if none")
+    parser.add_argument("--out", default="tournament_results", help="directory for the columnar results")
+    parser.add_argument("--max-games", type=int, default=1000, help="maximum games per pairing")
+    parser.add_argument("--min-games", type=int, default=40, help="games per pairing before early stopping")
+    parser.add_argument("--batch-size", type=int, default=20, help="seeds per pairing and round (x2 seat orders)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None)
+    add_budget_arguments(parser)
+    args = parser.parse_args()
+
+    configs_dict = apply_budget_arguments(load_configs(args.configs), args)
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+
+    strategies = args.strategies
+    if strategies is None:
+        definition = as_definition(configs_dict)
+        strategies = playable_strategies(definition)
+        skipped = sorted(set(STRATEGIES) - set(strategies))
+        if skipped:
+            logging.info("Skipping the strategies that cannot play with these configs: %s", ", ".join(skipped))
+        configs_dict = definition
+    try:
+        tournament = Tournament(configs_dict, strategies, args.out, max_games=args.max_games,
+                                min_games=args.min_games, batch_size=args.batch_size, seed=args.seed,
+                                workers=args.workers)
+    except ValueError as error:
+        parser.error(str(error))
+    print(format_report(tournament.run()))
+
+
+if __name__ == "__main__":
+    main()
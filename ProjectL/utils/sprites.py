@@ -0,0 +1,112 @@
+# ProjectL/utils/sprites.py
+import argparse
+import os
+from multiprocessing import Pool
+
+import numpy as np
+from matplotlib import pyplot as plt
+
+from ProjectL.definition import load_configs, PieceType
+
+# cell codes of a rendered layout
+OUTSIDE, EMPTY, FILLED = range(3)
+# RGB of each cell code, then of the grid lines and the background between tiles
+PALETTE = np.array([[200, 200, 200], [255, 255, 255], [30, 30, 30]], dtype=np.uint8)
+GRID_COLOR = np.array([120, 120, 120], dtype=np.uint8)
+BACKGROUND = np.array([255, 255, 255], dtype=np.uint8)
+ASCII_CHARS = " .#"
+
+
+def piece_codes(cube):
+    """ cell codes of piece layouts (0/1 arrays): empty or filled """
+    return np.asarray(cube, dtype=np.uint8) + EMPTY
+
+
+def card_codes(card):
+    """ cell codes of a card: outside its mask, empty or filled """
+    return np.where(card.mask, np.where(card.layout.astype(bool), FILLED, EMPTY), OUTSIDE).astype(np.uint8)
+
+
+def sprite_sheet(codes, columns=8, cell=12, margin=4):
+    """ all layouts of codes (n, rows, cols) composited into one RGB uint8 image, columns tiles per row
+
+        Every tile is built at once with numpy: palette lookup, upscaling with np.repeat, grid lines drawn with a
+        boolean mask, then the tiles reshaped into the sheet. No plotting call is made.
+    """
+    codes = np.asarray(codes, dtype=np.uint8)
+    if codes.ndim == 2:
+        codes = codes[None]
+    n, height, width = codes.shape
+    tiles = np.repeat(np.repeat(PALETTE[codes], cell, axis=1), cell, axis=2)     # (n, height*cell, width*cell, 3)
+    grid = np.zeros(tiles.shape[1:3], dtype=bool)
+    grid[::cell, :] = grid[-1, :] = True
+    grid[:, ::cell] = grid[:, -1] = True
+    tiles[:, grid] = GRID_COLOR
+
+    rows = -(-n // columns)
+    tile_h, tile_w = tiles.shape[1] + margin, tiles.shape[2] + margin
+    sheet = np.empty((rows * columns, tile_h, tile_w, 3), dtype=np.uint8)
+    sheet[:] = BACKGROUND
+    sheet[:n, margin // 2:margin // 2 + tiles.shape[1], margin // 2:margin // 2 + tiles.shape[2]] = tiles
+    return sheet.reshape(rows, columns, tile_h, tile_w, 3).transpose(0, 2, 1, 3, 4).reshape(rows * tile_h,
+                                                                                            columns * tile_w, 3)
+
+
+def ascii_sheet(codes, columns=8, chars=ASCII_CHARS):
+    """ the layouts of codes as text, columns tiles per row separated by a space - for a quick look in a terminal """
+    codes = np.asarray(codes, dtype=np.uint8)
+    if codes.ndim == 2:
+        codes = codes[None]
+    lookup = np.array(list(chars))
+    blocks = []
+    for start in range(0, len(codes), columns):
+        text = lookup[codes[start:start + columns]]                 # (tiles, rows, cols) of single chars
+        blocks.append("\n".join(" ".join("".join(row) for row in text[:, r]) for r in range(text.shape[1])))
+    return "\n\n".join(blocks)
+
+
+def render_piece(task):
+    """ pool task: writes the sprite sheet of one piece's cube to out_dir, returns its path """
+    piece_confs, out_dir, columns, cell = task
+    piece_type = PieceType(piece_confs)
+    path = os.path.join(out_dir, f"{piece_type.name}_layouts.png")
+    plt.imsave(path, sprite_sheet(piece_codes(piece_type.cube), columns, cell))
+    return path
+
+
+def render_pieces(pieces_configs, out_dir, columns=8, cell=12, workers=None):
+    """ one sprite sheet per piece in out_dir, pieces rendered in parallel processes. Returns the paths """
+    os.makedirs(out_dir, exist_ok=True)
+    tasks = [(piece_confs, out_dir, columns, cell) for piece_confs in pieces_configs]
+    if workers == 1 or len(tasks) < 2:
+        return [render_piece(task) for task in tasks]
+    with Pool(workers) as pool:
+        return pool.map(render_piece, tasks)
+
+
+def main():
+    from ProjectL.simulate import file_path
+    parser = argparse.ArgumentParser(description="Render the layouts of every piece as sprite sheets or text")
+    parser.add_argument("pieces", nargs="*", help="piece names, all pieces of the configs if none")
+    parser.add_argument("--configs", default=file_path, help="path to the yaml configs")
+    parser.add_argument("--out", default="layouts", help="directory of the png sprite sheets")
+    parser.add_argument("--ascii", action="store_true", help="print the layouts instead of writing images")
+    parser.add_argument("--columns", type=int, default=8)
+    parser.add_argument("--cell", type=int, default=12, help="pixels per cell")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    pieces = [piece for piece in load_configs(args.configs)["pieces"] if not args.pieces or piece["name"] in args.pieces]
+    if args.ascii:
+        for piece_confs in pieces:
+            piece_type = PieceType(piece_confs)
+            print(f"{piece_type.name}: {len(piece_type.cube)} layouts")
+            print(ascii_sheet(piece_codes(piece_type.cube), args.columns))
+            print()
+        return
+    for path in render_pieces(pieces, args.out, args.columns, args.cell, args.workers):
+        print(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,327 @@
+# ProjectL/value_model.py
+import argparse
+import json
+import logging
+import os
+
+import numpy as np
+
+from ProjectL.classes import CARD_SIZE, FULL_BITS, MAX_CARDS_HELD
+
+CELLS = CARD_SIZE * CARD_SIZE
+_CELL_SHIFTS = np.arange(CELLS, dtype=np.int64)
+# kinds of the moves of StateFeatures.afterstates
+PLACE, TAKE_PIECE, TAKE_CARD, PASS = range(4)
+GAME_FEATURES = ("turn", "rounds_left", "actions_left", "supply")
+SHARDS_MANIFEST = "manifest.json"
+
+
+def bits_to_cells(bits):
+    """ 0/1 cells of bitboards (an int or an int64 array), the cell r*5+c along a new last axis """
+    return (np.asarray(bits, dtype=np.int64)[..., None] >> _CELL_SHIFTS) & 1
+
+
+class StateFeatures:
+    """ a game position as a flat float32 vector, seen from one player:
+
+        per card slot (MAX_CARDS_HELD)  the 25 cells filled, the 25 cells of the card mask, the card points
+        inventory                       pieces held per type: the player first, then the others in seat order
+        bank                            pieces left per type
+        points                          points scored, in the order of inventory
+        game                            turn number, rounds left, actions left in the turn, cards in the supply
+
+        afterstates() gives the vectors of the positions every legal move leads to, all built at once with numpy
+        from the vector of the current position: no move is played.
+    """
+
+    def __init__(self, definition):
+        self.n_types = len(definition.piece_types)
+        self.n_players = definition.n_players
+        self.n_slots = MAX_CARDS_HELD
+        self.slot_size = 2 * CELLS + 1
+        self.type_index = dict(definition.type_index)
+        self.inventory = self.n_slots * self.slot_size
+        self.bank = self.inventory + self.n_players * self.n_types
+        self.points = self.bank + self.n_types
+        self.game = self.points + self.n_players
+        self.size = self.game + len(GAME_FEATURES)
+        # cube bitboards padded with FULL_BITS (never fit) to the largest number of configurations
+        n_configurations = max(len(piece_type.cube_bits) for piece_type in definition.piece_types)
+        self.cube_bits = np.full((self.n_types, n_configurations), FULL_BITS, dtype=np.int64)
+        for type_index, piece_type in enumerate(definition.piece_types):
+            self.cube_bits[type_index, :len(piece_type.cube_bits)] = piece_type.cube_bits
+        self.cube_cells = bits_to_cells(self.cube_bits).astype(np.float32)
+
+    def names(self):
+        """ the name of every feature, in order """
+        names = []
+        for slot in range(self.n_slots):
+            names += [f"card{slot}_cell{cell}" for cell in range(CELLS)]
+            names += [f"card{slot}_mask{cell}" for cell in range(CELLS)]
+            names.append(f"card{slot}_points")
+        names += [f"inventory{row}_{name}" for row in range(self.n_players) for name in self.type_index]
+        names += [f"bank_{name}" for name in self.type_index]
+        names += [f"points{row}" for row in range(self.n_players)]
+        return names + list(GAME_FEATURES)
+
+    def seat_order(self, player):
+        return [player.index] + [seat for seat in range(self.n_players) if seat != player.index]
+
+    def _write_card(self, slots, slot, card):
+        slots[..., slot, :CELLS] = bits_to_cells(card.layout_bits)
+        slots[..., slot, CELLS:2 * CELLS] = bits_to_cells(card.mask_bits)
+        slots[..., slot, -1] = card.reward.points
+
+    def state(self, game_manager, player, actions_left, out=None):
+        """ the vector of the current position for player, with actions_left actions left in its turn """
+        x = np.zeros(self.size, dtype=np.float32) if out is None else out
+        x.fill(0)
+        slots = x[:self.inventory].reshape(self.n_slots, self.slot_size)
+        for slot, card in enumerate(player.cards[:self.n_slots]):
+            self._write_card(slots, slot, card)
+        seats = self.seat_order(player)
+        zobrist = game_manager.zobrist
+        x[self.inventory:self.bank] = np.asarray(zobrist.inventory, dtype=np.float32)[seats].ravel()
+        x[self.bank:self.points] = zobrist.bank
+        x[self.points:self.game] = [game_manager.players[seat].points for seat in seats]
+        game_state = game_manager.game_state
+        x[self.game:] = (game_state.current_turn_number, game_state.last_turn - game_state.current_turn_number + 1,
+                         actions_left, len(game_manager.cards))
+        return x
+
+    def afterstates(self, game_manager, player, actions_left):
+        """ the positions player can reach with its next action, actions_left being the actions it has now
+
+            Returns:
+                features: (n, size) float32, a row per move, as state() would give right after the move (completed
+                    cards paid out, see Player.collect_reward)
+                moves: (n, 4) int64 rows of kind (PLACE, TAKE_PIECE, TAKE_CARD or PASS), type index, slot, cube index
+        """
+        base = self.state(game_manager, player, actions_left - 1)
+        zobrist = game_manager.zobrist
+        held = np.asarray(zobrist.inventory[player.index]) > 0
+        bank = np.asarray(zobrist.bank)
+        cards = player.cards[:self.n_slots]
+
+        # placements: every configuration of a held type that fits a card, as in ProjectLEnv.legal_action_mask
+        place_types = place_slots = place_cubes = np.zeros(0, dtype=np.int64)
+        empty = np.zeros(self.n_slots, dtype=np.int64)
+        if cards and held.any():
+            blocked = np.full(self.n_slots, FULL_BITS, dtype=np.int64)
+            for slot, card in enumerate(cards):
+                if not card.is_full:
+                    blocked[slot] = (~card.mask_bits & FULL_BITS) | card.layout_bits
+                    empty[slot] = card.mask_bits & ~card.layout_bits
+            fits = (self.cube_bits[:, None, :] & blocked[None, :, None]) == 0
+            fits &= held[:, None, None]
+            place_types, place_slots, place_cubes = np.nonzero(fits)
+        take_types = np.flatnonzero(bank > 0)
+        take_card = len(player.cards) < self.n_slots and bool(game_manager.cards)
+
+        n_place, n_take = len(place_types), len(take_types)
+        n = n_place + n_take + take_card + 1
+        moves = np.zeros((n, 4), dtype=np.int64)
+        moves[:n_place] = np.stack([np.full(n_place, PLACE), place_types, place_slots, place_cubes], axis=1)
+        moves[n_place:n_place + n_take, 0] = TAKE_PIECE
+        moves[n_place:n_place + n_take, 1] = take_types
+        if take_card:
+            moves[-2, 0] = TAKE_CARD
+            moves[-2, 2] = len(player.cards)
+        moves[-1, 0] = PASS
+
+        features = np.repeat(base[None], n, axis=0)
+        slots = features[:, :self.inventory].reshape(n, self.n_slots, self.slot_size)
+        rows = np.arange(n_place)
+        slots[rows, place_slots, :CELLS] += self.cube_cells[place_types, place_cubes]
+        features[rows, self.inventory + place_types] -= 1
+        # completed cards are paid out: points, placed pieces and reward piece back, later cards move up a slot
+        completes = self.cube_bits[place_types, place_cubes] == empty[place_slots]
+        base_slots = base[:self.inventory].reshape(self.n_slots, self.slot_size)
+        for slot, card in enumerate(cards):
+            done = rows[completes & (place_slots == slot)]
+            if not len(done):
+                continue
+            features[done, self.points] += card.reward.points
+            returned = np.zeros(self.n_types, dtype=np.float32)
+            for piece in card.placed_pieces:
+                returned[self.type_index[piece.name]] += 1
+            features[done, self.inventory:self.inventory + self.n_types] += returned
+            features[done, self.inventory + place_types[done]] += 1
+            reward_piece = card.reward.piece
+            if reward_piece is not None:
+                reward_type = self.type_index.get(getattr(reward_piece, "name", reward_piece))
+                if reward_type is not None and bank[reward_type] > 0:
+                    features[done, self.inventory + reward_type] += 1
+                    features[done, self.bank + reward_type] -= 1
+            slots[done] = np.concatenate([np.delete(base_slots, slot, axis=0), np.zeros((1, self.slot_size))])
+
+        take_rows = np.arange(n_place, n_place + n_take)
+        features[take_rows, self.inventory + take_types] += 1
+        features[take_rows, self.bank + take_types] -= 1
+        if take_card:
+            self._write_card(slots[-2], len(player.cards), game_manager.cards[-1])
+            features[-2, self.game + 3] -= 1
+        features[-1, self.game + 2] = 0     # passing ends the turn
+        return features, moves
+
+
+class ValueModel:
+    """ value of StateFeatures vectors for the player they are seen from: a linear model (no hidden layer) or an MLP
+        with tanh hidden layers. Features are standardised with the mean and scale of the training data.
+
+        predict() evaluates a whole batch of positions with one matrix product per layer.
+    """
+
+    def __init__(self, mean, scale, weights, biases):
+        self.mean = np.asarray(mean, dtype=np.float32)
+        self.scale = np.asarray(scale, dtype=np.float32)
+        self.weights = [np.asarray(w, dtype=np.float32) for w in weights]
+        self.biases = [np.asarray(b, dtype=np.float32) for b in biases]
+
+    @property
+    def n_features(self):
+        return len(self.mean)
+
+    @property
+    def hidden(self):
+        return [len(b) for b in self.biases[:-1]]
+
+    def predict(self, features):
+        """ (n,) values of the (n, n_features) features """
+        h = (np.asarray(features, dtype=np.float32) - self.mean) / self.scale
+        for w, b in zip(self.weights[:-1], self.biases[:-1]):
+            h = np.tanh(h @ w + b)
+        return (h @ self.weights[-1] + self.biases[-1])[:, 0]
+
+    def save(self, file):
+        arrays = {"mean": self.mean, "scale": self.scale}
+        for layer, (w, b) in enumerate(zip(self.weights, self.biases)):
+            arrays[f"w{layer}"] = w
+            arrays[f"b{layer}"] = b
+        np.savez(file, **arrays)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            n_layers = sum(1 for name in data.files if name.startswith("w"))
+            return cls(data["mean"], data["scale"], [data[f"w{layer}"] for layer in range(n_layers)],
+                       [data[f"b{layer}"] for layer in range(n_layers)])
+
+
+_loaded = {}
+
+
+def load_model(path):
+    """ ValueModel of path, loaded once per process """
+    model = _loaded.get(path)
+    if model is None:
+        model = _loaded[path] = ValueModel.load(path)
+    return model
+
+
+def load_shards(data_dir):
+    """ (features, outcomes) of every shard listed in the manifest of data_dir (see selfplay.generate) """
+    with open(os.path.join(data_dir, SHARDS_MANIFEST), 'r') as file:
+        manifest = json.load(file)
+    features, outcomes = [], []
+    for shard in sorted(manifest["shards"], key=int):
+        with np.load(os.path.join(data_dir, manifest["shards"][shard]["file"])) as data:
+            features.append(data["features"].astype(np.float32))
+            outcomes.append(data["outcomes"].astype(np.float32))
+    if not features:
+        raise ValueError(f"No shard in {data_dir}")
+    return np.concatenate(features), np.concatenate(outcomes)
+
+
+def train(features, outcomes, hidden=(), epochs=20, batch_size=256, learning_rate=1e-3, l2=1e-4, validation=0.1,
+          seed=0, logger=None):
+    """ fits a ValueModel to outcomes (n,) from features (n, n_features): mean squared error, Adam, minibatches
+
+        hidden: sizes of the hidden layers, () for a linear model. The last validation part of the samples (shuffled
+        once with seed) is held out and only scored.
+
+        Returns:
+            the model and its history: {"train": [loss per epoch], "validation": [...], "baseline": loss of the mean}
+    """
+    logger = logger or logging.getLogger('projectL.train')
+    rng = np.random.default_rng(seed)
+    features = np.asarray(features, dtype=np.float32)
+    outcomes = np.asarray(outcomes, dtype=np.float32).reshape(-1, 1)
+    order = rng.permutation(len(features))
+    n_valid = int(len(features) * validation)
+    train_rows, valid_rows = order[n_valid:], order[:n_valid]
+    x, y = features[train_rows], outcomes[train_rows]
+
+    mean = x.mean(axis=0)
+    scale = x.std(axis=0)
+    scale[scale < 1e-6] = 1.0
+    sizes = [features.shape[1]] + list(hidden) + [1]
+    weights = [rng.normal(0, 1 / np.sqrt(n_in), (n_in, n_out)).astype(np.float32)
+               for n_in, n_out in zip(sizes[:-1], sizes[1:])]
+    biases = [np.zeros(n_out, dtype=np.float32) for n_out in sizes[1:]]
+    biases[-1][:] = y.mean()
+    model = ValueModel(mean, scale, weights, biases)
+    params = model.weights + model.biases
+    moments = [np.zeros_like(p) for p in params]
+    velocities = [np.zeros_like(p) for p in params]
+    beta1, beta2, epsilon = 0.9, 0.999, 1e-8
+
+    def loss(rows_x, rows_y):
+        return float(np.mean((model.predict(rows_x)[:, None] - rows_y) ** 2)) if len(rows_x) else float("nan")
+
+    history = {"train": [], "validation": [], "baseline": float(np.mean((y - y.mean()) ** 2))}
+    step = 0
+    x_scaled = (x - mean) / scale
+    for epoch in range(epochs):
+        shuffled = rng.permutation(len(x))
+        for start in range(0, len(x), batch_size):
+            batch = shuffled[start:start + batch_size]
+            activations = [x_scaled[batch]]
+            for w, b in zip(model.weights[:-1], model.biases[:-1]):
+                activations.append(np.tanh(activations[-1] @ w + b))
+            error = activations[-1] @ model.weights[-1] + model.biases[-1] - y[batch]
+            grad = 2 * error / len(batch)
+            grads_w, grads_b = [None] * len(model.weights), [None] * len(model.biases)
+            for layer in reversed(range(len(model.weights))):
+                grads_w[layer] = activations[layer].T @ grad + l2 * model.weights[layer]
+                grads_b[layer] = grad.sum(axis=0)
+                if layer:
+                    grad = (grad @ model.weights[layer].T) * (1 - activations[layer] ** 2)
+            step += 1
+            for param, g, m, v in zip(params, grads_w + grads_b, moments, velocities):
+                m *= beta1
+                m += (1 - beta1) * g
+                v *= beta2
+                v += (1 - beta2) * g * g
+                param -= learning_rate * (m / (1 - beta1 ** step)) / (np.sqrt(v / (1 - beta2 ** step)) + epsilon)
+        history["train"].append(loss(x, y))
+        history["validation"].append(loss(features[valid_rows], outcomes[valid_rows]))
+        logger.info("Epoch %d: train loss %.4f, validation loss %.4f", epoch + 1, history["train"][-1],
+                    history["validation"][-1], extra={"normal": True})
+    return model, history
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fit a value model to self-play shards (see ProjectL.selfplay)")
+    parser.add_argument("data", help="directory of the shards")
+    parser.add_argument("--out", default="value_model.npz", help="path of the model written")
+    parser.add_argument("--hidden", type=int, nargs="*", default=[], help="hidden layer sizes, none for linear")
+    parser.add_argument("--epochs", type=int, default=20)
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--lr", type=float, default=1e-3, help="learning rate")
+    parser.add_argument("--l2", type=float, default=1e-4, help="weight decay")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    features, outcomes = load_shards(args.data)
+    model, history = train(features, outcomes, hidden=args.hidden, epochs=args.epochs, batch_size=args.batch_size,
+                           learning_rate=args.lr, l2=args.l2, seed=args.seed)
+    model.save(args.out)
+    print(f"{len(features)} samples, baseline loss {history['baseline']:.4f}")
+    for epoch, (train_loss, valid_loss) in enumerate(zip(history["train"], history["validation"])):
+        print(f"epoch {epoch + 1:3d}: train {train_loss:.4f}  validation {valid_loss:.4f}")
+    print(f"Model written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+# ProjectL/zobrist.py
+import numpy as np
+
+from ProjectL.classes import TakePiece, PlacePiece, TakeCard, decode_move, NO_PIECE_INDEX, CARD_SIZE
+
+MAX_CARD_SLOTS = 8      # cards a player can hold at once, as far as the hash is concerned
+ZOBRIST_SEED = 20250519
+
+
+def card_identity(card):
+    """ what tells cards (or definition.CardType) apart for the hash: mask and reward, cards sharing them are the
+        same card
+    """
+    return card.mask_bits, card.reward.points, getattr(card.reward.piece, "name", card.reward.piece)
+
+
+class ZobristHash:
+    """ 64-bit Zobrist hash of a game, maintained incrementally as actions are made and unmade
+
+        The hash covers: the filled cells of the cards held by each player (by card slot), which card type each slot
+        holds (one of card_types, cards of any other type share one key), the count of each piece type held by each
+        player, the count of each piece type in the bank, the cards left in the supply (the card type at each
+        position of the pile) and the player to move. Counts are tracked here, so updating after an action is O(1)
+        whatever the size of the inventories. Keys only depend on the configs: a transposition table entry stays
+        valid from one decision, strategy or game to the next.
+
+        make / unmake must be called with the game in its post-move state: right after perform_action, and right
+        before undo.
+    """
+
+    def __init__(self, piece_names, n_players, max_count, max_supply, card_types=(), seed=ZOBRIST_SEED):
+        rng = np.random.default_rng(seed)
+        n_types = len(piece_names)
+        keys = lambda *shape: rng.integers(0, 2 ** 64, size=shape, dtype=np.uint64).tolist()
+        self.type_index = {name: index for index, name in enumerate(piece_names)}
+        self.card_index = {card_identity(card_type): index for index, card_type in enumerate(card_types)}
+        self.n_players = n_players
+        self.max_count = max_count
+        self.max_supply = max_supply
+        self.cell_keys = keys(n_players, MAX_CARD_SLOTS, CARD_SIZE * CARD_SIZE)
+        self.slot_keys = keys(n_players, MAX_CARD_SLOTS)
+        self.card_keys = keys(n_players, MAX_CARD_SLOTS, len(card_types) + 1)
+        self.inventory_keys = keys(n_players, n_types, max_count + 1)
+        self.bank_keys = keys(n_types, max_count + 1)
+        self.supply_keys = keys(max_supply + 1)
+        self.pile_keys = keys(max_supply, len(card_types) + 1)
+        self.side_keys = keys(n_players)
+        self.inventory = [[0] * n_types for _ in range(n_players)]
+        self.bank = [0] * n_types
+        self.supply = 0
+        self.side = 0
+        self.key = 0
+
+    @classmethod
+    def for_game(cls, game_manager):
+        """ key tables sized for the configs of a game, hash computed from its current state """
+        definition = game_manager.definition
+        max_count = definition.n_pieces + len(game_manager.players)
+        hasher = cls(definition.piece_names, len(game_manager.players), max_count, max(len(game_manager.cards), 1),
+                     definition.card_types)
+        hasher.rehash(game_manager)
+        return hasher
+
+    def rehash(self, game_manager):
+        """ recomputes counts and hash from scratch, for changes that are not single actions (e.g. card payouts) """
+        n_types = len(self.type_index)
+        self.inventory = [[0] * n_types for _ in range(self.n_players)]
+        self.bank = [len(game_manager.piece_bank.get(name, ())) for name in self.type_index]
+        self.supply = len(game_manager.cards)
+        key = self.bank_keys_xor() ^ self.supply_keys[self.supply] ^ self.side_keys[self.side]
+        for position, card in enumerate(game_manager.cards):
+            key ^= self.pile_keys[position][self._card_index(card)]
+        for player in game_manager.players:
+            counts = self.inventory[player.index]
+            for piece in player.pieces:
+                counts[self.type_index[piece.name]] += 1
+            for type_index, count in enumerate(counts):
+                key ^= self.inventory_keys[player.index][type_index][count]
+            for slot, card in enumerate(player.cards[:MAX_CARD_SLOTS]):
+                key ^= self._slot_key(player.index, slot, card) ^ self._cells_key(player.index, slot, card.layout_bits)
+        self.key = key
+        return key
+
+    def bank_keys_xor(self):
+        key = 0
+        for type_index, count in enumerate(self.bank):
+            key ^= self.bank_keys[type_index][count]
+        return key
+
+    def _card_index(self, card):
+        return self.card_index.get(card_identity(card), len(self.card_index))
+
+    def _slot_key(self, player_index, slot, card):
+        """ slot holds card """
+        return self.slot_keys[player_index][slot] ^ self.card_keys[player_index][slot][self._card_index(card)]
+
+    def _cells_key(self, player_index, slot, bits):
+        key = 0
+        cell_keys = self.cell_keys[player_index][slot]
+        while bits:
+            low = bits & -bits
+            key ^= cell_keys[low.bit_length() - 1]
+            bits ^= low
+        return key
+
+    def _move_inventory(self, player_index, type_index, delta):
+        counts = self.inventory[player_index]
+        keys = self.inventory_keys[player_index][type_index]
+        self.key ^= keys[counts[type_index]] ^ keys[counts[type_index] + delta]
+        counts[type_index] += delta
+
+    def _move_bank(self, type_index, delta):
+        keys = self.bank_keys[type_index]
+        self.key ^= keys[self.bank[type_index]] ^ keys[self.bank[type_index] + delta]
+        self.bank[type_index] += delta
+
+    def _move_supply(self, delta):
+        self.key ^= self.supply_keys[self.supply] ^ self.supply_keys[self.supply + delta]
+        self.supply += delta
+
+    def _update(self, player, action, direction):
+        """ applies (direction=1) or reverts (direction=-1) the effect of action's move record on the hash """
+        player_index = player.index
+        action_id, card_flag, bank_delta, piece_index, placement_bits = decode_move(action.move)
+        if action_id == TakePiece.action_id:
+            type_index = self.type_index[action.piece.name]
+            self._move_inventory(player_index, type_index, direction)
+            if bank_delta:
+                self._move_bank(type_index, -direction * bank_delta)
+        elif action_id == PlacePiece.action_id:
+            slot = next(i for i, card in enumerate(player.cards) if card is action.card)
+            self.key ^= self._cells_key(player_index, slot, placement_bits)
+            if piece_index != NO_PIECE_INDEX:
+                self._move_inventory(player_index, self.type_index[action.piece.name], -direction)
+        elif action_id == TakeCard.action_id:
+            slot = len(player.cards) - 1
+            card = player.cards[slot]
+            self.key ^= self._slot_key(player_index, slot, card)
+            if card_flag:
+                # the card left (or goes back to) the top of the pile
+                position = self.supply - 1 if direction > 0 else self.supply
+                self.key ^= self.pile_keys[position][self._card_index(card)]
+                self._move_supply(-direction)
+
+    def make(self, player, action):
+        self._update(player, action, 1)
+
+    def unmake(self, player, action):
+        self._update(player, action, -1)
+
+    def set_side(self, player_index):
+        """ sets the player to move """
+        self.key ^= self.side_keys[self.side] ^ self.side_keys[player_index]
+        self.side = player_index
+
+
+# transposition table entry bounds
+EXACT, LOWER_BOUND, UPPER_BOUND = 0, 1, 2
+
+
+class TranspositionTable:
+    """ fixed size hash table from Zobrist keys to search results, stored in preallocated numpy arrays
+
+        An entry is (value, depth, bound flag, best move). The table never grows: each key maps to one slot
+        (key & mask) and a new entry replaces the stored one when the slot holds the same key, is empty, comes
+        from an older search generation (see new_search), or was searched less deep.
+    """
+
+    def __init__(self, size_log2=16):
+        size = 1 << size_log2
+        self.mask = size - 1
+        self.keys = np.zeros(size, dtype=np.uint64)
+        self.values = np.zeros(size, dtype=np.float64)
+        self.depths = np.full(size, -1, dtype=np.int16)
+        self.flags = np.zeros(size, dtype=np.int8)
+        self.moves = np.full(size, -1, dtype=np.int64)
+        self.generations = np.zeros(size, dtype=np.int16)
+        self.generation = 0
+        self.hits = 0
+        self.probes = 0
+
+    def new_search(self):
+        """ entries of earlier searches stay usable but are replaced first """
+        self.generation = (self.generation + 1) & 0x7fff
+
+    def probe(self, key):
+        """ returns (value, depth, flag, move) stored for key, or None """
+        self.probes += 1
+        slot = key & self.mask
+        if self.depths[slot] < 0 or self.keys[slot] != key:
+            return None
+        self.hits += 1
+        return float(self.values[slot]), int(self.depths[slot]), int(self.flags[slot]), int(self.moves[slot])
+
+    def store(self, key, value, depth, flag=EXACT, move=-1):
+        slot = key & self.mask
+        stored_depth = self.depths[slot]
+        if (stored_depth >= 0 and self.keys[slot] != key and self.generations[slot] == self.generation
+                and depth < stored_depth):
+            return False
+        self.keys[slot] = key
+        self.values[slot] = value
+        self.depths[slot] = depth
+        self.flags[slot] = flag
+        self.moves[slot] = move
+        self.generations[slot] = self.generation
+        return True
+
+    def clear(self):
+        self.depths.fill(-1)
+        self.hits = self.probes = 0
+
+    def __len__(self):
+        return int(np.count_nonzero(self.depths >= 0))
+
+
+_shared_tables = {}
+
+
+def shared_table(name="default", size_log2=16):
+    """ transposition table shared by every strategy asking for the same name (within a process) """
+    table = _shared_tables.get(name)
+    if table is None:
+        table = _shared_tables[name] = TranspositionTable(size_log2)
+    return table
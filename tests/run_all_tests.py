@@ -7,6 +7,25 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')
 from test_piece import TestPiece
 from test_cube_generation import TestCubeGeneration
 from tests.test_game_integration import TestGameIntegration
+from tests.test_scoring import TestScoring
+from tests.test_tournament import TestTournament
+from tests.test_card import TestCard
+from tests.test_moves import TestMoves, TestZobrist
+from tests.test_tablebase import TestTablebase
+from tests.test_env import TestEnv
+from tests.test_definition import TestDefinition
+from tests.test_memory import TestMemory
+from tests.test_sweep import TestSweep
+from tests.test_density import TestDensity
+from tests.test_polyomino import TestPolyomino
+from tests.test_benchmark import TestBenchmark
+from tests.test_budget import TestBudget
+from tests.test_parallel import TestParallel
+from tests.test_logging import TestLogging
+from tests.test_sprites import TestSprites
+from tests.test_fit_index import TestFitIndex
+from tests.test_endgame import TestEndgame
+from tests.test_value_model import TestValueModel
 
 if __name__ == '__main__':
     # Create test suite
@@ -16,6 +35,26 @@ if __name__ == '__main__':
     suite.addTest(unittest.TestLoader().loadTestsFromTestCase(TestPiece))
     suite.addTest(unittest.TestLoader().loadTestsFromTestCase(TestCubeGeneration))
     suite.addTest(unittest.TestLoader().loadTestsFromTestCase(TestGameIntegration))
+    suite.addTest(unittest.TestLoader().loadTestsFromTestCase(TestScoring))
+    suite.addTest(unittest.TestLoader().loadTestsFromTestCase(TestTournament))
+    suite.addTest(unittest.TestLoader().loadTestsFromTestCase(TestCard))
+    suite.addTest(unittest.TestLoader().loadTestsFromTestCase(TestMoves))
+    suite.addTest(unittest.TestLoader().loadTestsFromTestCase(TestZobrist))
+    suite.addTest(unittest.TestLoader().loadTestsFromTestCase(TestTablebase))
+    suite.addTest(unittest.TestLoader().loadTestsFromTestCase(TestEnv))
+    suite.addTest(unittest.TestLoader().loadTestsFromTestCase(TestDefinition))
+    suite.addTest(unittest.TestLoader().loadTestsFromTestCase(TestMemory))
+    suite.addTest(unittest.TestLoader().loadTestsFromTestCase(TestSweep))
+    suite.addTest(unittest.TestLoader().loadTestsFromTestCase(TestDensity))
+    suite.addTest(unittest.TestLoader().loadTestsFromTestCase(TestPolyomino))
+    suite.addTest(unittest.TestLoader().loadTestsFromTestCase(TestBenchmark))
+    suite.addTest(unittest.TestLoader().loadTestsFromTestCase(TestBudget))
+    suite.addTest(unittest.TestLoader().loadTestsFromTestCase(TestParallel))
+    suite.addTest(unittest.TestLoader().loadTestsFromTestCase(TestLogging))
+    suite.addTest(unittest.TestLoader().loadTestsFromTestCase(TestSprites))
+    suite.addTest(unittest.TestLoader().loadTestsFromTestCase(TestFitIndex))
+    suite.addTest(unittest.TestLoader().loadTestsFromTestCase(TestEndgame))
+    suite.addTest(unittest.TestLoader().loadTestsFromTestCase(TestValueModel))
 
     # Run the tests
     runner = unittest.TextTestRunner(verbosity=2, stream=sys.stdout)
@@ -0,0 +1,37 @@
+import unittest
+import logging
+import yaml
+from ProjectL.benchmark import setup_benchmark, action_benchmark
+from ProjectL.classes import TakePiece, PlacePiece, Card, Piece
+from ProjectL.game_objects import Player
+
+
+class TestBenchmark(unittest.TestCase):
+    def setUp(self):
+        with open("tests/test_configs.yaml", 'r') as file:
+            self.test_config = yaml.safe_load(file)
+        self.logger = logging.getLogger('projectL.benchmark')
+        self.logger.setLevel(logging.WARNING)
+
+    def test_setup_cost(self):
+        """Setting a game up from a compiled definition costs much less than building the bank's cubes"""
+        timings = setup_benchmark(self.test_config, repeat=5, logger=self.logger)
+        self.assertLess(timings["lazy_bank"] * 5, timings["eager_bank"])
+        self.assertLess(timings["game_from_definition"], timings["eager_bank"])
+
+    def test_hot_classes_have_no_dict(self):
+        for obj in (TakePiece(), PlacePiece(), Card(), Piece(), Player(name="p", pieces=[Piece()], strategy=object())):
+            self.assertFalse(hasattr(obj, "__dict__"), type(obj).__name__)
+
+    def test_reused_action_is_fresh(self):
+        action = TakePiece(piece_name="line_2")
+        action.move = 1
+        self.assertIs(action.rebind(pieces=[], cards=[]), action)
+        self.assertIsNone(action.piece_name)
+        self.assertIsNone(action.move)
+        results = action_benchmark(self.test_config, n_games=2, attempts=100, logger=self.logger)
+        self.assertGreater(results["attempts_per_game"], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
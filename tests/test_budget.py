@@ -0,0 +1,59 @@
+import unittest
+import pickle
+import logging
+import yaml
+from ProjectL.budget import DecisionBudget, Deadline, SearchTimeout
+from ProjectL.definition import GameDefinition
+from ProjectL.game_objects import GameManager
+
+
+class TestBudget(unittest.TestCase):
+    def setUp(self):
+        with open("tests/test_configs.yaml", 'r') as file:
+            self.test_config = yaml.safe_load(file)
+        self.test_config["players"] = [{"name": "searcher", "strategy": "search"},
+                                       {"name": "greedy", "strategy": "greedy"}]
+        self.logger = logging.getLogger('projectL.test')
+        self.logger.setLevel(logging.WARNING)
+
+    def test_node_limit(self):
+        deadline = Deadline(node_limit=3)
+        for _ in range(3):
+            deadline.tick()
+        with self.assertRaises(SearchTimeout):
+            deadline.tick()
+        self.assertFalse(deadline.overrun)
+
+    def test_game_time_is_shared(self):
+        budget = DecisionBudget(move_time=1.0, game_time=2.0)
+        self.assertAlmostEqual(budget.deadline(decisions_left=4).time_limit, 0.5)
+        self.assertAlmostEqual(budget.deadline(decisions_left=1).time_limit, 1.0)
+        with self.assertRaises(ValueError):
+            DecisionBudget.from_configs({"seconds": 1})
+
+    def test_search_plays_within_node_budget(self):
+        self.test_config["game_parameters"]["decision_budget"] = {"nodes": 50}
+        definition = GameDefinition(self.test_config)
+        self.assertEqual(pickle.loads(pickle.dumps(definition)).decision_budget["nodes"], 50)
+        game_manager = GameManager(definition, self.logger)
+        game_manager.run()
+        stats = game_manager.stats
+        self.assertGreater(stats.decisions[0], 0)
+        self.assertEqual(stats.decisions[1], 0)
+        self.assertGreater(stats.search_depth[0], 0)
+        self.assertEqual(stats.budget_overruns[0], 0)       # node budgets cannot overrun
+
+    def test_deeper_with_more_budget(self):
+        depths = []
+        for nodes in (1, 2000):
+            self.test_config["players"][0]["budget"] = {"nodes": nodes}
+            game_manager = GameManager(self.test_config, self.logger)
+            game_manager.run()
+            stats = game_manager.stats
+            depths.append(stats.search_depth[0] / stats.decisions[0])
+        self.assertLess(depths[0], 1)
+        self.assertGreater(depths[1], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
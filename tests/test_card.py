@@ -0,0 +1,55 @@
+import unittest
+import numpy as np
+import yaml
+from ProjectL.classes import Card, Piece, layout_to_bits, empty_regions, is_layout_dead
+
+
+class TestCard(unittest.TestCase):
+    def setUp(self):
+        with open("tests/test_configs.yaml", 'r') as file:
+            self.configs = yaml.safe_load(file)
+        self.card = Card(self.configs["cards"][0])
+
+    def _place(self, *cells):
+        configuration = np.zeros((5, 5), dtype=int)
+        for cell in cells:
+            configuration[cell] = 1
+        self.assertTrue(self.card.place_piece(configuration))
+
+    def test_layout_bits_follow_layout(self):
+        self._place((0, 2), (1, 2))
+        self.assertEqual(self.card.layout_bits, layout_to_bits(self.card.layout))
+        self.assertEqual(self.card.empty_bits, layout_to_bits(self.card.mask & (self.card.layout == 0)))
+
+    def test_empty_regions(self):
+        """Filling the middle row of the 3x2 mask leaves two separate 2 cell regions"""
+        self.assertEqual(len(self.card.empty_regions()), 1)
+        self._place((1, 2), (1, 3))
+        regions = self.card.empty_regions()
+        self.assertEqual(sorted(region.bit_count() for region in regions), [2, 2])
+        self.assertEqual(sum(regions), self.card.empty_bits)
+
+    def test_regions_do_not_wrap_rows(self):
+        """cells (0, 4) and (1, 0) are consecutive bits but not neighbours"""
+        bits = (1 << 4) | (1 << 5)
+        self.assertEqual(len(empty_regions(bits)), 2)
+
+    def test_dead_card(self):
+        """An isolated 1 cell hole is dead without square pieces"""
+        self._place((0, 2), (1, 2))
+        self._place((0, 3), (1, 3))
+        self._place((2, 2))
+        self.assertTrue(self.card.is_dead({2, 3}))
+        self.assertFalse(self.card.is_dead({1, 2}))
+        self.assertFalse(is_layout_dead(0, frozenset()))
+
+    def test_cube_bits(self):
+        piece = Piece(self.configs["pieces"][1])
+        self.assertEqual(len(piece.cube_bits), piece.cube.shape[0])
+        for layout, bits in zip(piece.cube, piece.cube_bits):
+            self.assertEqual(layout_to_bits(layout), bits)
+            self.assertEqual(int(bits).bit_count(), piece.size)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+import unittest
+import pickle
+import random
+import yaml
+import numpy as np
+from ProjectL.definition import GameDefinition, load_configs
+from ProjectL.game_objects import GameManager
+
+
+class TestDefinition(unittest.TestCase):
+    def setUp(self):
+        with open("tests/test_configs.yaml", 'r') as file:
+            self.test_config = yaml.safe_load(file)
+        self.definition = GameDefinition(self.test_config)
+
+    def test_load_configs(self):
+        self.assertEqual(load_configs("tests/test_configs.yaml"), self.test_config)
+
+    def test_compiled(self):
+        definition = self.definition
+        self.assertEqual(definition.max_turns, 10)
+        self.assertEqual(definition.piece_names, ("square_1", "line_2"))
+        self.assertEqual(definition.type_index["line_2"], 1)
+        self.assertEqual(definition.piece_sizes, frozenset({1, 2}))
+        self.assertEqual(definition.card_types[0].mask_bits, sum(1 << cell for cell in (2, 3, 7, 8, 12, 13)))
+        self.assertEqual(definition.n_players, 2)
+
+    def test_immutable(self):
+        """Neither the definition nor its arrays can be changed, even by editing the source dict"""
+        with self.assertRaises(AttributeError):
+            self.definition.max_turns = 3
+        with self.assertRaises(ValueError):
+            self.definition.piece_types[0].cube[0, 0, 0] = 5
+        self.test_config["game_parameters"]["max_turns"] = 3
+        self.assertEqual(self.definition.max_turns, 10)
+        self.assertEqual(self.definition.configs["game_parameters"]["max_turns"], 10)
+
+    def test_validation(self):
+        self.test_config["pieces"][0]["shape"] = [[1, 0], [0, 0]]
+        with self.assertRaises(ValueError):
+            GameDefinition(self.test_config)
+        del self.test_config["pieces"][0]
+        self.test_config["cards"][0]["reward"]["piece"] = "square_1"
+        with self.assertRaises(ValueError):
+            GameDefinition(self.test_config)
+
+    def test_games_share_prototypes(self):
+        """Every piece of a type shares the cube of the definition, and the game plays as from the dict"""
+        random.seed(3)
+        game_manager = GameManager(self.definition)
+        cube = self.definition.piece_types[1].cube
+        self.assertTrue(all(piece.cube is cube for piece in game_manager.piece_bank["line_2"]))
+        game_manager.run()
+        random.seed(3)
+        from_dict = GameManager(self.test_config)
+        from_dict.run()
+        np.testing.assert_array_equal(game_manager.stats.actions, from_dict.stats.actions)
+
+    def test_pickle(self):
+        definition = pickle.loads(pickle.dumps(self.definition.with_players([{"name": "a", "strategy": "basic"}])))
+        self.assertEqual(definition.players[0]["strategy"], "basic")
+        self.assertEqual(definition.n_players, 1)
+        self.assertEqual(self.definition.n_players, 2)
+        self.assertFalse(definition.piece_types[0].cube.flags.writeable)
+        with self.assertRaises(AttributeError):
+            definition.max_turns = 3
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,42 @@
+import unittest
+import yaml
+import numpy as np
+from ProjectL.classes import Piece, layout_to_bits, FULL_BITS
+from ProjectL.definition import GameDefinition
+
+
+class TestDensity(unittest.TestCase):
+    def setUp(self):
+        with open("tests/test_configs.yaml", 'r') as file:
+            self.test_config = yaml.safe_load(file)
+        self.definition = GameDefinition(self.test_config)
+        self.density = self.definition.density
+        self.mask_bits = self.definition.card_types[0].mask_bits      # 3 rows x 2 columns, columns 2 and 3
+
+    def test_full_card_is_summed_cube(self):
+        piece = Piece(self.test_config["pieces"][1])
+        np.testing.assert_array_equal(self.density.density(1, FULL_BITS), piece.validate_cube())
+
+    def test_density_on_mask(self):
+        # line_2 fits 7 ways in a 3x2 rectangle: corners are covered by 2 of them, middle row cells by 3
+        expected = np.zeros((5, 5), dtype=int)
+        expected[0:3, 2:4] = [[2, 2], [3, 3], [2, 2]]
+        np.testing.assert_array_equal(self.density.density(1, self.mask_bits), expected)
+        self.assertFalse(self.density.maps_of(self.mask_bits).flags.writeable)
+
+    def test_hardest_cell_first(self):
+        # the middle row is filled, only a corner cell is left as the hardest cell
+        layout = np.zeros((5, 5), dtype=int)
+        layout[1, 2:4] = 1
+        empty_bits = self.mask_bits & ~layout_to_bits(layout)
+        hardest = self.density.hardest_cell(self.mask_bits, empty_bits)
+        self.assertIn(hardest, (2, 3, 12, 13))
+        other = next(cell for cell in (12, 13, 2) if cell != hardest)
+        placements = np.array([1 << other, 1 << hardest], dtype=np.int64)
+        order = self.density.order_placements(placements, self.mask_bits, empty_bits)
+        self.assertEqual(list(order), [1, 0])
+        self.assertIsNone(self.density.hardest_cell(self.mask_bits, 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,47 @@
+import unittest
+import logging
+import random
+import yaml
+from ProjectL.budget import Deadline
+from ProjectL.endgame import EndgameSolver, final_score
+from ProjectL.game_objects import GameManager, candidate_moves
+from ProjectL.simulate import run_batch
+from ProjectL.zobrist import TranspositionTable
+
+
+class TestEndgame(unittest.TestCase):
+    def setUp(self):
+        with open("tests/test_configs.yaml", 'r') as file:
+            self.test_config = yaml.safe_load(file)
+        self.test_config["game_parameters"]["max_turns"] = 3
+        self.logger = logging.getLogger('projectL.test')
+        self.logger.setLevel(logging.WARNING)
+
+    def test_search_restores_the_game(self):
+        random.seed(0)
+        game_manager = GameManager(self.test_config, self.logger)
+        player = game_manager.player_1
+        solver = EndgameSolver(game_manager, candidate_moves, TranspositionTable(10))
+        solver.new_game()
+        before = (game_manager.hash, game_manager.bank_count, len(game_manager.cards), len(player.pieces))
+        action = solver.solve(player, 3, 1, Deadline(node_limit=5000))
+        self.assertIsNotNone(action)
+        self.assertGreater(solver.depth_reached, 0)
+        self.assertEqual((game_manager.hash, game_manager.bank_count, len(game_manager.cards), len(player.pieces)),
+                         before)
+        self.assertEqual(final_score(player), 0)
+
+    def test_endgame_beats_basic(self):
+        self.test_config["game_parameters"]["max_turns"] = 2
+        scores = {}
+        for strategy in ("basic", "endgame"):
+            self.test_config["players"] = [{"name": strategy, "strategy": strategy},
+                                           {"name": "basic", "strategy": "basic"}]
+            batch = run_batch(self.test_config, 4, logger=self.logger)
+            scores[strategy] = batch.final_score[:, 0].mean()
+        self.assertGreater(batch.decisions[:, 0].sum(), 0)
+        self.assertGreater(scores["endgame"], scores["basic"])
+
+
+if __name__ == '__main__':
+    unittest.main()
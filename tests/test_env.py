@@ -0,0 +1,80 @@
+import unittest
+import yaml
+import numpy as np
+from ProjectL.env import ProjectLEnv, VectorEnv
+
+
+class TestEnv(unittest.TestCase):
+    def setUp(self):
+        with open("tests/test_configs.yaml", 'r') as file:
+            self.test_config = yaml.safe_load(file)
+        self.test_config["game_parameters"]["end_game_on_empty_supply"] = False
+        self.env = ProjectLEnv(self.test_config)
+
+    def test_reset_shapes(self):
+        obs = self.env.reset(seed=0)
+        space = self.env.action_space
+        self.assertEqual(obs["card_layouts"].shape, (space.n_slots, 5, 5))
+        self.assertEqual(obs["inventory"].shape, (2, space.n_types))
+        self.assertEqual(list(obs["bank"]), [3, 3])
+        mask = self.env.legal_action_mask()
+        self.assertEqual(mask.shape, (space.n,))
+        # nothing to place yet: take a piece, take a card or pass
+        self.assertEqual(list(np.flatnonzero(mask)), [0, 1, space.take_card, space.pass_action])
+
+    def test_legal_mask_matches_actions(self):
+        """Every action of the mask is valid, and the observations are updated in place"""
+        obs = self.env.reset(seed=1)
+        space = self.env.action_space
+        bank = obs["bank"]
+        self.env.step(space.take_card)
+        self.env.step(1)                        # line_2
+        self.assertIs(obs["bank"], bank)
+        self.assertEqual(obs["inventory"][0, 1], 1)
+        self.assertEqual(obs["card_masks"][0].sum(), 6)
+        mask = self.env.legal_action_mask()
+        placements = [a for a in np.flatnonzero(mask) if space.place_offset <= a < space.pass_action]
+        self.assertTrue(placements)
+        for action_id in placements:
+            type_index, slot, cube_index = space.decode_place(action_id)
+            self.assertEqual(type_index, 1)
+            card = self.env.agent.cards[slot]
+            self.assertTrue(card.placement_valid(space.prototypes[type_index].cube[cube_index]))
+        _, _, _, info = self.env.step(placements[0])
+        self.assertFalse(info["illegal"])
+        self.assertEqual(obs["card_layouts"][0].sum(), 2)
+
+    def test_full_game(self):
+        """Random legal actions until the game ends: rewards sum to the final score"""
+        self.env.reset(seed=2)
+        rng = np.random.default_rng(0)
+        total, done, steps = 0.0, False, 0
+        while not done:
+            legal = np.flatnonzero(self.env.legal_action_mask())
+            _, reward, done, info = self.env.step(rng.choice(legal))
+            self.assertFalse(info["illegal"])
+            total += reward
+            steps += 1
+        self.assertEqual(total, info["final_score"])
+        self.assertFalse(self.env.legal_action_mask().any())
+        with self.assertRaises(RuntimeError):
+            self.env.step(0)
+
+    def test_vector_env(self):
+        vector_env = VectorEnv(self.test_config, n_envs=3, seed=5)
+        observations = vector_env.reset()
+        self.assertEqual(observations["card_layouts"].shape[0], 3)
+        games_done = 0
+        for _ in range(50):
+            actions = [np.flatnonzero(mask)[0] for mask in vector_env.legal_action_mask()]
+            _, rewards, dones, infos = vector_env.step(actions)
+            self.assertEqual(len(infos), 3)
+            games_done += dones.sum()
+        self.assertEqual(rewards.shape, (3,))
+        # finished games were reset and kept going
+        self.assertGreater(games_done, 0)
+        self.assertTrue(all(not env.done for env in vector_env.envs))
+
+
+if __name__ == '__main__':
+    unittest.main()
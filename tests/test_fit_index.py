@@ -0,0 +1,40 @@
+import unittest
+import yaml
+from ProjectL.classes import layout_to_bits
+from ProjectL.definition import GameDefinition
+from ProjectL.fit_index import canonical_region
+
+
+class TestFitIndex(unittest.TestCase):
+    def setUp(self):
+        with open("tests/test_configs.yaml", 'r') as file:
+            self.test_config = yaml.safe_load(file)
+        self.definition = GameDefinition(self.test_config)
+        self.index = self.definition.fit_index
+        self.mask_bits = self.definition.card_types[0].mask_bits      # 3 rows x 2 columns, columns 2 and 3
+
+    def test_canonical_region(self):
+        domino = (1 << 0) | (1 << 1)
+        self.assertEqual(canonical_region(domino << 18), domino)
+        self.assertEqual(canonical_region((1 << 4) | (1 << 9)), (1 << 0) | (1 << 5))
+        self.assertEqual(canonical_region(0), 0)
+
+    def test_exact_placements(self):
+        vertical = (1 << 7) | (1 << 12)
+        self.assertEqual(self.index.types_for(vertical), {1})
+        self.assertEqual(self.index.types_for(1 << 24), {0})
+        self.assertEqual(self.index.types_for(vertical | 1 << 8), frozenset())
+        (type_index, cube_index), = self.index.placements_for(vertical)
+        self.assertEqual(layout_to_bits(self.definition.piece_types[type_index].cube[cube_index]), vertical)
+
+    def test_exact_fits_of_card_holes(self):
+        # columns 2-3 of rows 0-2, everything filled but cells 12 and 13: a horizontal domino hole
+        empty_bits = (1 << 12) | (1 << 13)
+        fits = self.index.exact_fits(empty_bits)
+        self.assertEqual([(region, type_index) for region, type_index, _ in fits], [(empty_bits, 1)])
+        self.assertEqual(self.index.exact_fits(empty_bits, types={0}), [])
+        self.assertEqual(len(self.index.exact_fits(1 << 2 | 1 << 13)), 2)      # two single cell holes
+
+
+if __name__ == '__main__':
+    unittest.main()
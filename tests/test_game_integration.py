@@ -1,7 +1,11 @@
 import unittest
 import os
+import copy
+import random
 import yaml
-from ProjectL.game_objects import GameManager, Player, RandomStrat, BasicStrat, TakePieceStrat
+from ProjectL.game_objects import GameManager, Player, RandomStrat, BasicStrat, TakePieceStrat, GreedyStrat
+from ProjectL.stats import END_STALLED
+from ProjectL.classes import PieceSquare, TakePiece
 
 
 class TestGameIntegration(unittest.TestCase):
@@ -55,5 +59,108 @@ class TestGameIntegration(unittest.TestCase):
                            game_manager.game_state.max_turns + 1)  # +1 because turn is incremented after max
         #
 
+    def test_players_from_configs(self):
+        """Any number of players can be seated, each with the strategy named in the configs"""
+        configs = copy.deepcopy(self.test_config)
+        strategies = ["basic", "random", "take_piece", "basic"]
+        configs["players"] = [{"name": f"p{i}", "strategy": name} for i, name in enumerate(strategies)]
+        game_manager = GameManager(configs)
+
+        self.assertEqual(len(game_manager.players), 4)
+        self.assertEqual([p.index for p in game_manager.players], [0, 1, 2, 3])
+        self.assertEqual([p.strategy.registry_name for p in game_manager.players], strategies)
+        self.assertEqual(game_manager.stats.points.shape, (4,))
+        game_manager.run()
+        self.assertFalse(game_manager.is_game_running)
+
+    def test_unknown_strategy(self):
+        configs = copy.deepcopy(self.test_config)
+        configs["players"][0]["strategy"] = "does_not_exist"
+        with self.assertRaises(ValueError):
+            GameManager(configs)
+
+    def test_final_round_after_supply_empty(self):
+        """Taking the last card ends the game after the current round and one final round"""
+        game_manager = GameManager(self.test_config)
+        game_manager.player_1.set_strategy(BasicStrat(player=None))
+        game_manager.run()
+
+        self.assertTrue(game_manager.game_state.end_game_triggered)
+        self.assertEqual(game_manager.cards, [])
+        self.assertLess(game_manager.game_state.last_turn, game_manager.game_state.max_turns)
+        self.assertEqual(game_manager.current_turn_number, game_manager.game_state.last_turn + 1)
+
+    def test_greedy_completes_card(self):
+        """GreedyStrat only makes valid placements and completes the card of the test configs"""
+        configs = copy.deepcopy(self.test_config)
+        configs["game_parameters"]["end_game_on_empty_supply"] = False
+        configs["players"] = [{"name": "greedy", "strategy": "greedy"}]
+        game_manager = GameManager(configs)
+        self.assertIsInstance(game_manager.player_1.strategy, GreedyStrat)
+        game_manager.run()
+
+        player = game_manager.player_1
+        self.assertEqual(len(player.full_cards), 1)
+        self.assertEqual(player.points, player.full_cards[0].reward.points)
+        self.assertEqual(game_manager.stats.wasted_attempts[player.index], 0)
+
+    def test_stalled_game_ends_early(self):
+        """Two players hoarding pieces stop acting once the bank is empty: with the idle rounds heuristic on, the
+        game ends without playing to max_turns"""
+        configs = copy.deepcopy(self.test_config)
+        configs["game_parameters"]["max_turns"] = 50
+        configs["game_parameters"]["stall_idle_rounds"] = 2
+        game_manager = GameManager(configs)
+        game_manager.run()
+
+        stats = game_manager.stats
+        self.assertEqual(game_manager.end_reason, END_STALLED)
+        self.assertEqual(stats.end_reason, END_STALLED)
+        self.assertEqual(game_manager.bank_count, 0)
+        self.assertLess(stats.turns, 50)
+        self.assertEqual(stats.turns + stats.skipped_turns, 50)
+
+    def test_provable_stall(self):
+        """Empty bank and no pieces in hand: nothing can ever be placed again"""
+        game_manager = GameManager(self.test_config)
+        self.assertFalse(game_manager.is_stalled())
+        for pieces in game_manager.piece_bank.values():
+            pieces.clear()
+        game_manager.bank_count = 0
+        self.assertTrue(game_manager.is_stalled())
+        # a piece in hand and a card left in the supply: the card can still be taken and filled
+        game_manager.player_1.pieces.append(PieceSquare())
+        self.assertFalse(game_manager.is_stalled())
+
+    def test_live_games_are_not_stalled(self):
+        """Games are only ended as stalled once no card can be completed, however idle their rounds"""
+        configs = copy.deepcopy(self.test_config)
+        configs["game_parameters"]["max_turns"] = 30
+        configs["game_parameters"]["end_game_on_empty_supply"] = False
+        for strategy in ("random", "basic"):
+            configs["players"] = [{"name": "a", "strategy": strategy}, {"name": "b", "strategy": strategy}]
+            for seed in range(5):
+                random.seed(seed)
+                game_manager = GameManager(configs)
+                game_manager.run()
+                if game_manager.end_reason != END_STALLED:
+                    self.assertEqual(game_manager.stats.turns, 30)
+                    continue
+                self.assertEqual(game_manager.bank_count, 0)
+                for player in game_manager.players:
+                    sizes = game_manager.available_piece_sizes(player)
+                    self.assertFalse(player.pieces and any(not card.is_dead(sizes) for card in player.cards))
+
+    def test_unmade_moves_are_not_counted(self):
+        """Moves tried and taken back by a search leave moves_made as it was"""
+        game_manager = GameManager(self.test_config)
+        player = game_manager.player_1
+        action = TakePiece(pieces=player.pieces, piece_name="square_1", game_manager=game_manager)
+        self.assertTrue(game_manager.make_move(player, action))
+        self.assertEqual(game_manager.moves_made, 1)
+        game_manager.unmake_move(player, action)
+        self.assertEqual(game_manager.moves_made, 0)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,52 @@
+import unittest
+import json
+import os
+import tempfile
+import yaml
+from ProjectL.logging_utils import GameLogSampler, setup_sampling
+from ProjectL.simulate import run_batch, run_checkpointed
+
+
+class TestLogging(unittest.TestCase):
+    def setUp(self):
+        with open("tests/test_configs.yaml", 'r') as file:
+            self.test_config = yaml.safe_load(file)
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "games.jsonl")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _logged_games(self):
+        if not os.path.exists(self.path):
+            return set()
+        with open(self.path) as file:
+            return {json.loads(line)["game"] for line in file}
+
+    def test_only_sampled_games_are_logged(self):
+        sampler = GameLogSampler(self.path, rate=0.5)
+        run_batch(self.test_config, 8, seed=0, sampler=sampler)
+        sampler.close()
+        expected = {seed for seed in range(8) if sampler.is_sampled(seed)}
+        self.assertTrue(0 < len(expected) < 8)
+        self.assertEqual(self._logged_games(), expected)
+        self.assertFalse(sampler.quiet_logger.isEnabledFor(50))
+
+    def test_predicates_replay_games(self):
+        self.test_config["logging"] = {"log_dir": self.tmp.name,
+                                       "sampling": {"file": "games.jsonl", "always": ["lowest_score"]}}
+        sampler = setup_sampling(self.test_config)
+        run_batch(self.test_config, 3, seed=5, sampler=sampler)
+        sampler.close()
+        self.assertIn(5, self._logged_games())      # the first game always has the lowest score so far
+        self.assertIsNone(setup_sampling({}))
+
+    def test_checkpointed_batches_are_sampled(self):
+        sampler = GameLogSampler(self.path, rate=0.5)
+        run_checkpointed(self.test_config, 8, os.path.join(self.tmp.name, "run"), chunk_size=3, sampler=sampler)
+        sampler.close()
+        self.assertEqual(self._logged_games(), {seed for seed in range(8) if sampler.is_sampled(seed)})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,38 @@
+import unittest
+import json
+import logging
+import yaml
+from ProjectL.memory import profile_game, SUBSYSTEMS
+
+
+class TestMemory(unittest.TestCase):
+    """Memory benchmark of one game. After a change that is meant to use more memory, record a new baseline with
+    python -m ProjectL.memory --configs tests/test_configs.yaml --record tests/memory_baseline.json"""
+
+    def setUp(self):
+        with open("tests/memory_baseline.json", 'r') as file:
+            self.baseline = json.load(file)
+        with open(self.baseline["configs"], 'r') as file:
+            self.test_config = yaml.safe_load(file)
+        self.logger = logging.getLogger('projectL.memory')
+        self.logger.setLevel(logging.WARNING)
+
+    def test_report(self):
+        report = profile_game(self.test_config, seed=self.baseline["seed"], logger=self.logger)
+        self.assertEqual(set(report["subsystems"]), set(SUBSYSTEMS))
+        self.assertGreater(report["subsystems"]["bank"]["retained"], 0)
+        self.assertGreater(report["subsystems"]["cards"]["retained"], 0)
+        self.assertGreaterEqual(report["peak"], report["retained"])
+
+    def test_memory_regression(self):
+        """Peak and retained bytes per game stay within the tolerance of the recorded baseline"""
+        profile_game(self.test_config, seed=self.baseline["seed"], logger=self.logger)     # warm up the caches
+        report = profile_game(self.test_config, seed=self.baseline["seed"], logger=self.logger)
+        limit = 1 + self.baseline["tolerance"]
+        for key in ("peak", "retained"):
+            self.assertLessEqual(report[key], self.baseline[key] * limit,
+                                 f"{key} memory per game grew from {self.baseline[key]} to {report[key]} bytes")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,190 @@
+import unittest
+import random
+import yaml
+from ProjectL.classes import TakePiece, PlacePiece, TakeCard, MoveStack, PieceSquare, encode_move, decode_move
+from ProjectL.game_objects import GameManager
+from ProjectL.zobrist import TranspositionTable, LOWER_BOUND
+
+
+def snapshot(game_manager):
+    """Everything an action may change, with object identities so that restoring copies would not pass"""
+    return {
+        "bank": {name: [id(p) for p in pieces] for name, pieces in game_manager.piece_bank.items()},
+        "supply": [id(card) for card in game_manager.cards],
+        "players": [([id(p) for p in player.pieces], [id(c) for c in player.cards]) for player in game_manager.players],
+        "cards": [(id(card), card.layout.tobytes(), card.layout.dtype.str, card.layout_bits, card.is_full,
+                   [id(p) for p in card.placed_pieces])
+                  for player in game_manager.players for card in player.cards],
+    }
+
+
+class TestMoves(unittest.TestCase):
+    def setUp(self):
+        with open("tests/test_configs.yaml", 'r') as file:
+            self.test_config = yaml.safe_load(file)
+        random.seed(0)
+        self.game_manager = GameManager(self.test_config)
+        self.player = self.game_manager.player_1
+
+    def test_move_record_roundtrip(self):
+        move = encode_move(1, card_flag=True, bank_delta=1, piece_index=5, placement_bits=(1 << 25) - 1)
+        self.assertEqual(decode_move(move), (1, True, 1, 5, (1 << 25) - 1))
+
+    def test_take_piece_undo(self):
+        before = snapshot(self.game_manager)
+        action = TakePiece(pieces=self.player.pieces, piece_name="line_2", game_manager=self.game_manager)
+        self.assertTrue(action.perform_action())
+        self.assertNotEqual(snapshot(self.game_manager), before)
+        action.undo()
+        self.assertEqual(snapshot(self.game_manager), before)
+
+    def test_take_card_undo(self):
+        before = snapshot(self.game_manager)
+        action = TakeCard(cards=self.player.cards, game_manager=self.game_manager)
+        self.assertTrue(action.perform_action())
+        action.undo()
+        self.assertEqual(snapshot(self.game_manager), before)
+
+    def test_place_piece_undo(self):
+        """Placing the last piece completes the card, undoing it restores the card and the piece order"""
+        card = self.game_manager.get_card()
+        self.player.cards.append(card)
+        for name in ("line_2", "square_1", "line_2", "line_2"):
+            self.player.pieces.append(self.game_manager.get_piece(name))
+        lines = [p for p in self.player.pieces if p.name == "line_2"]
+        stack = MoveStack()
+        for piece, index in zip(lines[:2], (0, 2)):
+            configuration = next(c for c in piece.cube if card.placement_valid(c) and c[0, 2 + index // 2])
+            self.assertTrue(stack.push(PlacePiece(piece, card, pieces=self.player.pieces), configuration))
+        before = snapshot(self.game_manager)
+
+        configuration = next(c for c in lines[2].cube if card.placement_valid(c))
+        action = PlacePiece(lines[2], card, pieces=self.player.pieces, configuration=configuration)
+        self.assertTrue(stack.push(action))
+        self.assertTrue(card.is_full)
+        stack.pop()
+        self.assertEqual(snapshot(self.game_manager), before)
+
+        stack.pop()
+        stack.pop()
+        self.assertEqual(len(stack), 0)
+        self.assertEqual(card.layout_bits, 0)
+        self.assertEqual(card.layout.sum(), 0)
+        self.assertEqual([p.name for p in self.player.pieces], ["line_2", "square_1", "line_2", "line_2"])
+
+    def test_place_piece_undo_many_pieces(self):
+        """The index of the placed piece is recorded whole, however many pieces are held"""
+        card = self.game_manager.get_card()
+        self.player.cards.append(card)
+        self.player.pieces.extend(PieceSquare() for _ in range(70))
+        pieces = list(self.player.pieces)
+        piece = pieces[64]
+        configuration = next(c for c in piece.cube if card.placement_valid(c))
+        stack = MoveStack()
+        self.assertTrue(stack.push(PlacePiece(piece, card, pieces=self.player.pieces), configuration))
+        self.assertNotIn(piece, self.player.pieces)
+        stack.pop()
+        self.assertEqual(card.layout_bits, 0)
+        self.assertEqual(card.layout.min(), 0)
+        self.assertEqual(card.layout.sum(), 0)
+        self.assertEqual([id(p) for p in self.player.pieces], [id(p) for p in pieces])
+
+    def test_random_sequences_undo(self):
+        """Any sequence of actions pushed on the stack and popped back restores the game bit for bit"""
+        before = snapshot(self.game_manager)
+        stack = MoveStack()
+        for _ in range(30):
+            player = random.choice(self.game_manager.players)
+            action_class = random.choice((TakePiece, PlacePiece, TakeCard))
+            action = action_class(pieces=player.pieces, cards=player.cards, game_manager=self.game_manager)
+            if action.is_action_valid():
+                stack.push(action)
+        self.assertGreater(len(stack), 0)
+        while len(stack):
+            stack.pop()
+        self.assertEqual(snapshot(self.game_manager), before)
+
+
+class TestZobrist(unittest.TestCase):
+    def setUp(self):
+        with open("tests/test_configs.yaml", 'r') as file:
+            self.test_config = yaml.safe_load(file)
+        random.seed(1)
+        self.game_manager = GameManager(self.test_config)
+
+    def _rehashed(self):
+        return self.game_manager.zobrist.rehash(self.game_manager)
+
+    def test_incremental_matches_full_hash(self):
+        """After each make and unmake the incremental hash equals the hash recomputed from scratch"""
+        game_manager = self.game_manager
+        initial = game_manager.hash
+        made = []
+        for _ in range(30):
+            player = random.choice(game_manager.players)
+            action_class = random.choice((TakePiece, PlacePiece, TakeCard))
+            action = action_class(pieces=player.pieces, cards=player.cards, game_manager=game_manager)
+            if action.is_action_valid() and game_manager.make_move(player, action):
+                made.append((player, action))
+                incremental = game_manager.hash
+                self.assertEqual(incremental, self._rehashed())
+        self.assertTrue(made)
+        for player, action in reversed(made):
+            game_manager.unmake_move(player, action)
+            incremental = game_manager.hash
+            self.assertEqual(incremental, self._rehashed())
+        self.assertEqual(game_manager.hash, initial)
+
+    def test_transpositions_share_hash(self):
+        """Taking a line then a square reaches the same position as a square then a line"""
+        game_manager = self.game_manager
+        player = game_manager.player_1
+        hashes = []
+        for order in (("line_2", "square_1"), ("square_1", "line_2")):
+            actions = [TakePiece(pieces=player.pieces, piece_name=name, game_manager=game_manager) for name in order]
+            for action in actions:
+                game_manager.make_move(player, action)
+            hashes.append(game_manager.hash)
+            for action in reversed(actions):
+                game_manager.unmake_move(player, action)
+        self.assertEqual(hashes[0], hashes[1])
+        before = game_manager.hash
+        game_manager.zobrist.set_side(1)
+        self.assertNotEqual(game_manager.hash, before)
+        self.assertEqual(game_manager.hash, self._rehashed())
+
+    def test_card_types_hash_apart(self):
+        """Holding either of two cards of the same layout but different rewards are two positions"""
+        card_confs = self.test_config["cards"][0]
+        self.test_config["cards"].append(dict(card_confs, reward={"points": 3, "piece": None}))
+        game_manager = GameManager(self.test_config)
+        player = game_manager.player_1
+        hashes = []
+        for card_type in game_manager.definition.card_types:
+            game_manager.cards[-1] = card_type.make()      # on top of the supply
+            game_manager.zobrist.rehash(game_manager)
+            action = TakeCard(cards=player.cards, game_manager=game_manager)
+            game_manager.make_move(player, action)
+            hashes.append(game_manager.hash)
+            self.assertEqual(game_manager.hash, game_manager.zobrist.rehash(game_manager))
+            game_manager.unmake_move(player, action)
+        self.assertNotEqual(hashes[0], hashes[1])
+
+    def test_transposition_table_replacement(self):
+        table = TranspositionTable(size_log2=4)
+        self.assertIsNone(table.probe(3))
+        self.assertTrue(table.store(3, 1.5, depth=4, move=7))
+        self.assertEqual(table.probe(3), (1.5, 4, 0, 7))
+        # same slot, shallower search of another position: the deeper entry is kept
+        self.assertFalse(table.store(3 + 16, 2.0, depth=1))
+        self.assertIsNone(table.probe(3 + 16))
+        # in a new search the old entry is replaced
+        table.new_search()
+        self.assertTrue(table.store(3 + 16, 2.0, depth=1, flag=LOWER_BOUND))
+        self.assertEqual(table.probe(3 + 16), (2.0, 1, LOWER_BOUND, -1))
+        self.assertEqual(len(table), 1)
+        self.assertEqual(table.probe((1 << 64) - 1), None)
+
+
+if __name__ == '__main__':
+    unittest.main()
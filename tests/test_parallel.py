@@ -0,0 +1,43 @@
+import unittest
+import logging
+import yaml
+import numpy as np
+from ProjectL.parallel import SharedBatch, run_parallel
+from ProjectL.simulate import run_batch
+from ProjectL.stats import BATCH_ARRAYS
+
+
+class TestParallel(unittest.TestCase):
+    def setUp(self):
+        with open("tests/test_configs.yaml", 'r') as file:
+            self.test_config = yaml.safe_load(file)
+        self.logger = logging.getLogger('projectL.test')
+        self.logger.setLevel(logging.WARNING)
+
+    def test_same_results_as_run_batch(self):
+        progress = []
+        expected = run_batch(self.test_config, 6, seed=3, logger=self.logger)
+        with run_parallel(self.test_config, 6, seed=3, workers=2, progress=lambda done, total: progress.append(done),
+                          interval=0.01, logger=self.logger) as shared:
+            self.assertEqual(shared.games_done, 6)
+            batch = shared.batch()
+            for name in BATCH_ARRAYS:
+                if name != "decision_time":
+                    np.testing.assert_array_equal(getattr(batch, name), getattr(expected, name), err_msg=name)
+            self.assertTrue(np.shares_memory(batch.final_score, shared.records))
+            self.assertEqual(shared.summary()["games"], 6)
+            del batch
+        self.assertEqual(progress[-1], 6)
+
+    def test_attach_by_name(self):
+        with SharedBatch(4, 2, n_workers=2) as shared:
+            other = SharedBatch(*shared.spec)
+            other.records["turns"][1] = 7
+            other.progress_counts[1] += 1
+            other.close()
+            self.assertEqual(shared.records["turns"][1], 7)
+            self.assertEqual(shared.games_done, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -72,5 +72,14 @@ class TestPiece(unittest.TestCase):
                 self.assertFalse(np.array_equal(layout_i, layout_j),
                                  f"Duplicate layouts found at indices {i} and {j}")
 
+    def test_cube_is_lazy(self):
+        """The cube is only generated when first used, then kept"""
+        piece = Piece(self.corner_3_config)
+        self.assertIsNone(piece._cube)
+        cube = piece.cube
+        self.assertIs(piece.cube, cube)
+        np.testing.assert_array_equal(cube, self.piece.cube)
+        self.assertIsNone(Piece().cube)
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,36 @@
+import unittest
+from ProjectL.classes import Piece
+from ProjectL.definition import _cube_cache
+from ProjectL.polyomino import enumerate_polyominoes, canonical, piece_configs
+
+
+class TestPolyomino(unittest.TestCase):
+    def test_counts(self):
+        """Known numbers of free and one-sided polyominoes"""
+        free = enumerate_polyominoes(6)
+        self.assertEqual([len(free[size]) for size in range(1, 7)], [1, 1, 2, 5, 12, 35])
+        one_sided = enumerate_polyominoes(5, reflect=False)
+        self.assertEqual([len(one_sided[size]) for size in range(1, 6)], [1, 1, 2, 7, 18])
+
+    def test_canonical(self):
+        l_tromino = ((0, 0), (1, 0), (1, 1))
+        rotated = ((5, 6), (5, 7), (6, 6))
+        self.assertEqual(canonical(l_tromino), canonical(rotated))
+        s_tetromino = ((0, 1), (0, 2), (1, 0), (1, 1))
+        z_tetromino = ((0, 0), (0, 1), (1, 1), (1, 2))
+        self.assertEqual(canonical(s_tetromino), canonical(z_tetromino))
+        self.assertNotEqual(canonical(s_tetromino, reflect=False), canonical(z_tetromino, reflect=False))
+
+    def test_piece_configs(self):
+        """Pieces up to size 6 that fit on a card, usable as configs, with their cubes cached"""
+        configs = piece_configs(6, min_size=4)
+        self.assertEqual(len(configs), 5 + 12 + 34)       # the straight hexomino does not fit on a card
+        for piece_confs in configs:
+            piece = Piece(configs=piece_confs)
+            self.assertEqual(piece.size, piece_confs["level"])
+            self.assertIn(piece.shape.tobytes(), _cube_cache)
+            self.assertEqual(len(_cube_cache[piece.shape.tobytes()][0]), len(piece.cube))
+
+
+if __name__ == '__main__':
+    unittest.main()
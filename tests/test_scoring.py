@@ -0,0 +1,99 @@
+import unittest
+import json
+import os
+import tempfile
+import random
+import yaml
+import numpy as np
+from ProjectL.classes import PlacePiece
+from ProjectL.game_objects import GameManager, BasicStrat
+from ProjectL.simulate import run_batch, run_checkpointed, MANIFEST
+
+
+class TestScoring(unittest.TestCase):
+    def setUp(self):
+        with open("tests/test_configs.yaml", 'r') as file:
+            self.test_config = yaml.safe_load(file)
+        random.seed(0)
+
+    def test_completed_card_pays_out(self):
+        """Filling every cell of a card pays its points and gives back the placed pieces, no reward piece configured"""
+        game_manager = GameManager(self.test_config)
+        player = game_manager.player_1
+        player.set_strategy(BasicStrat(player=None))
+        card = game_manager.get_card()
+        player.cards.append(card)
+        squares = [game_manager.get_piece("square_1") for _ in range(2)] + \
+                  [game_manager.get_piece("line_2") for _ in range(2)]
+        player.pieces.extend(squares)
+        bank_count = game_manager.bank_count
+
+        # the mask is a 3x2 block in columns 2-3: fill it with 2 vertical lines and 2 squares
+        placements = [(squares[2], (0, 2), (1, 2)), (squares[3], (0, 3), (1, 3)),
+                      (squares[0], (2, 2)), (squares[1], (2, 3))]
+        for piece, *cells in placements:
+            configuration = np.zeros((5, 5), dtype=int)
+            for cell in cells:
+                configuration[cell] = 1
+            action = PlacePiece(piece, card, pieces=player.pieces)
+            self.assertTrue(action.perform_action(configuration))
+            player.strategy._move_full_cards()
+
+        self.assertTrue(card.is_full)
+        self.assertIn(card, player.full_cards)
+        self.assertEqual(player.points, card.reward.points)
+        self.assertEqual(game_manager.stats.cards_completed[player.index], 1)
+        self.assertEqual(game_manager.stats.points[player.index], card.reward.points)
+        # the 4 placed pieces came back, the card has no reward piece so the bank is untouched
+        self.assertEqual(len(player.pieces), 4)
+        self.assertEqual(game_manager.bank_count, bank_count)
+        self.assertEqual(card.placed_pieces, [])
+
+    def test_final_score_and_stats(self):
+        """Final score is recorded for every player and matches the players' points minus unfinished cards"""
+        game_manager = GameManager(self.test_config)
+        game_manager.player_1.set_strategy(BasicStrat(player=None))
+        game_manager.run()
+
+        for player in game_manager.players:
+            penalty = sum(card.reward.points for card in player.cards)
+            self.assertEqual(player.final_score, player.points - penalty)
+            self.assertEqual(game_manager.stats.final_score[player.index], player.final_score)
+            self.assertEqual(game_manager.stats.points[player.index], player.points)
+        self.assertGreater(game_manager.stats.actions.sum(), 0)
+
+    def test_batch_statistics(self):
+        """A batch fills one preallocated row per game"""
+        batch = run_batch(self.test_config, 5, seed=3)
+        self.assertEqual(batch.games_recorded, 5)
+        self.assertEqual(batch.points.shape, (5, len(self.test_config["players"])))
+        self.assertTrue(np.all(batch.turns > 0))
+        summary = batch.summary()
+        self.assertAlmostEqual(summary["win_rate"].sum(), 1.0)
+
+    def test_checkpoint_resume(self):
+        """A run interrupted after some chunks resumes where it stopped and gives the same summary"""
+        expected = run_batch(self.test_config, 7, seed=3).summary()
+        with tempfile.TemporaryDirectory() as out_dir:
+            run_checkpointed(self.test_config, 7, out_dir, chunk_size=3, seed=3)
+            manifest_path = os.path.join(out_dir, MANIFEST)
+            with open(manifest_path) as file:
+                manifest = json.load(file)
+            self.assertEqual([chunk["seed_start"] for chunk in manifest["chunks"].values()], [3, 6, 9])
+            # as if the run had crashed while playing the last chunk
+            del manifest["chunks"]["2"]
+            with open(manifest_path, 'w') as file:
+                json.dump(manifest, file)
+            chunk_0 = os.path.getmtime(os.path.join(out_dir, "chunk_000000.npz"))
+            summary = run_checkpointed(self.test_config, 7, out_dir, chunk_size=3, seed=3)
+            self.assertEqual(os.path.getmtime(os.path.join(out_dir, "chunk_000000.npz")), chunk_0)
+            self.assertEqual(summary["games"], 7)
+            self.assertEqual(summary["end_reasons"], expected["end_reasons"])
+            for key in ("final_score", "win_rate", "actions_take_piece"):
+                np.testing.assert_allclose(summary[key], expected[key])
+            with self.assertRaises(ValueError):
+                run_checkpointed(self.test_config, 8, out_dir, chunk_size=3, seed=3)
+
+
+if __name__ == '__main__':
+    unittest.main()
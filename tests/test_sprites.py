@@ -0,0 +1,36 @@
+import unittest
+import yaml
+import numpy as np
+from ProjectL.classes import Card, Piece
+from ProjectL.utils.sprites import sprite_sheet, ascii_sheet, piece_codes, card_codes, PALETTE, FILLED, OUTSIDE
+
+
+class TestSprites(unittest.TestCase):
+    def setUp(self):
+        with open("tests/test_configs.yaml", 'r') as file:
+            self.test_config = yaml.safe_load(file)
+
+    def test_sprite_sheet_layout(self):
+        piece = Piece(self.test_config["pieces"][1])        # line_2
+        codes = piece_codes(piece.cube)
+        sheet = sprite_sheet(codes, columns=8, cell=10, margin=4)
+        rows = -(-len(codes) // 8)
+        self.assertEqual(sheet.shape, (rows * 54, 8 * 54, 3))
+        self.assertEqual(sheet.dtype, np.uint8)
+        # centre of the first cell of the first tile is the colour of its code
+        np.testing.assert_array_equal(sheet[2 + 5, 2 + 5], PALETTE[codes[0, 0, 0]])
+
+    def test_ascii_card(self):
+        card = Card(self.test_config["cards"][0])
+        layout = np.zeros((5, 5), dtype=int)
+        layout[0, 2] = 1
+        card.place_piece(layout)
+        codes = card_codes(card)
+        self.assertEqual(codes[0, 2], FILLED)
+        self.assertEqual(codes[4, 4], OUTSIDE)
+        text = ascii_sheet(codes)
+        self.assertEqual(text.splitlines()[0], "  #. ")
+
+
+if __name__ == '__main__':
+    unittest.main()
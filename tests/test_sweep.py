@@ -0,0 +1,46 @@
+import unittest
+import os
+import tempfile
+import yaml
+from ProjectL.sweep import Sweep, apply_overrides, grid_variants, random_variants
+
+
+class TestSweep(unittest.TestCase):
+    def setUp(self):
+        with open("tests/test_configs.yaml", 'r') as file:
+            self.test_config = yaml.safe_load(file)
+
+    def test_overrides(self):
+        configs = apply_overrides(self.test_config, {"game_parameters.max_turns": 4, "pieces.line_2.quantity": 7,
+                                                     "cards.0.reward.points": 2})
+        self.assertEqual(configs["game_parameters"]["max_turns"], 4)
+        self.assertEqual(configs["pieces"][1]["quantity"], 7)
+        self.assertEqual(configs["cards"][0]["reward"]["points"], 2)
+        self.assertEqual(self.test_config["pieces"][1]["quantity"], 3)
+        with self.assertRaises(ValueError):
+            apply_overrides(self.test_config, {"pieces.triangle.quantity": 1})
+
+    def test_variants(self):
+        fields = {"a": [1, 2, 3], "b": [True, False]}
+        self.assertEqual(len(grid_variants(fields)), 6)
+        sampled = random_variants(fields, 4, seed=1)
+        self.assertEqual(len(sampled), 4)
+        self.assertEqual(len({tuple(v.items()) for v in sampled}), 4)
+
+    def test_sweep_cached(self):
+        """A second sweep reads every variant from the cache and gives the same table"""
+        variants = grid_variants({"game_parameters.max_turns": [3, 6]})
+        with tempfile.TemporaryDirectory() as cache_dir:
+            rows = Sweep(self.test_config, variants, n_games=6, cache_dir=cache_dir, chunk_size=4, workers=1).run()
+            self.assertEqual([row["game_parameters.max_turns"] for row in rows], [3, 6])
+            self.assertTrue(all(row["games"] == 6 for row in rows))
+            self.assertEqual(rows[0]["turns_mean"], 3)
+            self.assertEqual(len(os.listdir(cache_dir)), 2)
+            with self.assertLogs('projectL.sweep', level='INFO') as logs:
+                again = Sweep(self.test_config, variants, n_games=6, cache_dir=cache_dir, workers=1).run()
+            self.assertIn("2 cached, 0 chunks", logs.output[0])
+            self.assertEqual(again, rows)
+
+
+if __name__ == '__main__':
+    unittest.main()
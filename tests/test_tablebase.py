@@ -0,0 +1,71 @@
+import unittest
+import tempfile
+import numpy as np
+import yaml
+from ProjectL.classes import Card, layout_to_bits
+from ProjectL.definition import as_definition
+from ProjectL.tablebase import generate, build_mask_table, CardTablebase, IMPOSSIBLE
+
+
+class TestTablebase(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        with open("tests/test_configs.yaml", 'r') as file:
+            cls.configs = yaml.safe_load(file)
+        cls.tmp_dir = tempfile.TemporaryDirectory()
+        generate(cls.configs, cls.tmp_dir.name)
+        cls.tablebase = CardTablebase(cls.tmp_dir.name)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp_dir.cleanup()
+
+    def setUp(self):
+        self.card = Card(self.configs["cards"][0])
+
+    def _bits(self, *cells):
+        layout = np.zeros((5, 5), dtype=int)
+        for cell in cells:
+            layout[cell] = 1
+        return layout_to_bits(layout)
+
+    def test_empty_card(self):
+        """The 3x2 card needs at least 3 line_2 and can be done with any mix of lines and squares"""
+        mask = self.card.mask_bits
+        self.assertEqual(self.tablebase.min_pieces(mask, 0), 3)
+        multisets = sorted(map(tuple, self.tablebase.completing_multisets(mask, 0).tolist()))
+        self.assertEqual(multisets, [(0, 3), (2, 2), (4, 1), (6, 0)])
+        self.assertEqual(self.tablebase.next_types(mask, 0), ["square_1", "line_2"])
+        self.assertEqual(self.tablebase.min_pieces(mask, mask), 0)
+
+    def test_partial_layouts(self):
+        mask = self.card.mask_bits
+        # middle row filled: two separate 2 cell holes
+        self.assertEqual(self.tablebase.min_pieces(mask, self._bits((1, 2), (1, 3))), 2)
+        # only one cell left
+        layout = mask & ~self._bits((2, 3))
+        self.assertEqual(self.tablebase.min_pieces(mask, layout), 1)
+        self.assertEqual(self.tablebase.next_types(mask, layout), ["square_1"])
+
+    def test_is_completable(self):
+        self.assertTrue(self.tablebase.is_completable(self.card))
+        self.assertTrue(self.tablebase.is_completable(self.card, piece_counts=[0, 3]))
+        self.assertFalse(self.tablebase.is_completable(self.card, piece_counts=[1, 2]))
+
+    def test_tables_are_memory_mapped(self):
+        tables = self.tablebase.tables[self.card.mask_bits]
+        self.assertIsInstance(tables["min_pieces"], np.memmap)
+        self.assertEqual(len(tables["min_pieces"]), 2 ** 6)
+        self.assertTrue(np.all(tables["min_pieces"][tables["reachable"] == 0] == IMPOSSIBLE))
+
+    def test_many_piece_types(self):
+        """next_types keeps a bit for every piece type beyond 16, piece sets too large are refused"""
+        pieces = as_definition(self.configs).piece_types * 10       # square_1, line_2, ... 20 types
+        tables, _ = build_mask_table(self.card.mask_bits, pieces)
+        self.assertEqual(int(tables["next_types"][0]), (1 << 20) - 1)
+        with self.assertRaises(ValueError):
+            build_mask_table(self.card.mask_bits, pieces * 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+import unittest
+import tempfile
+import numpy as np
+import yaml
+from ProjectL.tournament import Tournament, read_columns, wilson_interval, elo_ratings, playable_strategies
+from ProjectL.definition import as_definition
+
+
+class TestTournament(unittest.TestCase):
+    def setUp(self):
+        with open("tests/test_configs.yaml", 'r') as file:
+            self.test_config = yaml.safe_load(file)
+
+    def test_wilson_interval(self):
+        low, high = wilson_interval(50, 100)
+        self.assertLess(low, 0.5)
+        self.assertGreater(high, 0.5)
+        low, high = wilson_interval(95, 100)
+        self.assertGreater(low, 0.5)
+
+    def test_elo_orders_strategies(self):
+        """0 always beats 1 which always beats 2"""
+        a = np.array([0, 1, 0] * 10)
+        b = np.array([1, 2, 2] * 10)
+        elo = elo_ratings(a, b, np.ones(30), 3)
+        self.assertGreater(elo[0], elo[1])
+        self.assertGreater(elo[1], elo[2])
+
+    def test_round_robin(self):
+        """Every pairing is played in both seat orders and streamed to the columnar files"""
+        with tempfile.TemporaryDirectory() as out_dir:
+            tournament = Tournament(self.test_config, ["random", "take_piece", "basic"], out_dir,
+                                    max_games=4, min_games=2, batch_size=1, workers=1)
+            report = tournament.run()
+            results = read_columns(out_dir)
+
+        self.assertEqual(len(results["pairing"]), 12)
+        for pairing in range(3):
+            seats = results["seat_a"][results["pairing"] == pairing]
+            self.assertEqual(sorted(seats.tolist()), [0, 0, 1, 1])
+        self.assertEqual(len(report["strategies"]), 3)
+        self.assertTrue(all(p["games"] == 4 for p in report["pairings"]))
+
+    def test_strategy_without_model(self):
+        """learned needs a value model: left out of the default strategies, rejected up front when asked for"""
+        self.assertNotIn("learned", playable_strategies(as_definition(self.test_config)))
+        with self.assertRaises(ValueError):
+            Tournament(self.test_config, ["basic", "learned"], tempfile.gettempdir(), workers=1)
+
+
+if __name__ == '__main__':
+    unittest.main()
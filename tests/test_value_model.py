@@ -0,0 +1,86 @@
+import unittest
+import logging
+import os
+import random
+import tempfile
+import yaml
+import numpy as np
+from ProjectL.definition import as_definition
+from ProjectL.game_objects import GameManager, afterstate_action
+from ProjectL.selfplay import generate
+from ProjectL.simulate import run_batch
+from ProjectL.value_model import StateFeatures, ValueModel, load_shards, train, PASS
+
+
+class TestValueModel(unittest.TestCase):
+    def setUp(self):
+        with open("tests/test_configs.yaml", 'r') as file:
+            self.test_config = yaml.safe_load(file)
+        self.test_config["players"] = [{"name": "random", "strategy": "random"},
+                                       {"name": "basic", "strategy": "basic"}]
+        self.logger = logging.getLogger('projectL.test')
+        self.logger.setLevel(logging.WARNING)
+
+    def _position(self, definition, seed, rounds):
+        random.seed(seed)
+        game_manager = GameManager(definition, self.logger)
+        for _ in range(rounds):
+            if not game_manager.start_round():
+                break
+            for player in game_manager.players:
+                game_manager.play_turn_of(player)
+            game_manager.end_round()
+        return game_manager
+
+    def test_afterstates_match_played_moves(self):
+        definition = as_definition(self.test_config)
+        features = StateFeatures(definition)
+        checked = 0
+        for seed, rounds in ((0, 1), (1, 2), (2, 3)):
+            game_manager = self._position(definition, seed, rounds)
+            rows, moves = features.afterstates(game_manager, game_manager.player_1, 3)
+            self.assertEqual(rows.shape, (len(moves), features.size))
+            for row, move in zip(rows, moves):
+                if move[0] == PASS:
+                    np.testing.assert_array_equal(row, features.state(game_manager, game_manager.player_1, 0))
+                    continue
+                played = self._position(definition, seed, rounds)
+                player = played.player_1
+                player.strategy.actions_left = 3
+                self.assertTrue(player.strategy._perform_action(afterstate_action(player, move)))
+                np.testing.assert_array_equal(row, features.state(played, player, 2), err_msg=str(move))
+                checked += 1
+        self.assertGreater(checked, 0)
+
+    def test_train_fits_and_saves(self):
+        rng = np.random.default_rng(0)
+        features = rng.normal(size=(2000, 5)).astype(np.float32)
+        outcomes = features @ np.array([1.0, -2.0, 0.5, 0.0, 3.0]) + 1.0
+        model, history = train(features, outcomes, epochs=30, learning_rate=0.05)
+        self.assertLess(history["validation"][-1], 0.01 * history["baseline"])
+        with tempfile.TemporaryDirectory() as out_dir:
+            path = os.path.join(out_dir, "model.npz")
+            model.save(path)
+            loaded = ValueModel.load(path)
+        np.testing.assert_allclose(loaded.predict(features[:10]), model.predict(features[:10]))
+
+    def test_selfplay_to_learned_player(self):
+        with tempfile.TemporaryDirectory() as out_dir:
+            manifest = generate(self.test_config, 4, out_dir, games_per_shard=2, logger=self.logger)
+            self.assertEqual(len(manifest["shards"]), 2)
+            self.assertEqual(len(manifest["feature_names"]), manifest["n_features"])
+            features, outcomes = load_shards(out_dir)
+            self.assertEqual(features.shape, (len(outcomes), manifest["n_features"]))
+            self.assertEqual(len(outcomes), sum(shard["n_positions"] for shard in manifest["shards"].values()))
+
+            model, _ = train(features, outcomes, hidden=(8,), epochs=3)
+            path = os.path.join(out_dir, "model.npz")
+            model.save(path)
+            self.test_config["game_parameters"]["value_model"] = path
+            self.test_config["players"][0]["strategy"] = "learned"
+            batch = run_batch(self.test_config, 2, logger=self.logger)
+        self.assertGreater(batch.decisions[:, 0].sum(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()